@@ -1,5 +1,7 @@
 import configparser
+import os
 from pathlib import Path
+from typing import Dict, List, NamedTuple
 
 CONFIG_DIR = Path.home() / ".agentbee"
 CONFIG_FILE = CONFIG_DIR / "config.ini"
@@ -31,4 +33,99 @@ def load_config() -> dict:
         'llm_api_key': config.get(CONFIG_SECTION, 'llm_api_key', fallback=''),
         'llm_base_url': config.get(CONFIG_SECTION, 'llm_base_url', fallback=''),
         'llm_model': config.get(CONFIG_SECTION, 'llm_model', fallback='')
-    }
\ No newline at end of file
+    }
+ENDPOINT_PREFIX = "endpoint:"
+ROUTER_SECTION = "router"
+# The name of the endpoint built from the llm_* settings written by 'config set'.
+DEFAULT_ENDPOINT = "default"
+# Used to repair malformed JSON when no fixer endpoint is configured.
+LOCAL_FIXER = {"provider": "ollama", "model": "phi3.5:latest", "base_url": "http://localhost:11434/v1"}
+GOOGLE_HOST = "generativelanguage.googleapis.com"
+
+
+class EndpointConfig(NamedTuple):
+    name: str
+    provider: str  # "google", "openai" (any OpenAI-compatible API) or "ollama"
+    model: str
+    base_url: str = ""
+    api_key: str = ""
+    timeout: float = 120.0
+    cache_ttl: float = 0.0  # seconds to keep the code prefix as Gemini cached content; 0 disables
+    keep_alive: str = ""  # how long Ollama keeps the model, and its prompt cache, loaded, e.g. "30m"
+
+
+class RouterConfig(NamedTuple):
+    coding: List[EndpointConfig]
+    fixer: EndpointConfig
+    hedge: bool = True
+    hedge_quantile: float = 0.95
+    hedge_after: float = 10.0  # seconds, until enough latencies are recorded for the quantile
+
+
+def _infer_provider(base_url: str) -> str:
+    if not base_url or (GOOGLE_HOST in base_url and "/openai" not in base_url):
+        return "google"
+    if ":11434" in base_url:
+        return "ollama"
+    return "openai"
+
+
+def _endpoint_from_section(parser: configparser.ConfigParser, section: str) -> EndpointConfig:
+    name = section[len(ENDPOINT_PREFIX):]
+    get = lambda key, fallback="": parser.get(section, key, fallback=fallback)
+    base_url = get('base_url')
+    api_key = get('api_key')
+    if not api_key and get('api_key_env'):
+        api_key = os.environ.get(get('api_key_env'), "")
+    provider = get('provider') or _infer_provider(base_url)
+    if provider not in ("google", "openai", "ollama"):
+        raise ValueError(f"Endpoint '{name}' has an unknown provider '{provider}'.")
+    if not get('model'):
+        raise ValueError(f"Endpoint '{name}' has no model.")
+    return EndpointConfig(name, provider, get('model'), base_url, api_key,
+                          parser.getfloat(section, 'timeout', fallback=120.0),
+                          parser.getfloat(section, 'cache_ttl', fallback=0.0), get('keep_alive'))
+
+
+def load_router_config() -> RouterConfig:
+    """
+    The model endpoints and routing settings. Each [endpoint:<name>] section
+    names an endpoint (provider, model, base_url, api_key or api_key_env,
+    timeout, and the prompt caching settings cache_ttl and keep_alive); the
+    llm_* settings written by 'config set' form the 'default' endpoint. The [router] section lists the coding endpoints in order of
+    preference, the fixer endpoint, and the hedging settings.
+    """
+    parser = configparser.ConfigParser()
+    if CONFIG_FILE.exists():
+        parser.read(CONFIG_FILE)
+    endpoints: Dict[str, EndpointConfig] = {}
+    defaults = load_config()
+    if defaults.get('llm_model') or defaults.get('llm_api_key'):
+        base_url = defaults.get('llm_base_url', '')
+        endpoints[DEFAULT_ENDPOINT] = EndpointConfig(
+            DEFAULT_ENDPOINT, _infer_provider(base_url), defaults.get('llm_model') or "gemini-2.0-flash",
+            base_url, defaults.get('llm_api_key', ''))
+    for section in parser.sections():
+        if section.startswith(ENDPOINT_PREFIX):
+            endpoint = _endpoint_from_section(parser, section)
+            endpoints[endpoint.name] = endpoint
+
+    def lookup(name: str) -> EndpointConfig:
+        if name not in endpoints:
+            raise ValueError(f"The router refers to an unknown endpoint '{name}' in {CONFIG_FILE}.")
+        return endpoints[name]
+
+    router = parser[ROUTER_SECTION] if parser.has_section(ROUTER_SECTION) else {}
+    coding_names = [n.strip() for n in router.get('coding', '').split(',') if n.strip()]
+    if coding_names:
+        coding = [lookup(name) for name in coding_names]
+    else:
+        coding = [endpoints[DEFAULT_ENDPOINT]] if DEFAULT_ENDPOINT in endpoints else []
+    fixer_name = router.get('fixer', '').strip()
+    fixer = lookup(fixer_name) if fixer_name else EndpointConfig("local", **LOCAL_FIXER)
+    return RouterConfig(
+        coding, fixer,
+        hedge=parser.getboolean(ROUTER_SECTION, 'hedge', fallback=True),
+        hedge_quantile=parser.getfloat(ROUTER_SECTION, 'hedge_quantile', fallback=0.95),
+        hedge_after=parser.getfloat(ROUTER_SECTION, 'hedge_after', fallback=10.0),
+    )
@@ -3,15 +3,13 @@ import subprocess
 from pathlib import Path
 from typing import List, Optional
 
+from . import beeinclude, project
+
 def get_project_root() -> Path:
     """Finds the project root by looking for a .git directory."""
     try:
-        # This command asks git for the top-level directory of the current repository.
-        result = subprocess.run(           
-            ['git', 'rev-parse', '--show-toplevel'],
-            capture_output=True, text=True, check=True,
-        )
-        return Path(result.stdout.strip())
+        # git is only asked once per process and working directory.
+        return project.get_project_context().root
     except (subprocess.CalledProcessError, FileNotFoundError):
         print("🚨 Error: Not a git repository or git is not installed. Cannot determine project root.")
         # Re-raise the exception to be caught by the main command handler.
@@ -29,20 +27,12 @@ def read_bee_include(root: Path) -> List[str]:
 def filter_paths_with_patterns(paths: List[Path], patterns: List[str], root: Path) -> List[Path]:
     """
     Filters a list of file paths to only include those matching the given patterns.
-    Note: This uses basic `pathlib.Path.match`. For full .gitignore style, a library
-    like 'pathspec' would be needed, but this is sufficient for simple cases.
+    Patterns follow .gitignore rules, including `**` and `!` exclusions; they
+    are compiled once (see `beeinclude.IncludeMatcher`) rather than matched per path.
     """
     if not patterns:
         return paths  # If no patterns are provided, return the original list.
-    
-    absolute_patterns = [root / p for p in patterns]
-    filtered = []
-    for path in paths:
-        # Check if the path matches any of the provided patterns.
-        # Ensure the patterns are relative to the root when matching
-        if any(path.match(str((root / p).resolve().relative_to(root.resolve()))) for p in patterns):
-            filtered.append(path)
-    return filtered
+    return beeinclude.IncludeMatcher(patterns).filter_paths(paths, root)
 
 def get_file_paths(root: Path, path_option: Optional[Path]) -> List[Path]:
     """
@@ -56,25 +46,29 @@ def get_file_paths(root: Path, path_option: Optional[Path]) -> List[Path]:
             raise FileNotFoundError(f"Provided path '{scan_path}' does not exist.")
         if scan_path.is_file():
             return [scan_path]
-        # Recursively find all files in the given directory.
-        return [p for p in scan_path.rglob('*') if p.is_file()]
+        # Recursively find all files in the given directory, skipping AgentBee's own state.
+        state_dir = root / ".agentbee"
+        return [p for p in scan_path.rglob('*') if p.is_file() and state_dir not in p.parents]
 
     # Default behavior: use 'git ls-files'.
     try:
-        result = subprocess.run(
-            ['git', 'ls-files'],
-            capture_output=True, text=True, check=True, cwd=root
-        )
-        # Get a list of relative paths from git and make them absolute.
-        paths = [root / p for p in result.stdout.strip().split('\n')]
-        
         # Check for and apply filters from a .beeinclude file.
         include_patterns = read_bee_include(root)
-        if include_patterns:
+        matcher = beeinclude.IncludeMatcher(include_patterns) if include_patterns else None
+        if matcher:
             print(f"🔎 Filtering files using .beeinclude patterns...")
-            paths = filter_paths_with_patterns(paths, include_patterns, root)
+        # Push the patterns down to git as pathspecs, so excluded trees are never listed.
+        pathspecs = matcher.to_pathspecs() if matcher else None
+        result = subprocess.run(
+            ['git', 'ls-files', '-z', '--', *(pathspecs or [])],
+            capture_output=True, text=True, check=True, cwd=root
+        )
+        relative_paths = [p for p in result.stdout.split('\0') if p]
+        if matcher:
+            relative_paths = matcher.filter(relative_paths)
 
-        return paths
+        # Make the relative paths from git absolute.
+        return [root / p for p in relative_paths]
     except FileNotFoundError:
         print("🚨 Error: 'git' command not found. Please install git or use the --path option.")
         raise
@@ -0,0 +1,239 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Callable, List, NamedTuple, Optional, Tuple
+
+from pydantic import ValidationError
+
+from . import file_io, json_repair, parser, runner
+
+# How often running tests check whether another candidate already won.
+POLL_SECONDS = 0.05
+# How long cancelled candidates get to report before the round's results are printed.
+CANCEL_GRACE_SECONDS = 1.0
+# How much of a failing test's output is fed back to the model.
+MAX_FEEDBACK_CHARS = 4000
+
+
+class TestResult(NamedTuple):
+    passed: bool
+    output: str
+    seconds: float
+    cancelled: bool = False
+
+
+class CandidateResult(NamedTuple):
+    number: int
+    passed: bool
+    status: str
+    generate_seconds: float
+    test_seconds: float
+    files: List[str]
+    output: str
+    scripts: Optional[parser.CodeOutputRootList] = None
+
+
+def _git(args: List[str], cwd: Path) -> str:
+    return subprocess.run(['git', *args], cwd=cwd, capture_output=True, text=True, check=True).stdout
+
+
+def run_test(test_script: Path, cwd: Path, cancel: Optional[threading.Event] = None,
+             timeout: Optional[float] = None) -> TestResult:
+    """
+    Runs the test script in cwd. It is killed (with any children it started)
+    when cancel is set or the timeout expires.
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        ['bash', str(test_script)], cwd=cwd,
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+        start_new_session=True
+    )
+    cancelled = False
+    while True:
+        try:
+            output, _ = process.communicate(timeout=POLL_SECONDS)
+            break
+        except subprocess.TimeoutExpired:
+            timed_out = timeout is not None and time.perf_counter() - start > timeout
+            if (cancel is not None and cancel.is_set()) or timed_out:
+                cancelled = not timed_out
+                _kill(process)
+                output, _ = process.communicate()
+                if timed_out:
+                    output += f"\n[agentbee] Test timed out after {timeout:.0f}s"
+                break
+    passed = process.returncode == 0 and not cancelled
+    return TestResult(passed, output, time.perf_counter() - start, cancelled)
+
+
+def _kill(process: subprocess.Popen):
+    try:
+        os.killpg(process.pid, 9)
+    except (AttributeError, OSError):
+        process.kill()
+
+
+class Worktree:
+    """
+    A temporary detached `git worktree` holding the project as it is now,
+    including uncommitted and untracked (non-ignored) files.
+    """
+
+    def __init__(self, project_root: Path, base: str, untracked: List[str]):
+        self.project_root = project_root
+        self.path = Path(tempfile.mkdtemp(prefix="agentbee-auto-"))
+        try:
+            _git(['worktree', 'add', '--quiet', '--detach', str(self.path), base], project_root)
+        except BaseException:
+            shutil.rmtree(self.path, ignore_errors=True)
+            raise
+        for relative_path in untracked:
+            target = self.path / relative_path
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(project_root / relative_path, target)
+
+    def __enter__(self) -> "Worktree":
+        return self
+
+    def __exit__(self, *exc):
+        self.remove()
+
+    def remove(self):
+        try:
+            _git(['worktree', 'remove', '--force', str(self.path)], self.project_root)
+        except subprocess.CalledProcessError:
+            shutil.rmtree(self.path, ignore_errors=True)
+            _git(['worktree', 'prune'], self.project_root)
+
+
+def snapshot_base(project_root: Path) -> Tuple[str, List[str]]:
+    """
+    Returns a commit holding the working tree's tracked changes (HEAD when it
+    is clean) and the untracked files that worktrees need copied in.
+    """
+    base = _git(['stash', 'create'], project_root).strip() or 'HEAD'
+    listed = _git(['ls-files', '--others', '--exclude-standard', '-z'], project_root).split('\0')
+    # AgentBee's own caches are not part of the project under test.
+    untracked = [p for p in listed if p and not p.startswith('.agentbee/')]
+    return base, untracked
+
+
+def parse_candidate(model_response: str) -> parser.CodeOutputRootList:
+    """Parses a candidate, falling back to the deterministic JSON repair tier."""
+    try:
+        return parser.CodeOutputRootList.model_validate_json(runner.clean_markdown_json(model_response))
+    except ValidationError:
+        return parser.CodeOutputRootList.model_validate_json(json_repair.repair(model_response))
+
+
+def write_scripts(scripts: parser.CodeOutputRootList, root: Path, verbose: bool = True) -> List[str]:
+    """
+    Writes generated files under root, returning their relative paths.
+    Raises ValueError, before writing anything, if a path falls outside root.
+    """
+    relative_paths = [runner.resolve_output_path(script.file_path, root) for script in scripts.root]
+    file_io.contained_paths(root, relative_paths)
+    with file_io.WriteSession(root, verbose=verbose) as session:
+        for relative_path, script in zip(relative_paths, scripts.root):
+            session.add(relative_path, script.code_content)
+    return [relative_path.as_posix() for relative_path in relative_paths]
+
+
+def build_query(test_script: Path, failure_output: str, failed: List[CandidateResult]) -> str:
+    """The instructions for one iteration: the failing output plus what earlier candidates tried."""
+    query = (f"The test script `{test_script.as_posix()}` fails with the output below. "
+             f"Change the code so that it passes.\n\n{failure_output[-MAX_FEEDBACK_CHARS:]}")
+    for candidate in failed[-3:]:
+        query += (f"\n\nA previous attempt that changed {', '.join(candidate.files) or 'no files'} "
+                  f"did not work ({candidate.status}):\n{candidate.output[-MAX_FEEDBACK_CHARS // 4:]}")
+    return query
+
+
+class CandidateSearch:
+    """
+    Generates candidate fixes concurrently, tests each in its own worktree,
+    and stops at the first one that passes.
+    """
+
+    def __init__(self, project_root: Path, test_script: Path, generate: Callable[[Any], str],
+                 candidates: int = 3, timeout: Optional[float] = None):
+        self.project_root = project_root
+        self.test_script = test_script
+        self.generate = generate
+        self.candidates = candidates
+        self.timeout = timeout
+
+    def _script_in(self, root: Path) -> Path:
+        # Prefer the worktree's copy so a tracked test script sees its own tree.
+        script = self.test_script.resolve()
+        try:
+            relative = script.relative_to(self.project_root)
+        except ValueError:
+            return script
+        return root / relative if (root / relative).exists() else script
+
+    def _attempt(self, number: int, prompt_value: Any, base: str, untracked: List[str],
+                 cancel: threading.Event) -> CandidateResult:
+        start = time.perf_counter()
+        try:
+            response = self.generate(prompt_value)
+            generate_seconds = time.perf_counter() - start
+            if cancel.is_set():
+                return CandidateResult(number, False, "cancelled", generate_seconds, 0.0, [], "")
+            scripts = parse_candidate(response)
+        except Exception as e:
+            return CandidateResult(number, False, f"error: {e}", time.perf_counter() - start, 0.0, [], str(e))
+
+        with Worktree(self.project_root, base, untracked) as worktree:
+            try:
+                files = write_scripts(scripts, worktree.path, verbose=False)
+            except ValueError as e:
+                return CandidateResult(number, False, f"error: {e}", generate_seconds, 0.0, [], str(e))
+            result = run_test(self._script_in(worktree.path), worktree.path, cancel, self.timeout)
+        status = "passed" if result.passed else "cancelled" if result.cancelled else "failed"
+        return CandidateResult(number, result.passed, status, generate_seconds, result.seconds,
+                               files, result.output, scripts)
+
+    def run(self, prompt_value: Any) -> Tuple[Optional[CandidateResult], List[CandidateResult]]:
+        """Runs one round of candidates; returns (winner or None, all finished results)."""
+        base, untracked = snapshot_base(self.project_root)
+        cancel = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=self.candidates, thread_name_prefix="agentbee-auto")
+        pending = {
+            executor.submit(self._attempt, number, prompt_value, base, untracked, cancel)
+            for number in range(1, self.candidates + 1)
+        }
+        results: List[CandidateResult] = []
+        winner = None
+        try:
+            while pending and winner is None:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    results.append(result)
+                    if result.passed and winner is None:
+                        winner = result
+        finally:
+            cancel.set()
+            for future in pending:
+                future.cancel()
+            finished, _ = wait(pending, timeout=CANCEL_GRACE_SECONDS)
+            results.extend(f.result() for f in finished if not f.cancelled() and f.exception() is None)
+            # Cancelled tests are killed at once; an in-flight model call cannot be
+            # interrupted, so its worker is left to notice the cancellation and exit.
+            executor.shutdown(wait=False)
+        return winner, results
+
+
+def print_round(iteration: int, results: List[CandidateResult]):
+    print(f"\n📊 Iteration {iteration} candidates:")
+    for result in sorted(results, key=lambda r: r.number):
+        files = ", ".join(result.files) or "-"
+        print(f"  #{result.number}  {result.status:<10} generate {result.generate_seconds:5.1f}s  "
+              f"test {result.test_seconds:5.1f}s  {files}")
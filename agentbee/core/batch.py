@@ -0,0 +1,236 @@
+"""
+Batch assist: many instructions run concurrently against one accumulated
+snapshot. Model calls go through asyncio with a concurrency limit, an
+optional token-bucket rate limit and retries with backoff on rate-limit
+errors. Each task's files are written to their own directory under
+beecode.d, and files written differently by several tasks are reported.
+"""
+import asyncio
+import json
+import random
+import re
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from . import file_io, runner, tracing
+
+# Backoff after a rate-limit error: doubles per attempt from the base, capped, with jitter.
+BASE_BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 60.0
+REPORT_FILE = "batch-report.json"
+
+
+class BatchTask(NamedTuple):
+    task_id: str
+    instructions: str
+
+
+class TaskResult(NamedTuple):
+    task_id: str
+    ok: bool
+    files: List[str]
+    seconds: float
+    retries: int
+    error: Optional[str] = None
+
+
+def load_tasks(path: Path) -> List[BatchTask]:
+    """
+    Reads one task per line: {"instructions": "...", "id": "optional-name"}.
+    Tasks without an id are named after their line number. Ids must be unique
+    since each one names the task's output directory.
+    """
+    tasks = []
+    seen = set()
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{path}:{line_number}: invalid JSON: {e}") from None
+            instructions = record.get("instructions") if isinstance(record, dict) else None
+            if not isinstance(instructions, str) or not instructions.strip():
+                raise ValueError(f"{path}:{line_number}: expected an object with an 'instructions' string")
+            task_id = re.sub(r"[^A-Za-z0-9._-]+", "-", str(record.get("id") or f"task-{line_number}")).strip(".-")
+            if not task_id or task_id in seen:
+                raise ValueError(f"{path}:{line_number}: missing or duplicate task id '{record.get('id')}'")
+            seen.add(task_id)
+            tasks.append(BatchTask(task_id, instructions))
+    return tasks
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, in bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """Whether a provider error is an HTTP 429 / quota error worth retrying."""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status == 429 or getattr(error, "code", None) == 429:
+        return True
+    text = str(error)
+    return "429" in text or "RESOURCE_EXHAUSTED" in text or "rate limit" in text.lower()
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    headers = getattr(error, "headers", None) or getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+async def call_with_retries(ainvoke: Callable[[Any], Awaitable[str]], prompt_value: Any, retries: int,
+                            bucket: Optional[TokenBucket] = None, attempts: Optional[List[int]] = None) -> str:
+    """
+    Calls the model, waiting for the rate limit if any and retrying rate-limit
+    errors with backoff (or the server's Retry-After) up to `retries` times.
+    Each retry is counted in attempts[0] when given.
+    """
+    for attempt in range(retries + 1):
+        if bucket is not None:
+            await bucket.acquire()
+        try:
+            return await ainvoke(prompt_value)
+        except Exception as e:
+            if attempt == retries or not is_rate_limited(e):
+                raise
+            if attempts is not None:
+                attempts[0] += 1
+            delay = _retry_after(e) or min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * 2 ** attempt)
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+    raise AssertionError("unreachable")
+
+
+class BatchRunner:
+    """
+    Runs batch tasks against one snapshot. ainvoke is the model's async call;
+    the prompt, parser and resilient parser are the same ones a single
+    assist run uses.
+    """
+
+    def __init__(
+        self,
+        files: List[Tuple[Path, str]],
+        ainvoke: Callable[[Any], Awaitable[str]],
+        prompt,
+        code_parser,
+        parse,
+        output_dir: Path,
+        max_tokens: Optional[int] = None,
+        concurrency: int = 4,
+        rate: Optional[float] = None,
+        retries: int = 5,
+        path: Optional[Path] = None
+    ):
+        self.files = files
+        self.ainvoke = ainvoke
+        self.prompt = prompt
+        self.format_instructions = code_parser.get_format_instructions()
+        self.parse = parse
+        self.output_dir = output_dir
+        self.max_tokens = max_tokens
+        self.concurrency = concurrency
+        self.rate = rate
+        self.retries = retries
+        self.path = path  # the run's --path, which limits index updates to it
+        self.outputs: Dict[str, Dict[str, str]] = {}  # task id -> {relative path: content}
+
+    async def _run_task(self, task: BatchTask, files: List[Tuple[Path, str]], semaphore: asyncio.Semaphore,
+                        bucket: Optional[TokenBucket]) -> TaskResult:
+        retries = [0]
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                with tracing.get_tracer().span(f"task:{task.task_id}") as counters:
+                    prompt_value = self.prompt.invoke(
+                        runner.format_for_prompt(files, task.instructions, self.format_instructions))
+                    response = await call_with_retries(self.ainvoke, prompt_value, self.retries, bucket, retries)
+                    parsed = await self.parse.ainvoke(response)
+                    written = self._save(task, parsed)
+                    counters.update({"files_written": len(written), "retries": retries[0]})
+            except Exception as e:
+                print(f"🚨 [{task.task_id}] failed: {e}")
+                return TaskResult(task.task_id, False, [], time.perf_counter() - start, retries[0], str(e))
+        seconds = time.perf_counter() - start
+        print(f"✅ [{task.task_id}] {len(written)} file(s) in {seconds:.1f}s"
+              + (f" after {retries[0]} retr{'y' if retries[0] == 1 else 'ies'}" if retries[0] else ""))
+        return TaskResult(task.task_id, True, written, seconds, retries[0])
+
+    def _save(self, task: BatchTask, parsed) -> List[str]:
+        project_root = self.output_dir.parent
+        outputs = {}
+        with file_io.WriteSession(self.output_dir / task.task_id, verbose=False) as session:
+            for script in parsed.root:
+                relative_path = runner.resolve_output_path(script.file_path, project_root)
+                file_io.contained_path(session.base_dir, relative_path)
+                session.add(relative_path, script.code_content)
+                outputs[relative_path.as_posix()] = script.code_content
+        self.outputs[task.task_id] = outputs
+        return sorted(outputs)
+
+    async def run_async(self, tasks: List[BatchTask]) -> List[TaskResult]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        bucket = TokenBucket(self.rate) if self.rate else None
+        # Packing is synchronous, so it is done for every task before any is scheduled.
+        contexts = runner.pack_contexts(self.files, [task.instructions for task in tasks], self.max_tokens, path=self.path)
+        return list(await asyncio.gather(*(
+            self._run_task(task, files, semaphore, bucket) for task, files in zip(tasks, contexts))))
+
+    def run(self, tasks: List[BatchTask]) -> List[TaskResult]:
+        return asyncio.run(self.run_async(tasks))
+
+    def conflicts(self) -> Dict[str, List[str]]:
+        """Files written with different contents by more than one task, mapped to those tasks."""
+        by_path: Dict[str, Dict[str, List[str]]] = {}
+        for task_id, outputs in self.outputs.items():
+            for relative_path, content in outputs.items():
+                by_path.setdefault(relative_path, {}).setdefault(content, []).append(task_id)
+        return {
+            relative_path: sorted(task_id for task_ids in versions.values() for task_id in task_ids)
+            for relative_path, versions in sorted(by_path.items())
+            if len(versions) > 1
+        }
+
+    def write_report(self, results: List[TaskResult], seconds: float) -> Path:
+        """Writes the per-task results and conflicts to beecode.d/batch-report.json."""
+        report = {
+            "seconds": round(seconds, 3),
+            "tasks": [dict(result._asdict(), seconds=round(result.seconds, 3)) for result in results],
+            "conflicts": self.conflicts(),
+        }
+        path = self.output_dir / REPORT_FILE
+        file_io.write_atomic(path, json.dumps(report, indent=2) + "\n")
+        return path
+
+
+def print_summary(results: List[TaskResult], conflicts: Dict[str, List[str]], seconds: float):
+    succeeded = sum(result.ok for result in results)
+    serial = sum(result.seconds for result in results)
+    print(f"\n📊 Batch: {succeeded}/{len(results)} task(s) succeeded in {seconds:.1f}s "
+          f"({serial:.1f}s of task time, {serial / seconds if seconds else 0:.1f}x concurrency)")
+    if conflicts:
+        print(f"⚠️ {len(conflicts)} file(s) were changed differently by several tasks:")
+        for relative_path, task_ids in conflicts.items():
+            print(f"  {relative_path}: {', '.join(task_ids)}")
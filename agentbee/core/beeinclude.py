@@ -0,0 +1,144 @@
+import os
+import re
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+
+class Rule(NamedTuple):
+    pattern: str  # the glob, without '!' or a leading '/'
+    negated: bool
+    anchored: bool  # contains a slash, so it matches from the project root
+    directory_only: bool  # had a trailing slash
+
+
+def parse_rule(line: str) -> Rule:
+    negated = line.startswith('!')
+    if negated:
+        line = line[1:]
+    elif line.startswith('\\!'):
+        line = line[1:]
+    directory_only = line.endswith('/')
+    line = line.strip('/') if directory_only else line
+    anchored = '/' in line.rstrip('/')
+    return Rule(line.lstrip('/'), negated, anchored, directory_only)
+
+
+def glob_to_regex(pattern: str) -> str:
+    """Translates a gitignore-style glob (*, ?, [...], **) into a regex fragment."""
+    out = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith('**/', i):
+            out.append('(?:.*/)?')
+            i += 3
+            continue
+        if pattern.startswith('**', i):
+            out.append('.*')
+            i += 2
+            continue
+        if char == '*':
+            out.append('[^/]*')
+        elif char == '?':
+            out.append('[^/]')
+        elif char == '[':
+            end = pattern.find(']', i + 2)
+            if end == -1:
+                out.append(re.escape(char))
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                out.append(f"[{body.replace(chr(92), chr(92) * 2)}]")
+                i = end
+        elif char == '\\' and i + 1 < len(pattern):
+            out.append(re.escape(pattern[i + 1]))
+            i += 1
+        else:
+            out.append(re.escape(char))
+        i += 1
+    return ''.join(out)
+
+
+def rule_to_regex(rule: Rule) -> str:
+    """A regex matching the relative paths of files the rule applies to, including files under matched directories."""
+    body = glob_to_regex(rule.pattern)
+    prefix = '' if rule.anchored else '(?:.*/)?'
+    suffix = '/.*' if rule.directory_only else '(?:/.*)?'
+    return prefix + body + suffix
+
+
+class IncludeMatcher:
+    """
+    The .beeinclude patterns compiled once into a single regex. Patterns
+    follow gitignore rules: a pattern without a slash matches at any depth,
+    one with a slash is anchored at the project root, `**` spans
+    directories, a trailing `/` matches only directories, and a leading `!`
+    excludes. When several patterns match a path, the last one wins. Without
+    any positive pattern, everything not excluded is included.
+    """
+
+    def __init__(self, patterns: List[str]):
+        self.rules = [parse_rule(p) for p in patterns if p.strip() and not p.startswith('#')]
+        self.include_by_default = not any(not rule.negated for rule in self.rules)
+        # Alternatives are tried in order, so the last rule comes first and wins.
+        alternatives = [
+            f"(?P<r{index}>{rule_to_regex(rule)})"
+            for index, rule in reversed(list(enumerate(self.rules)))
+        ]
+        self._regex = re.compile('|'.join(alternatives), re.DOTALL) if alternatives else None
+
+    def matches(self, relative_path: str) -> bool:
+        """Whether a POSIX path relative to the project root is included."""
+        if self._regex is None:
+            return True
+        match = self._regex.fullmatch(relative_path)
+        if match is None:
+            return self.include_by_default
+        return not self.rules[int(match.lastgroup[1:])].negated
+
+    def filter(self, relative_paths: List[str]) -> List[str]:
+        return [p for p in relative_paths if self.matches(p)]
+
+    def filter_paths(self, paths: List[Path], root: Path) -> List[Path]:
+        """Filters absolute paths under root without touching the filesystem."""
+        prefix = str(root).rstrip(os.sep) + os.sep
+        kept = []
+        for path in paths:
+            text = str(path)
+            relative = text[len(prefix):] if text.startswith(prefix) else path.relative_to(root).as_posix()
+            if os.sep != '/':
+                relative = relative.replace(os.sep, '/')
+            if self.matches(relative):
+                kept.append(path)
+        return kept
+
+    def to_pathspecs(self) -> Optional[List[str]]:
+        """
+        Git pathspecs selecting a superset of the included files, so excluded
+        trees are never listed; the result still has to go through `filter`.
+        Exclusions are only pushed down when no positive pattern follows one,
+        since git's excludes always win. Returns None when nothing can be pushed down.
+        """
+        specs = []
+        seen_negation = False
+        reincluded = False
+        for rule in self.rules:
+            if rule.negated:
+                seen_negation = True
+            elif seen_negation:
+                reincluded = True
+        for rule in self.rules:
+            if rule.negated and reincluded:
+                continue
+            magic = ":(exclude,glob)" if rule.negated else ":(glob)"
+            base = rule.pattern if rule.anchored else f"**/{rule.pattern}"
+            if not rule.directory_only:
+                specs.append(magic + base)
+            specs.append(magic + base + "/**")
+        if not specs:
+            return None
+        if self.include_by_default:
+            # Exclude-only pathspecs need something to exclude from.
+            specs.insert(0, ":(glob)**")
+        return specs
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import subprocess
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+CACHE_DIR = Path(".agentbee") / "cache"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Bump whenever the scrubbing output for an unchanged file can change,
+# so stale entries are never served after an upgrade.
+CACHE_VERSION = 2
+
+
+def get_git_blob_shas(root: Path) -> Dict[Path, str]:
+    """
+    Maps every tracked file to its git blob SHA, leaving out files whose
+    working tree copy differs from the index (their blob SHA would be stale).
+    """
+    try:
+        staged = subprocess.run(
+            ['git', 'ls-files', '-s', '-z'],
+            capture_output=True, text=True, check=True, cwd=root
+        ).stdout
+        modified = subprocess.run(
+            ['git', 'diff', '--name-only', '-z'],
+            capture_output=True, text=True, check=True, cwd=root
+        ).stdout
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return {}
+
+    dirty = {name for name in modified.split('\0') if name}
+    shas = {}
+    for record in staged.split('\0'):
+        if not record:
+            continue
+        # Each record looks like "<mode> <sha> <stage>\t<path>".
+        meta, _, name = record.partition('\t')
+        if name in dirty:
+            continue
+        shas[root / name] = meta.split()[1]
+    return shas
+
+
+class AccumulationCache:
+    """
+    A size-bounded, on-disk LRU cache for the per-file output of
+    `file_io.accumulate_code`, stored under `.agentbee/cache`.
+    """
+
+    def __init__(self, root: Path, use_git: bool = True, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = root / CACHE_DIR
+        self.entries_dir = self.cache_dir / "entries"
+        self.index_path = self.cache_dir / "index.json"
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._blob_shas = get_git_blob_shas(root) if use_git else {}
+        self._index = self._load_index()
+        self._dirty = False
+
+    def _load_index(self) -> Dict[str, List[float]]:
+        """Loads the {entry: [size, last_used]} index, starting over if it is unreadable."""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def key_for(self, file_path: Path, mode: str) -> Optional[str]:
+        """
+        Builds the cache key for a file: its git blob SHA when known, otherwise
+        its mtime, size and inode. Returns None if the file cannot be stat'ed.
+        """
+        sha = self._blob_shas.get(file_path)
+        if sha:
+            return self.key_for_blob(sha, mode)
+        else:
+            try:
+                st = file_path.stat()
+            except OSError:
+                return None
+            raw_key = f"v{CACHE_VERSION}:{mode}:stat:{file_path}:{st.st_mtime_ns}:{st.st_size}:{st.st_ino}"
+        return hashlib.sha256(raw_key.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def key_for_blob(sha: str, mode: str) -> str:
+        """Builds the cache key for a git blob, whether read from disk or from the object store."""
+        raw_key = f"v{CACHE_VERSION}:{mode}:git:{sha}"
+        return hashlib.sha256(raw_key.encode('utf-8')).hexdigest()
+
+    def __contains__(self, key: str) -> bool:
+        """Whether a key has an entry, without reading it or counting a lookup."""
+        return key in self._index
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns the cached content for a key, counting the lookup as a hit or miss."""
+        if key in self._index:
+            try:
+                content = (self.entries_dir / key).read_text(encoding='utf-8')
+            except OSError:
+                del self._index[key]
+            else:
+                self._index[key][1] = time.time()
+                self._dirty = True
+                self.hits += 1
+                return content
+        self.misses += 1
+        return None
+
+    def put(self, key: str, content: str):
+        """Stores content under a key."""
+        data = content.encode('utf-8')
+        try:
+            self.entries_dir.mkdir(parents=True, exist_ok=True)
+            (self.entries_dir / key).write_bytes(data)
+        except OSError as e:
+            print(f"⚠️ Warning: Could not write cache entry: {e}")
+            return
+        self._index[key] = [len(data), time.time()]
+        self._dirty = True
+
+    def save(self):
+        """Evicts least recently used entries beyond the size bound and persists the index."""
+        if not self._dirty:
+            return
+        total = sum(size for size, _ in self._index.values())
+        if total > self.max_bytes:
+            for key, (size, _) in sorted(self._index.items(), key=lambda item: item[1][1]):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(self.entries_dir / key)
+                except OSError:
+                    pass
+                del self._index[key]
+                total -= size
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.index_path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._index, f)
+            os.replace(tmp_path, self.index_path)
+            self._dirty = False
+        except OSError as e:
+            print(f"⚠️ Warning: Could not save cache index: {e}")
+
+    def summary(self) -> str:
+        return f"cache: {self.hits} hit(s), {self.misses} miss(es)"
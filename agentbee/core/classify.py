@@ -0,0 +1,242 @@
+import codecs
+import re
+import subprocess
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, Optional, Tuple
+
+# Only this much of a file is read to decide whether it is text.
+SNIFF_BYTES = 8192
+DEFAULT_MAX_FILE_BYTES = 1024 * 1024
+# A line this long in the first block marks a minified bundle.
+MINIFIED_LINE_CHARS = 1000
+# Only these are minified into long lines; long lines elsewhere (wrapped
+# Markdown paragraphs, SQL dumps) are ordinary content.
+MINIFIABLE_SUFFIXES = {".js", ".mjs", ".cjs", ".css", ".json", ".map", ".svg"}
+
+LOCKFILE_NAMES = {
+    "package-lock.json", "npm-shrinkwrap.json", "yarn.lock", "pnpm-lock.yaml", "bun.lockb",
+    "poetry.lock", "Pipfile.lock", "uv.lock", "pdm.lock", "Cargo.lock", "Gemfile.lock",
+    "composer.lock", "go.sum", "flake.lock", "mix.lock", "pubspec.lock", "Podfile.lock",
+    "packages.lock.json", "gradle.lockfile",
+}
+VENDORED_DIRS = {
+    "node_modules", "bower_components", "vendor", "vendors", "third_party", "third-party",
+    "site-packages", "__pycache__", ".git", ".venv", "venv", ".tox", ".mypy_cache", ".yarn",
+}
+BINARY_SUFFIXES = {
+    ".png", ".jpg", ".jpeg", ".gif", ".bmp", ".ico", ".webp", ".pdf", ".zip", ".gz", ".tgz",
+    ".bz2", ".xz", ".7z", ".tar", ".whl", ".egg", ".jar", ".war", ".class", ".so", ".dll",
+    ".dylib", ".exe", ".o", ".a", ".pyc", ".pyo", ".woff", ".woff2", ".ttf", ".otf", ".eot",
+    ".mp3", ".mp4", ".mov", ".wav", ".sqlite", ".db", ".bin", ".npy", ".pkl", ".parquet",
+}
+MINIFIED_NAME = re.compile(r"[.-]min\.(?:js|css|mjs)$|\.(?:js|css)\.map$")
+# Attributes that mark a file as not worth reading; setting them to false overrides the heuristics.
+GIT_ATTRIBUTES = ("linguist-generated", "linguist-vendored", "binary")
+_UNITS = {"": 1, "b": 1, "k": 1024, "kb": 1024, "m": 1024 ** 2, "mb": 1024 ** 2, "g": 1024 ** 3, "gb": 1024 ** 3}
+
+
+def parse_size(text: str) -> int:
+    """Parses a size like '512K', '2M' or '1048576' into bytes."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([a-zA-Z]*)\s*", text)
+    if not match or match.group(2).lower() not in _UNITS:
+        raise ValueError(f"Invalid size '{text}'. Use a number of bytes or a K, M or G suffix.")
+    return int(float(match.group(1)) * _UNITS[match.group(2).lower()])
+
+
+def format_size(size: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def classify_name(relative_path: str) -> Optional[str]:
+    """The skip reason that follows from a path alone, or None."""
+    path = PurePosixPath(relative_path)
+    if path.name in LOCKFILE_NAMES:
+        return "lockfile"
+    if any(part in VENDORED_DIRS for part in path.parts[:-1]):
+        return "vendored"
+    if MINIFIED_NAME.search(path.name):
+        return "minified"
+    if path.suffix.lower() in BINARY_SUFFIXES:
+        return "binary"
+    return None
+
+
+def sniff(block: bytes, suffix: str = "") -> Optional[str]:
+    """
+    The skip reason that follows from the first block of a file, or None.
+    NUL bytes mean binary. Otherwise the block is probed as UTF-8 (a
+    multibyte character cut at the end of the block is fine); text that is
+    not UTF-8 is still accepted unless it is mostly control bytes. Files
+    with a MINIFIABLE_SUFFIXES suffix are minified when a line is too long.
+    """
+    if b"\0" in block:
+        return "binary"
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(block, final=False)
+    except UnicodeDecodeError:
+        control = sum(1 for byte in block if byte < 32 and byte not in b"\t\n\r\f\b\x1b")
+        if control > len(block) // 10:
+            return "binary"
+    # A final partial line is still a line that long, so it counts too.
+    if suffix.lower() in MINIFIABLE_SUFFIXES and any(len(line) > MINIFIED_LINE_CHARS for line in block.split(b"\n")):
+        return "minified"
+    return None
+
+
+def git_attribute_overrides(root: Path, relative_paths: List[str]) -> Dict[str, Optional[str]]:
+    """
+    Maps paths with a linguist-generated, linguist-vendored or binary
+    attribute to a skip reason, or to None when the attribute is explicitly
+    false (which keeps the file whatever its name looks like). Attributes are
+    read from the working tree's .gitattributes in one `git check-attr` call.
+    """
+    if not relative_paths:
+        return {}
+    try:
+        result = subprocess.run(
+            ['git', 'check-attr', '-z', '--stdin', *GIT_ATTRIBUTES], cwd=root,
+            input="\0".join(relative_paths) + "\0", capture_output=True, text=True, check=True
+        )
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return {}
+    overrides: Dict[str, Optional[str]] = {}
+    fields = result.stdout.split("\0")
+    # Records come as "<path>\0<attribute>\0<value>\0".
+    for name, attribute, value in zip(fields[0::3], fields[1::3], fields[2::3]):
+        if value in ("set", "true"):
+            reason = {"linguist-generated": "generated", "linguist-vendored": "vendored"}.get(attribute, "binary")
+            overrides[name] = reason
+        elif value in ("unset", "false") and attribute != "binary" and name not in overrides:
+            overrides[name] = None
+    return overrides
+
+
+def _sniff_file(file_path: Path) -> Optional[str]:
+    try:
+        with open(file_path, 'rb') as f:
+            return sniff(f.read(SNIFF_BYTES), file_path.suffix)
+    except OSError:
+        return None  # left to the reader, which reports the error
+
+
+class FileClassifier:
+    """
+    Decides which listed files are worth reading before any of them is read.
+    Paths are checked by name (lockfiles, vendored directories, minified or
+    binary suffixes) and git attributes, then by size, and only then is the
+    first block of each remaining file sniffed for binary or minified content.
+    Files past the total size cap are dropped in listing order. Skip counts
+    and the bytes left unread are kept for the summary.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        max_file_bytes: Optional[int] = DEFAULT_MAX_FILE_BYTES,
+        max_total_bytes: Optional[int] = None,
+        detect: bool = True
+    ):
+        self.root = root
+        self.max_file_bytes = max_file_bytes
+        self.max_total_bytes = max_total_bytes
+        self.detect = detect
+        self.skipped: Counter = Counter()
+        self.bytes_skipped = 0
+        self.total_bytes = 0  # admitted so far, against max_total_bytes
+
+    def _relative(self, file_path: Path) -> str:
+        try:
+            return file_path.relative_to(self.root).as_posix()
+        except ValueError:
+            return file_path.as_posix()
+
+    def _skip(self, reason: str, size: int):
+        self.skipped[reason] += 1
+        self.bytes_skipped += max(size, 0)
+
+    def _precheck(self, relative_paths: List[str], sizes: List[int]) -> List[Optional[str]]:
+        """Skip reasons from names, attributes and sizes; no file content is read."""
+        reasons: List[Optional[str]] = [None] * len(relative_paths)
+        overrides = git_attribute_overrides(self.root, relative_paths) if self.detect else {}
+        for i, (name, size) in enumerate(zip(relative_paths, sizes)):
+            if name in overrides:
+                reasons[i] = overrides[name]
+            elif self.detect:
+                reasons[i] = classify_name(name)
+            if reasons[i] is None and self.max_file_bytes is not None and size > self.max_file_bytes:
+                reasons[i] = "oversized"
+        return reasons
+
+    def _admit(self, size: int) -> bool:
+        """Counts a file against the total cap; False once it would be exceeded."""
+        if self.max_total_bytes is not None and self.total_bytes + size > self.max_total_bytes:
+            self._skip("over_total", size)
+            return False
+        self.total_bytes += size
+        return True
+
+    def filter_paths(self, file_paths: List[Path], jobs: int = 1) -> List[Path]:
+        """Returns the files worth reading, in their original order."""
+        sizes = []
+        for file_path in file_paths:
+            try:
+                sizes.append(file_path.stat().st_size)
+            except OSError:
+                sizes.append(0)  # the reader reports it
+        reasons = self._precheck([self._relative(p) for p in file_paths], sizes)
+        to_sniff = [i for i, reason in enumerate(reasons) if reason is None and self.detect]
+        if jobs > 1 and len(to_sniff) > 1:
+            with ThreadPoolExecutor(max_workers=jobs) as readers:
+                sniffed = list(readers.map(_sniff_file, [file_paths[i] for i in to_sniff]))
+        else:
+            sniffed = [_sniff_file(file_paths[i]) for i in to_sniff]
+        for i, reason in zip(to_sniff, sniffed):
+            reasons[i] = reason
+
+        kept = []
+        for file_path, size, reason in zip(file_paths, sizes, reasons):
+            if reason is not None:
+                # Sniffed files had their first block read; the rest of them was not.
+                self._skip(reason, size - (min(size, SNIFF_BYTES) if reason in ("binary", "minified") else 0))
+            elif self._admit(size):
+                kept.append(file_path)
+        return kept
+
+    def filter_blobs(self, entries: List[Tuple[str, int]]) -> List[bool]:
+        """
+        Which (relative path, size) blobs are worth requesting from git. Blobs
+        can only be read whole, so their content is checked with `check_blob`
+        once read; the size caps still keep large blobs from being requested.
+        """
+        reasons = self._precheck([name for name, _ in entries], [size for _, size in entries])
+        keep = []
+        for (_, size), reason in zip(entries, reasons):
+            if reason is not None:
+                self._skip(reason, size)
+                keep.append(False)
+            else:
+                keep.append(self._admit(size))
+        return keep
+
+    def check_blob(self, data: bytes, relative_path: str = "") -> bool:
+        """Whether a blob read from git is text worth keeping."""
+        reason = sniff(data[:SNIFF_BYTES], PurePosixPath(relative_path).suffix) if self.detect else None
+        if reason is not None:
+            self.skipped[reason] += 1
+            self.total_bytes -= len(data)
+            return False
+        return True
+
+    def summary(self) -> Optional[str]:
+        if not self.skipped:
+            return None
+        counts = ", ".join(f"{reason}: {count}" for reason, count in sorted(self.skipped.items()))
+        return (f"Skipped {sum(self.skipped.values())} file(s) ({counts}), "
+                f"{format_size(self.bytes_skipped)} left unread")
+
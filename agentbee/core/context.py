@@ -0,0 +1,212 @@
+import math
+import re
+from collections import Counter, deque
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+# BM25 parameters; the usual defaults work well for source files.
+BM25_K1 = 1.2
+BM25_B = 0.75
+# How much import-graph proximity to a seed file counts against lexical relevance.
+PROXIMITY_WEIGHT = 0.5
+# Number of best lexical matches used as seeds when walking the import graph.
+PROXIMITY_SEEDS = 5
+PROXIMITY_MAX_HOPS = 2
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_IDENT_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_CAMEL_RE = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+
+IMPORT_PATTERNS = [
+    re.compile(r"^\s*from\s+([.\w]+)\s+import", re.MULTILINE),
+    re.compile(r"^\s*from\s+\.+\w*\s+import\s+([\w, ]+)", re.MULTILINE),
+    re.compile(r"^\s*import\s+([.\w]+)", re.MULTILINE),
+    re.compile(r"""(?:from|require\(|import)\s*['"]([^'"]+)['"]"""),
+    re.compile(r"""^\s*#\s*include\s*"([^"]+)\"""", re.MULTILINE),
+    re.compile(r"""^\s*(?:use|mod)\s+([:\w]+)""", re.MULTILINE),
+]
+
+
+class FileScore(NamedTuple):
+    path: Path
+    tokens: int
+    lexical: float
+    proximity: float
+    score: float
+    kept: bool
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimates the model token count of text by counting words and punctuation."""
+    return len(_TOKEN_RE.findall(text))
+
+
+def tokenize(text: str) -> List[str]:
+    """Splits text into lowercase search terms, breaking identifiers on case and underscores."""
+    terms = []
+    for ident in _IDENT_RE.findall(text):
+        lowered = ident.lower()
+        terms.append(lowered)
+        parts = [p.lower() for chunk in ident.split('_') for p in _CAMEL_RE.findall(chunk)]
+        if len(parts) > 1:
+            terms.extend(parts)
+    return terms
+
+
+def bm25_scores(documents: List[List[str]], query: List[str]) -> List[float]:
+    """Scores tokenized documents against a tokenized query with Okapi BM25."""
+    if not documents or not query:
+        return [0.0] * len(documents)
+    doc_freq: Counter = Counter()
+    counts = []
+    for terms in documents:
+        tf = Counter(terms)
+        counts.append(tf)
+        doc_freq.update(tf.keys())
+    total_docs = len(documents)
+    avg_len = sum(len(terms) for terms in documents) / total_docs or 1.0
+    query_terms = set(query)
+
+    scores = []
+    for terms, tf in zip(documents, counts):
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * len(terms) / avg_len)
+        score = 0.0
+        for term in query_terms:
+            freq = tf.get(term)
+            if not freq:
+                continue
+            idf = math.log(1 + (total_docs - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+            score += idf * freq * (BM25_K1 + 1) / (freq + norm)
+        scores.append(score)
+    return scores
+
+
+def _module_keys(path: Path) -> Set[str]:
+    """Names under which other files may import this one."""
+    stem_path = path.with_suffix('')
+    parts = stem_path.parts
+    keys = {path.name, stem_path.name}
+    # Dotted (Python) and slashed (JS/C) suffixes of the path, e.g. core.runner, core/runner.
+    for i in range(max(len(parts) - 3, 0), len(parts)):
+        keys.add('.'.join(parts[i:]))
+        keys.add('/'.join(parts[i:]))
+        keys.add('/'.join(path.parts[i:]))
+    if stem_path.name == '__init__' and len(parts) > 1:
+        keys.add(parts[-2])
+    return keys
+
+
+def find_imports(files: List[Tuple[Path, str]]) -> Dict[int, Set[int]]:
+    """Maps each file to the files it imports, by index."""
+    owners: Dict[str, Set[int]] = {}
+    for i, (path, _) in enumerate(files):
+        for key in _module_keys(path):
+            owners.setdefault(key, set()).add(i)
+
+    imports: Dict[int, Set[int]] = {i: set() for i in range(len(files))}
+    for i, (_, content) in enumerate(files):
+        targets = [t for pattern in IMPORT_PATTERNS for match in pattern.findall(content) for t in match.split(',')]
+        for target in targets:
+            target = target.strip().lstrip('./').replace('::', '.')
+            for candidate in (target, target.rsplit('.', 1)[-1], target.rsplit('/', 1)[-1]):
+                imports[i].update(j for j in owners.get(candidate, ()) if j != i)
+    return imports
+
+
+def build_import_graph(files: List[Tuple[Path, str]]) -> Dict[int, Set[int]]:
+    """Returns an undirected adjacency map between files linked by an import."""
+    graph: Dict[int, Set[int]] = {i: set() for i in range(len(files))}
+    for i, imported in find_imports(files).items():
+        for j in imported:
+            graph[i].add(j)
+            graph[j].add(i)
+    return graph
+
+
+def proximity_scores(graph: Dict[int, Set[int]], seeds: List[int]) -> List[float]:
+    """Scores each file by how few import hops separate it from the nearest seed."""
+    scores = [0.0] * len(graph)
+    distance = {seed: 0 for seed in seeds}
+    queue = deque(seeds)
+    while queue:
+        node = queue.popleft()
+        scores[node] = 1.0 / (1 + distance[node])
+        if distance[node] == PROXIMITY_MAX_HOPS:
+            continue
+        for neighbour in graph[node]:
+            if neighbour not in distance:
+                distance[neighbour] = distance[node] + 1
+                queue.append(neighbour)
+    return scores
+
+
+def rank_files(
+    files: List[Tuple[Path, str]],
+    instructions: str,
+    lexical: Optional[List[float]] = None
+) -> List[Tuple[float, float, float]]:
+    """
+    Returns (score, lexical, proximity) for every file, relative to the instructions.
+    Precomputed lexical scores (e.g. from the persistent index) replace the in-memory BM25 pass.
+    """
+    if lexical is None:
+        query = tokenize(instructions)
+        documents = [tokenize(path.as_posix()) * 3 + tokenize(content) for path, content in files]
+        lexical = bm25_scores(documents, query)
+    top = max(lexical, default=0.0) or 1.0
+    lexical = [score / top for score in lexical]
+
+    # Files named in the instructions are always seeds, followed by the best lexical matches.
+    mentioned = [i for i, (path, _) in enumerate(files) if path.name in instructions]
+    ranked = sorted(range(len(files)), key=lambda i: lexical[i], reverse=True)
+    seeds = mentioned + [i for i in ranked[:PROXIMITY_SEEDS] if lexical[i] > 0 and i not in mentioned]
+    proximity = proximity_scores(build_import_graph(files), seeds)
+
+    results = []
+    for i in range(len(files)):
+        bonus = 1.0 if i in mentioned else 0.0
+        results.append((lexical[i] + PROXIMITY_WEIGHT * proximity[i] + bonus, lexical[i], proximity[i]))
+    return results
+
+
+def pack(
+    files: List[Tuple[Path, str]],
+    instructions: str,
+    max_tokens: Optional[int],
+    lexical: Optional[List[float]] = None
+) -> Tuple[List[Tuple[Path, str]], List[FileScore]]:
+    """
+    Greedily keeps the highest-scoring files whose combined estimated size fits
+    in max_tokens (no limit when None). Kept files stay in their original order
+    and the second return value describes every file, best first.
+    """
+    ranks = rank_files(files, instructions, lexical)
+    sizes = [estimate_tokens(path.as_posix()) + estimate_tokens(content) for path, content in files]
+    order = sorted(range(len(files)), key=lambda i: ranks[i][0], reverse=True)
+
+    kept: Set[int] = set()
+    used = 0
+    for i in order:
+        if max_tokens is None or used + sizes[i] <= max_tokens:
+            kept.add(i)
+            used += sizes[i]
+
+    report = [
+        FileScore(files[i][0], sizes[i], ranks[i][1], ranks[i][2], ranks[i][0], i in kept)
+        for i in order
+    ]
+    return [files[i] for i in sorted(kept)], report
+
+
+def print_report(report: List[FileScore], max_tokens: Optional[int]):
+    """Prints which files were kept or dropped, with their scores and token estimates."""
+    kept_tokens = sum(entry.tokens for entry in report if entry.kept)
+    dropped = [entry for entry in report if not entry.kept]
+    budget = f"{max_tokens:,}" if max_tokens is not None else "unlimited"
+    print(f"\n🧮 Context: {len(report) - len(dropped)} kept, {len(dropped)} dropped, "
+          f"~{kept_tokens:,} tokens (budget: {budget})")
+    print(f"  {'':4} {'score':>6} {'lex':>5} {'prox':>5} {'tokens':>8}  file")
+    for entry in report:
+        status = "keep" if entry.kept else "drop"
+        print(f"  {status:4} {entry.score:6.2f} {entry.lexical:5.2f} {entry.proximity:5.2f} "
+              f"{entry.tokens:8,}  {entry.path.as_posix()}")
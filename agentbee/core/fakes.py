@@ -0,0 +1,119 @@
+"""
+Offline stand-ins for the model providers, so AgentBee's chains can be
+exercised without network access or API keys.
+"""
+import asyncio
+import itertools
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Iterator, List, Union
+
+
+class FakeStreamingModel:
+    """
+    Replays canned responses, either all at once (`invoke`) or in fixed-size
+    chunks with a delay between them (`stream`), like a streaming LLM client.
+    With several responses, each call returns the next one in turn. latency
+    adds a fixed wait to every call, like a round trip to a remote provider.
+    """
+
+    model_name = "fake"
+
+    def __init__(self, responses: Union[str, List[str]], chunk_size: int = 16, delay: float = 0.01,
+                 latency: float = 0.0):
+        self.responses = [responses] if isinstance(responses, str) else list(responses)
+        self.chunk_size = chunk_size
+        self.delay = delay
+        self.latency = latency
+        self._cycle = itertools.cycle(self.responses)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: Path, **kwargs) -> "FakeStreamingModel":
+        """Loads one response from a file, or one per file (in name order) from a directory."""
+        if path.is_dir():
+            files = sorted(p for p in path.iterdir() if p.is_file())
+            return cls([p.read_text(encoding='utf-8') for p in files], **kwargs)
+        return cls(path.read_text(encoding='utf-8'), **kwargs)
+
+    @property
+    def response(self) -> str:
+        return self.responses[0]
+
+    def _next_response(self) -> str:
+        with self._lock:
+            return next(self._cycle)
+
+    def _generation_seconds(self, response: str) -> float:
+        return self.latency + self.delay * len(response) / self.chunk_size
+
+    def invoke(self, prompt: Any) -> str:
+        response = self._next_response()
+        time.sleep(self._generation_seconds(response))
+        return response
+
+    async def ainvoke(self, prompt: Any) -> str:
+        response = self._next_response()
+        await asyncio.sleep(self._generation_seconds(response))
+        return response
+
+    def stream(self, prompt: Any) -> Iterator[str]:
+        response = self._next_response()
+        time.sleep(self.latency)
+        for start in range(0, len(response), self.chunk_size):
+            time.sleep(self.delay)
+            yield response[start:start + self.chunk_size]
+
+
+class ScriptedModel:
+    """
+    Answers every call with script(prompt text), so a harness can reply
+    according to what it was asked, e.g. differently to map and reduce
+    prompts. latency adds a fixed wait to every call; the prompts are kept
+    in `prompts`, and `max_in_flight` records the most concurrent calls.
+    """
+
+    model_name = "scripted"
+
+    def __init__(self, script: Callable[[str], str], latency: float = 0.0):
+        self.script = script
+        self.latency = latency
+        self.prompts: List[str] = []
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def _respond(self, prompt: Any) -> str:
+        text = prompt.to_string() if hasattr(prompt, "to_string") else str(prompt)
+        with self._lock:
+            self.prompts.append(text)
+        return self.script(text)
+
+    def _enter(self):
+        with self._lock:
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+
+    def _exit(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def invoke(self, prompt: Any) -> str:
+        self._enter()
+        try:
+            time.sleep(self.latency)
+            return self._respond(prompt)
+        finally:
+            self._exit()
+
+    async def ainvoke(self, prompt: Any) -> str:
+        self._enter()
+        try:
+            await asyncio.sleep(self.latency)
+            return self._respond(prompt)
+        finally:
+            self._exit()
+
+    def stream(self, prompt: Any) -> Iterator[str]:
+        yield self.invoke(prompt)
@@ -1,93 +1,319 @@
 import json
+import os
 import re
+import stat
 import subprocess
+import threading
 from pathlib import Path
-from typing import List, Union, Dict, Any
-from . import accumulator
-
-COMMENT_PATTERNS = {
-    '.py': ['#'], '.sh': ['#'], '.js': ['//'], '.ts': ['//'], '.java': ['//'], '.c': ['//'], 
-    '.cpp': ['//'], '.h': ['//'], '.hpp': ['//'], '.go': ['//'], '.rs': ['//'], '.swift': ['//'],
-    '.kt': ['//'], '.php': ['//', '#'], '.rb': ['#'], '.pl': ['#'], '.lua': ['--'], '.sql': ['--']
-}
-
-MULTI_LINE_COMMENT_DELIMITERS = {
-    '.c': ('/*', '*/'), '.cpp': ('/*', '*/'), '.h': ('/*', '*/'), '.hpp': ('/*', '*/'),
-    '.java': ('/*', '*/'), '.js': ('/*', '*/'), '.ts': ('/*', '*/'), '.go': ('/*', '*/'),
-    '.cs': ('/*', '*/'), '.swift': ('/*', '*/'), '.php': ('/*', '*/'), '.rs': ('/*', '*/'),
-    '.sql': ('/*', '*/'),
-    '.py': [('"""', '"""'), ("'''", "'''")]
-}
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Callable, List, Union, Dict, Any, Iterable, Iterator, Optional, Tuple
+from . import accumulator, lexer, outline, patch
+from .cache import AccumulationCache
+
+# Files are processed in windows so results can be emitted in order without
+# keeping every file of a large repository in flight at once.
+WINDOW_FILES = 512
+# Minimum size of a batch sent to a scrub worker; small files are grouped so
+# they don't pay the inter-process round trip one by one.
+SCRUB_BATCH_BYTES = 256 * 1024
+# Generated files are saved here, relative to the project root.
+BEECODE_DIR = "beecode.d"
+# Writes are I/O bound, so a handful of threads is enough to overlap them.
+WRITE_JOBS = 8
+
+def write_atomic(path: Path, content: str) -> bool:
+    """
+    Writes content to path through a temporary file and a rename, so readers
+    never see a partial file. An existing file keeps its permissions. Returns
+    False, without writing, when the file already holds exactly this content.
+    """
+    data = content.encode('utf-8')
+    try:
+        existing = path.stat()
+        if existing.st_size == len(data) and path.read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        existing = None
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    # Created with the default mode (subject to the umask), like a plain open().
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        if existing is not None:
+            os.chmod(tmp_path, stat.S_IMODE(existing.st_mode))
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return True
+
+class WriteSession:
+    """
+    Collects the files of one model response and writes them together under
+    base_dir: atomically, skipping files whose content is unchanged, and in
+    parallel. Used as a context manager, it flushes on a clean exit.
+    """
+
+    def __init__(self, base_dir: Path, jobs: int = WRITE_JOBS, verbose: bool = True):
+        self.base_dir = base_dir
+        self.jobs = jobs
+        self.verbose = verbose
+        self._pending: Dict[Path, str] = {}
+
+    def add(self, relative_path: Path, content: str):
+        # A later write to the same path replaces an earlier one.
+        self._pending[Path(relative_path)] = content
+
+    def flush(self) -> Tuple[List[Path], List[Path]]:
+        """Writes the pending files; returns (written, unchanged) paths."""
+        targets = [(self.base_dir / rel, content) for rel, content in self._pending.items()]
+        self._pending = {}
+        if self.jobs > 1 and len(targets) > 1:
+            with ThreadPoolExecutor(max_workers=min(self.jobs, len(targets))) as writers:
+                changed = list(writers.map(lambda target: write_atomic(*target), targets))
+        else:
+            changed = [write_atomic(path, content) for path, content in targets]
+        written = [path for (path, _), was_written in zip(targets, changed) if was_written]
+        unchanged = [path for (path, _), was_written in zip(targets, changed) if not was_written]
+        if self.verbose:
+            for path in written:
+                print(f"\n🎉 Successfully Created: {path}")
+            if unchanged:
+                print(f"\n➖ Skipped {len(unchanged)} unchanged file(s)")
+        return written, unchanged
+
+    def __enter__(self) -> "WriteSession":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
 
 def save_code_to_beecode(relative_path: Path, code_content: str):
     """Saves code to a specific path inside the .beecode.d directory."""
-    prefix_dir = "beecode.d"
     project_dir = accumulator.get_project_root()
     
-    # Construct the full path for saving the file
-    full_save_path = project_dir / prefix_dir / relative_path
+    # Construct the full path for saving the file, refusing one that escapes .beecode.d
+    full_save_path = contained_path(project_dir / BEECODE_DIR, relative_path)
     
-    # Create the parent directory if it doesn't exist
-    full_save_path.parent.mkdir(parents=True, exist_ok=True)
-    
-    # Write the code to the file
-    full_save_path.write_text(code_content, encoding='utf-8')
-    print(f"\n🎉 Successfully Created: {full_save_path}")
+    # Write the code atomically, leaving identical files untouched
+    if write_atomic(full_save_path, code_content):
+        print(f"\n🎉 Successfully Created: {full_save_path}")
+    else:
+        print(f"\n➖ Unchanged: {full_save_path}")
 
-def accumulate_code(file_paths: List[Path], scrub_comments: bool) -> str:
-    """Accumulates code from multiple files, optionally scrubbing comments."""
-    code_accumulation = []
-    print(f"📚 Accumulating code from {len(file_paths)} file(s)...")
-    
-    for file_path in file_paths:
+def read_text(file_path: Path) -> str:
+    """Reads a file as text the way accumulation expects, ignoring undecodable bytes."""
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        return f.read()
+
+def transform_code(content: str, file_ext: str, scrub_comments: bool, outlined: bool = False) -> str:
+    """
+    Turns a file's content into what is accumulated: its outline when asked
+    for and the language has one, otherwise the content, optionally scrubbed.
+    """
+    if outlined:
+        result = outline.outline(content, file_ext)
+        if result is not None:
+            return result
+    return lexer.scrub(content, file_ext) if scrub_comments else content
+
+def cache_mode(scrub_comments: bool, outlined: bool = False) -> str:
+    """The cache mode of a file's accumulated form, so outlines and full files are cached apart."""
+    mode = "scrub" if scrub_comments else "raw"
+    return f"outline-{mode}" if outlined else mode
+
+def read_code(file_path: Path, scrub_comments: bool, outlined: bool = False) -> str:
+    """Reads a single file, optionally scrubbing comments or reducing it to its outline."""
+    return transform_code(read_text(file_path), file_path.suffix.lower(), scrub_comments, outlined)
+
+def _read_or_error(file_path: Path) -> Union[str, Exception]:
+    try:
+        return read_text(file_path)
+    except Exception as e:
+        return e
+
+def _scrub_batch(batch: List[Tuple[str, str, bool, bool]]) -> List[Union[str, Exception]]:
+    """Transforms a batch of (extension, content, scrub_comments, outlined) inside a worker process."""
+    results = []
+    for file_ext, content, scrub_comments, outlined in batch:
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-                code_accumulation.append(f"\n--- FILE: {file_path.as_posix()} ---\n")
-                
-                if scrub_comments:
-                    file_ext = file_path.suffix.lower()
-                    
-                    # Handle multi-line comments
-                    ml_delims = MULTI_LINE_COMMENT_DELIMITERS.get(file_ext)
-                    if ml_delims:
-                        delimiter_pairs = ml_delims if isinstance(ml_delims, list) else [ml_delims]
-                        for start_delim, end_delim in delimiter_pairs:
-                            while True:
-                                start_idx = content.find(start_delim)
-                                if start_idx == -1:
-                                    break
-                                end_idx = content.find(end_delim, start_idx + len(start_delim))
-                                if end_idx == -1:
-                                    break 
-                                content = content[:start_idx] + content[end_idx + len(end_delim):]
-
-                    # Handle single-line comments
-                    sl_markers = COMMENT_PATTERNS.get(file_ext, [])
-                    if sl_markers:
-                        lines = content.split('\n')
-                        uncommented_lines = []
-                        for line in lines:
-                            stripped_line = line.strip()
-                            if any(stripped_line.startswith(marker) for marker in sl_markers):
-                                continue
-                            uncommented_lines.append(line)
-                        content = "\n".join(uncommented_lines)
-
-                code_accumulation.append(content)
+            results.append(transform_code(content, file_ext, scrub_comments, outlined))
         except Exception as e:
-            print(f"⚠️ Warning: Could not read file {file_path}: {e}")
+            results.append(e)
+    return results
+
+def _process_window(
+    window: List[Path],
+    scrub_comments: bool,
+    cache: Optional[AccumulationCache],
+    readers: ThreadPoolExecutor,
+    scrubbers: Optional[ProcessPoolExecutor],
+    outlined: List[bool]
+) -> List[Union[str, Exception]]:
+    """
+    Produces the content (or the error) for every file in a window: cache hits
+    are served directly, misses are read on the thread pool and scrubbed or
+    outlined on the process pool in size-bounded batches.
+    """
+    results: List[Union[str, Exception, None]] = [None] * len(window)
+    keys: List[Optional[str]] = [None] * len(window)
+    misses = []
+    for i, file_path in enumerate(window):
+        keys[i] = cache.key_for(file_path, cache_mode(scrub_comments, outlined[i])) if cache else None
+        content = cache.get(keys[i]) if keys[i] else None
+        if content is None:
+            misses.append(i)
+        else:
+            results[i] = content
+
+    batches, batch, batch_bytes = [], [], 0
+    for i, content in zip(misses, readers.map(_read_or_error, [window[i] for i in misses])):
+        results[i] = content
+        if not (scrub_comments or outlined[i]) or isinstance(content, Exception):
+            continue
+        batch.append(i)
+        batch_bytes += len(content)
+        if batch_bytes >= SCRUB_BATCH_BYTES:
+            batches.append(batch)
+            batch, batch_bytes = [], 0
+    if batch:
+        batches.append(batch)
+
+    if scrubbers:
+        futures = [
+            scrubbers.submit(_scrub_batch, [(window[i].suffix.lower(), results[i], scrub_comments, outlined[i])
+                                          for i in batch])
+            for batch in batches
+        ]
+        for batch, future in zip(batches, futures):
+            for i, content in zip(batch, future.result()):
+                results[i] = content
 
+    for i in misses:
+        if keys[i] and not isinstance(results[i], Exception):
+            cache.put(keys[i], results[i])
+    return results
+
+def format_file_header(file_path: Path) -> str:
+    """Returns the marker that precedes each file's content in accumulated code."""
+    return f"\n--- FILE: {file_path.as_posix()} ---\n"
+
+def iter_accumulated_code(
+    file_paths: List[Path],
+    scrub_comments: bool,
+    cache: Optional[AccumulationCache] = None,
+    jobs: int = 1,
+    outlined: Optional[Callable[[Path], bool]] = None
+) -> Iterator[Tuple[Path, str]]:
+    """
+    Yields (path, content) for each readable file, optionally scrubbing comments.
+    Files for which `outlined` returns True are reduced to their outline.
+    When a cache is given, only files missing from it are read and scrubbed.
+    With jobs > 1, files are read on a thread pool and scrubbed on a process
+    pool; the output is identical to the serial path.
+    """
+    print(f"📚 Accumulating code from {len(file_paths)} file(s)...")
+    outlines = [bool(outlined and outlined(file_path)) for file_path in file_paths]
+    
+    try:
+        if jobs > 1:
+            # Workers started with spawn re-import the lexer, so languages registered at runtime are handed over.
+            scrub_pool = (ProcessPoolExecutor(max_workers=jobs, initializer=lexer.install_languages,
+                                              initargs=(lexer.registered_languages(),))
+                          if scrub_comments or any(outlines) else nullcontext())
+            with ThreadPoolExecutor(max_workers=jobs) as readers, scrub_pool as scrubbers:
+                for start in range(0, len(file_paths), WINDOW_FILES):
+                    window = file_paths[start:start + WINDOW_FILES]
+                    results = _process_window(window, scrub_comments, cache, readers, scrubbers,
+                                              outlines[start:start + WINDOW_FILES])
+                    for file_path, content in zip(window, results):
+                        if isinstance(content, Exception):
+                            print(f"⚠️ Warning: Could not read file {file_path}: {content}")
+                            continue
+                        yield file_path, content
+        else:
+            for file_path, outline_file in zip(file_paths, outlines):
+                try:
+                    key = cache.key_for(file_path, cache_mode(scrub_comments, outline_file)) if cache else None
+                    content = cache.get(key) if key else None
+                    if content is None:
+                        content = read_code(file_path, scrub_comments, outline_file)
+                        if key:
+                            cache.put(key, content)
+                except Exception as e:
+                    print(f"⚠️ Warning: Could not read file {file_path}: {e}")
+                    continue
+                yield file_path, content
+    finally:
+        if cache:
+            cache.save()
+
+def join_code(chunks: Iterable[Tuple[Path, str]]) -> str:
+    """Concatenates (path, content) chunks into the accumulated code string."""
+    code_accumulation = []
+    for file_path, content in chunks:
+        code_accumulation.append(format_file_header(file_path))
+        code_accumulation.append(content)
     return "".join(code_accumulation)
 
-# def apply_patch(patch_content: str, root: Path) -> subprocess.CompletedProcess:
-#     """Applies a git patch to the codebase."""
-#     print("Applying patch...")
-#     return subprocess.run(
-#         ['git', 'apply', '--ignore-whitespace'],
-#         input=patch_content, text=True, cwd=root,
-#         capture_output=True
-#     )
+def accumulate_code(
+    file_paths: List[Path],
+    scrub_comments: bool,
+    cache: Optional[AccumulationCache] = None,
+    jobs: int = 1,
+    outlined: Optional[Callable[[Path], bool]] = None
+) -> str:
+    """Accumulates code from multiple files into a single string."""
+    return join_code(iter_accumulated_code(file_paths, scrub_comments, cache=cache, jobs=jobs, outlined=outlined))
+
+def contained_path(root: Path, relative_path: Path) -> Path:
+    """
+    Joins relative_path onto root, resolving '..' and symlinks, and raises
+    ValueError when the result falls outside root.
+    """
+    return contained_paths(root, [relative_path])[0]
+
+def contained_paths(root: Path, relative_paths: Iterable[Path]) -> List[Path]:
+    """contained_path for several paths under one root, resolving the root only once."""
+    resolved_root = root.resolve()
+    targets = []
+    for relative_path in relative_paths:
+        target = (resolved_root / relative_path).resolve()
+        try:
+            target.relative_to(resolved_root)
+        except ValueError:
+            raise ValueError(f"{relative_path} is outside {root}") from None
+        targets.append(target)
+    return targets
+
+def apply_patch(relative_path: Path, patch_texts: Union[str, List[str]], in_place: bool = False) -> Path:
+    """
+    Applies model-generated patches for one project file, in order, each to
+    the result of the previous one. The result is saved inside the beecode.d
+    directory, or over the original file when in_place. Raises
+    patch.PatchError if a patch does not apply cleanly or the path is
+    outside the project root.
+    """
+    if isinstance(patch_texts, str):
+        patch_texts = [patch_texts]
+    project_dir = accumulator.get_project_root()
+    try:
+        source_path = contained_path(project_dir, relative_path)
+    except ValueError as e:
+        raise patch.PatchError(str(e)) from None
+    patched = source_path.read_text(encoding='utf-8') if source_path.exists() else None
+    for patch_text in patch_texts:
+        patched = patch.apply_patch_text(patched, patch_text)
+    if not in_place:
+        save_code_to_beecode(relative_path, patched)
+        return project_dir / BEECODE_DIR / relative_path
+    write_atomic(source_path, patched)
+    print(f"\n🩹 Successfully Patched: {source_path}")
+    return source_path
 
 # def revert_patch(root: Path):
 #     """Reverts all changes in the git repository."""
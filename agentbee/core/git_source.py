@@ -0,0 +1,204 @@
+import subprocess
+import threading
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from . import beeinclude, context, file_io
+from .cache import AccumulationCache
+from .classify import FileClassifier
+from .file_io import read_text
+
+
+class BlobEntry(NamedTuple):
+    path: str  # relative to the project root, POSIX style
+    sha: str
+    size: int = -1  # in bytes, when listed with sizes
+
+
+def _git(root: Path, args: List[str]) -> str:
+    return subprocess.run(['git', *args], cwd=root, capture_output=True, text=True, check=True).stdout
+
+
+def list_blobs(root: Path, rev: str, path: Optional[Path] = None,
+               include_patterns: Optional[List[str]] = None) -> List[BlobEntry]:
+    """Lists the files of a commit (optionally under path) with their blob SHAs and sizes."""
+    args = ['ls-tree', '-r', '-l', '-z', '--full-tree', rev]
+    if path is not None:
+        args += ['--', Path(path).as_posix()]
+    entries = []
+    for record in _git(root, args).split('\0'):
+        if not record:
+            continue
+        # Each record looks like "<mode> <type> <sha> <size>\t<path>"; submodules are commits.
+        meta, _, name = record.partition('\t')
+        _, object_type, sha, size = meta.split()
+        if object_type == 'blob':
+            entries.append(BlobEntry(name, sha, int(size)))
+    if include_patterns:
+        matcher = beeinclude.IncludeMatcher(include_patterns)
+        entries = [entry for entry in entries if matcher.matches(entry.path)]
+    return entries
+
+
+def changed_paths(root: Path, base: str, rev: Optional[str] = None) -> List[str]:
+    """
+    Files added or modified since base: up to rev, or in the working tree
+    (committed or not) when rev is None. Deleted files are left out.
+    """
+    args = ['diff', '--name-only', '-z', '--no-renames', '--diff-filter=d', base]
+    if rev is not None:
+        args.append(rev)
+    return [name for name in _git(root, args).split('\0') if name]
+
+
+def find_importers(root: Path, changed: List[str], rev: Optional[str] = None) -> List[str]:
+    """
+    Files that directly import one of the changed files. `git grep` narrows
+    the search to files mentioning a changed module's name; only those are
+    read and checked with the import patterns from `context`.
+    """
+    if not changed:
+        return []
+    stems = sorted({Path(name).stem for name in changed if Path(name).stem != '__init__'} |
+                   {Path(name).parent.name for name in changed if Path(name).stem == '__init__'})
+    args = ['grep', '-l', '-z', '-F', '-I']
+    for stem in stems:
+        args += ['-e', stem]
+    if rev is not None:
+        args.append(rev)
+    result = subprocess.run(['git', *args], cwd=root, capture_output=True, text=True)
+    if result.returncode not in (0, 1):  # 1 means no matches
+        raise subprocess.CalledProcessError(result.returncode, ['git', *args], result.stdout, result.stderr)
+    prefix = f"{rev}:" if rev is not None else ""
+    candidates = [name[len(prefix):] for name in result.stdout.split('\0') if name]
+    changed_set = set(changed)
+    candidates = [name for name in candidates if name not in changed_set]
+    if not candidates:
+        return []
+
+    contents = read_paths(root, changed + candidates, rev)
+    files = [(Path(name), content) for name, content in zip(changed + candidates, contents)]
+    imports = context.find_imports(files)
+    changed_indexes = set(range(len(changed)))
+    return [
+        candidates[i - len(changed)]
+        for i in range(len(changed), len(files))
+        if imports[i] & changed_indexes
+    ]
+
+
+def read_paths(root: Path, names: List[str], rev: Optional[str]) -> List[str]:
+    """Reads files from rev, or from the working tree when rev is None."""
+    if rev is None:
+        return [read_text(root / name) for name in names]
+    with CatFileBatch(root) as batch:
+        return [_decode(data) for data in batch.iter_contents(f"{rev}:{name}" for name in names)]
+
+
+def _decode(data: Optional[bytes]) -> str:
+    # Same leniency as reading from disk: undecodable bytes are dropped.
+    return data.decode('utf-8', errors='ignore') if data is not None else ""
+
+
+class CatFileBatch:
+    """
+    One long-lived `git cat-file --batch` process. Object names are written
+    from a background thread while contents are read back in order, so any
+    number of blobs stream through a single process without deadlocking.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.process = subprocess.Popen(
+            ['git', 'cat-file', '--batch'], cwd=root,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        self._writer: Optional[threading.Thread] = None
+
+    def _write(self, names: List[str]):
+        try:
+            for name in names:
+                self.process.stdin.write(name.encode('utf-8') + b'\n')
+            self.process.stdin.flush()
+        except (BrokenPipeError, ValueError):
+            pass  # the reader stopped early and closed the process
+
+    def iter_contents(self, object_names: Iterable[str]) -> Iterator[Optional[bytes]]:
+        """Yields the content of each object in order, or None for a missing one."""
+        names = list(object_names)
+        self._writer = threading.Thread(target=self._write, args=(names,), daemon=True)
+        self._writer.start()
+        stdout = self.process.stdout
+        for _ in names:
+            header = stdout.readline().split()
+            if len(header) != 3:  # "<name> missing" (or ambiguous)
+                yield None
+                continue
+            data = stdout.read(int(header[2]))
+            stdout.read(1)  # the newline after each object
+            yield data
+        self._writer.join()
+        self._writer = None
+
+    def read(self, object_name: str) -> Optional[bytes]:
+        """Reads a single object on its own, outside any batch in progress."""
+        result = subprocess.run(['git', 'cat-file', 'blob', object_name], cwd=self.root, capture_output=True)
+        return result.stdout if result.returncode == 0 else None
+
+    def close(self):
+        if self._writer is not None:
+            # Stopped mid-batch: the writer may be blocked on a full pipe, so kill git first.
+            self.process.kill()
+            self._writer.join()
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+        self.process.wait()
+        self.process.stdout.close()
+
+    def __enter__(self) -> "CatFileBatch":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_blob_code(
+    root: Path,
+    entries: List[BlobEntry],
+    scrub_comments: bool,
+    cache: Optional[AccumulationCache] = None,
+    classifier: Optional[FileClassifier] = None,
+    outlined: Optional[Callable[[Path], bool]] = None
+) -> Iterator[Tuple[Path, str]]:
+    """
+    Yields (path, content) for each blob, like `file_io.iter_accumulated_code`
+    but read through one cat-file process. Blobs already in the cache (keyed
+    by blob SHA, shared with working-tree accumulation) are not requested.
+    Blobs read from git that the classifier finds binary are left out.
+    """
+    print(f"📚 Accumulating code from {len(entries)} blob(s)...")
+    outlines = [bool(outlined and outlined(root / entry.path)) for entry in entries]
+    keys = [cache.key_for_blob(entry.sha, file_io.cache_mode(scrub_comments, outline_file)) if cache else None
+            for entry, outline_file in zip(entries, outlines)]
+    # Only membership is checked up front; cached contents are read as they are yielded.
+    in_cache = [bool(cache) and key in cache for key in keys]
+    try:
+        with CatFileBatch(root) as batch:
+            blobs = batch.iter_contents(entry.sha for entry, hit in zip(entries, in_cache) if not hit)
+            for entry, key, hit, outline_file in zip(entries, keys, in_cache, outlines):
+                content = cache.get(key) if hit else None
+                if content is None:
+                    # A cached entry can vanish between the check and the read.
+                    data = next(blobs) if not hit else batch.read(entry.sha)
+                    if classifier and data is not None and not classifier.check_blob(data, entry.path):
+                        continue
+                    content = file_io.transform_code(_decode(data), Path(entry.path).suffix.lower(),
+                                                     scrub_comments, outline_file)
+                    if cache:
+                        cache.put(key, content)
+                yield root / entry.path, content
+    finally:
+        if cache:
+            cache.save()
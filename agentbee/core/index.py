@@ -0,0 +1,238 @@
+import json
+import math
+import sqlite3
+import subprocess
+from collections import Counter
+from itertools import groupby
+from operator import itemgetter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from . import accumulator, context, file_io
+
+INDEX_DIR = Path(".agentbee") / "index"
+INDEX_FILE = "index.db"
+# Terms or files looked up per statement, well under SQLite's limit on parameters.
+QUERY_PARAMETERS_PER_STATEMENT = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY, path TEXT UNIQUE, length INTEGER);
+CREATE TABLE IF NOT EXISTS terms (id INTEGER PRIMARY KEY, term TEXT UNIQUE);
+CREATE TABLE IF NOT EXISTS postings (
+    term_id INTEGER, file_id INTEGER, tf INTEGER,
+    PRIMARY KEY (term_id, file_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_by_file ON postings (file_id);
+"""
+
+
+def _git(root: Path, *args: str) -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', *args], capture_output=True, text=True, check=True, cwd=root
+        ).stdout
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+
+class CodeIndex:
+    """
+    A persistent inverted index over the identifiers and words of the files
+    returned by `accumulator.get_file_paths`, stored in `.agentbee/index`.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        index_dir = root / INDEX_DIR
+        index_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = index_dir / INDEX_FILE
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.executescript(SCHEMA)
+        self._term_ids: Optional[Dict[str, int]] = None
+
+    @staticmethod
+    def exists(root: Path) -> bool:
+        return (root / INDEX_DIR / INDEX_FILE).exists()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def relative_path(self, file_path: Path) -> str:
+        try:
+            return file_path.relative_to(self.root).as_posix()
+        except ValueError:
+            return file_path.as_posix()
+
+    def _term_id_map(self) -> Dict[str, int]:
+        if self._term_ids is None:
+            self._term_ids = dict(self.conn.execute("SELECT term, id FROM terms"))
+        return self._term_ids
+
+    def _remove(self, rel_paths: Iterable[str]):
+        for rel_path in rel_paths:
+            row = self.conn.execute("SELECT id FROM files WHERE path = ?", (rel_path,)).fetchone()
+            if row:
+                self.conn.execute("DELETE FROM postings WHERE file_id = ?", row)
+                self.conn.execute("DELETE FROM files WHERE id = ?", row)
+
+    def _add(self, file_paths: Iterable[Path]) -> int:
+        """Tokenizes and indexes files, returning how many were indexed."""
+        term_ids = self._term_id_map()
+        count = 0
+        for file_path in file_paths:
+            try:
+                terms = context.tokenize(file_path.as_posix() + "\n" + file_io.read_text(file_path))
+            except OSError as e:
+                print(f"⚠️ Warning: Could not index file {file_path}: {e}")
+                continue
+            rel_path = self.relative_path(file_path)
+            row = self.conn.execute("SELECT id FROM files WHERE path = ?", (rel_path,)).fetchone()
+            if row is None:
+                file_id = self.conn.execute(
+                    "INSERT INTO files (path, length) VALUES (?, ?)", (rel_path, len(terms))
+                ).lastrowid
+            else:
+                # Already indexed: replace its postings rather than assume the file is new.
+                file_id = row[0]
+                self.conn.execute("DELETE FROM postings WHERE file_id = ?", (file_id,))
+                self.conn.execute("UPDATE files SET length = ? WHERE id = ?", (len(terms), file_id))
+            postings = []
+            for term, tf in Counter(terms).items():
+                term_id = term_ids.get(term)
+                if term_id is None:
+                    term_id = term_ids[term] = self.conn.execute(
+                        "INSERT INTO terms (term) VALUES (?)", (term,)
+                    ).lastrowid
+                postings.append((term_id, file_id, tf))
+            self.conn.executemany("INSERT INTO postings (term_id, file_id, tf) VALUES (?, ?, ?)", postings)
+            count += 1
+        return count
+
+    def _record_state(self):
+        """Remembers the indexed commit and the files that were dirty relative to it."""
+        self._set_meta("commit", (_git(self.root, 'rev-parse', 'HEAD') or '').strip())
+        dirty = _git(self.root, 'diff', '--name-only', '--no-renames', '-z', 'HEAD') or ''
+        self._set_meta("dirty", json.dumps([name for name in dirty.split('\0') if name]))
+
+    def build(self, file_paths: List[Path]) -> int:
+        """Rebuilds the index from scratch."""
+        with self.conn:
+            self.conn.execute("DELETE FROM postings")
+            self.conn.execute("DELETE FROM files")
+            self.conn.execute("DELETE FROM terms")
+            self._term_ids = {}
+            count = self._add(file_paths)
+            self._record_state()
+        return count
+
+    def update(self, file_paths: List[Path], scope: Optional[str] = None) -> Tuple[int, int]:
+        """
+        Re-tokenizes only the files changed since the last indexed commit
+        (plus any that were dirty back then), and drops files that no longer
+        exist. Falls back to a full build when there is no usable history.
+        With a scope (a relative directory or file), file_paths only list
+        that part of the project, and the rest of the index is left alone.
+        Returns (files re-indexed, files removed).
+        """
+        last_commit = self._get_meta("commit")
+        changed = _git(self.root, 'diff', '--name-only', '--no-renames', '-z', last_commit) if last_commit else None
+        if changed is None:
+            return self.build(file_paths), 0
+
+        candidates: Set[str] = {name for name in changed.split('\0') if name}
+        candidates.update(json.loads(self._get_meta("dirty") or "[]"))
+        current = {self.relative_path(p): p for p in file_paths}
+        indexed = {row[0] for row in self.conn.execute("SELECT path FROM files")}
+        if scope is not None:
+            in_scope = lambda name: name == scope or name.startswith(scope + '/')
+            candidates = {name for name in candidates if in_scope(name)}
+            indexed = {name for name in indexed if in_scope(name)}
+        # Files that entered or left the selection (e.g. via .beeinclude) count as changed too.
+        candidates.update(set(current) ^ indexed)
+
+        with self.conn:
+            self._remove(candidates & indexed)
+            reindexed = self._add(current[name] for name in sorted(candidates) if name in current)
+            self._record_state()
+        removed = len((candidates & indexed) - set(current))
+        return reindexed, removed
+
+    def query(self, text: str, limit: Optional[int] = 20) -> List[Tuple[str, float]]:
+        """Returns (relative path, BM25 score) pairs for the best matches, best first."""
+        total_docs, avg_len = self.conn.execute("SELECT COUNT(*), AVG(length) FROM files").fetchone()
+        if not total_docs:
+            return []
+        avg_len = avg_len or 1.0
+
+        # All postings of all query terms come back in one statement (per chunk of terms).
+        terms = sorted(set(context.tokenize(text)))
+        scores: Dict[int, float] = {}
+        for start in range(0, len(terms), QUERY_PARAMETERS_PER_STATEMENT):
+            chunk = terms[start:start + QUERY_PARAMETERS_PER_STATEMENT]
+            rows = self.conn.execute(
+                "SELECT p.term_id, p.file_id, p.tf, f.length FROM terms t "
+                "JOIN postings p ON p.term_id = t.id JOIN files f ON f.id = p.file_id "
+                f"WHERE t.term IN ({', '.join('?' * len(chunk))}) ORDER BY p.term_id", chunk
+            ).fetchall()
+            for _, group in groupby(rows, key=itemgetter(0)):
+                postings = list(group)
+                df = len(postings)
+                idf = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+                for _, file_id, tf, length in postings:
+                    norm = context.BM25_K1 * (1 - context.BM25_B + context.BM25_B * length / avg_len)
+                    scores[file_id] = scores.get(file_id, 0.0) + idf * tf * (context.BM25_K1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        if limit is not None:
+            ranked = ranked[:limit]
+        paths: Dict[int, str] = {}
+        for start in range(0, len(ranked), QUERY_PARAMETERS_PER_STATEMENT):
+            chunk = [file_id for file_id, _ in ranked[start:start + QUERY_PARAMETERS_PER_STATEMENT]]
+            paths.update(self.conn.execute(
+                f"SELECT id, path FROM files WHERE id IN ({', '.join('?' * len(chunk))})", chunk))
+        return [(paths[file_id], score) for file_id, score in ranked]
+
+    def size_bytes(self) -> int:
+        return self.db_path.stat().st_size
+
+
+def path_scope(root: Path, path_option: Optional[Path]) -> Optional[str]:
+    """
+    The part of the project a --path selects, relative to the root, or None
+    for all of it. The path is taken relative to the root, as get_file_paths does.
+    """
+    if path_option is None:
+        return None
+    try:
+        relative = (root / path_option).resolve().relative_to(root.resolve()).as_posix()
+    except ValueError:
+        return None
+    return None if relative == '.' else relative
+
+
+def open_updated(root: Path, path_option: Optional[Path] = None) -> CodeIndex:
+    """
+    Opens the project index, bringing it up to date with the working tree
+    first; with a path, only files under it are listed and brought up to date.
+    """
+    file_paths = accumulator.get_file_paths(root, path_option)
+    index = CodeIndex(root)
+    if index._get_meta("commit") is None:
+        index.build(file_paths)
+    else:
+        index.update(file_paths, path_scope(root, path_option))
+    return index
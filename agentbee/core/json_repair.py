@@ -0,0 +1,193 @@
+import json
+import re
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+STATS_FILE = Path(".agentbee") / "parse_stats.json"
+
+_FENCE_LINE = re.compile(r"[ \t]*```[\w-]*[ \t]*")
+_KEY_START = re.compile(r'"[\w-]+"\s*:')
+# After a string closes an array or object, what may follow that closer.
+_AFTER_CLOSER = ',]}'
+_VALID_ESCAPES = set('"\\/bfnrtu')
+_CONTROL_ESCAPES = {'\n': '\\n', '\r': '\\r', '\t': '\\t', '\b': '\\b', '\f': '\\f'}
+
+
+def _closes_string(text: str, pos: int, is_key: bool, container: str) -> bool:
+    """
+    Whether the quote at pos plausibly ends the current string, given where
+    the string sits: an object key ends before a colon; a value ends before
+    its container's closer (itself followed by another closer, a comma or
+    the end) or before a comma leading into the next key or element. So a
+    `{"a": 1}` or `f("x", y)` inside a code string does not end it early.
+    """
+    rest = text[pos + 1:pos + 256].lstrip()
+    if not rest:
+        return True
+    if is_key:
+        return rest[0] == ':'
+    if not container:
+        return True
+    if rest[0] == container:
+        after = rest[1:].lstrip()
+        return not after or after[0] in _AFTER_CLOSER
+    if rest[0] != ',':
+        return False
+    rest = rest[1:].lstrip()
+    if container == '}':
+        return not rest or rest[0] == '}' or bool(_KEY_START.match(rest))
+    return not rest or rest[0] in '"{[]-0123456789tfn'
+
+
+def _repair_text(text: str) -> str:
+    """
+    Rewrites common model mistakes in one pass: raw newlines and control
+    characters inside strings, unescaped quotes and invalid escapes inside
+    strings, trailing commas, and unclosed strings, arrays or objects.
+    """
+    out: List[str] = []
+    stack: List[str] = []
+    in_string = False
+    is_key = False
+    i = 0
+    length = len(text)
+    while i < length:
+        char = text[i]
+        if in_string:
+            if char == '\\':
+                nxt = text[i + 1] if i + 1 < length else ''
+                if nxt and nxt in _VALID_ESCAPES:
+                    out.append(text[i:i + 2])
+                    i += 2
+                    continue
+                out.append('\\\\')
+            elif char == '"':
+                if _closes_string(text, i, is_key, stack[-1] if stack else ''):
+                    in_string = False
+                    out.append(char)
+                else:
+                    out.append('\\"')
+            elif char in _CONTROL_ESCAPES:
+                out.append(_CONTROL_ESCAPES[char])
+            elif ord(char) < 0x20:
+                out.append(f'\\u{ord(char):04x}')
+            else:
+                out.append(char)
+        elif char == '"':
+            in_string = True
+            # In an object, a string right after '{' or ',' is a key.
+            previous = next((c for c in reversed(out) if not c.isspace()), '')
+            is_key = bool(stack) and stack[-1] == '}' and previous in ('{', ',')
+            out.append(char)
+        elif char in '[{':
+            stack.append(']' if char == '[' else '}')
+            out.append(char)
+        elif char in ']}':
+            _drop_trailing_comma(out)
+            if stack and stack[-1] == char:
+                stack.pop()
+                out.append(char)
+            # A stray closer with no matching opener is dropped.
+        else:
+            out.append(char)
+        i += 1
+
+    if in_string:
+        out.append('"')
+    while stack:
+        _drop_trailing_comma(out)
+        out.append(stack.pop())
+    return ''.join(out)
+
+
+def _drop_trailing_comma(out: List[str]):
+    j = len(out) - 1
+    while j >= 0 and out[j].isspace():
+        j -= 1
+    if j >= 0 and out[j] == ',':
+        del out[j]
+
+
+def _strip_outer_fence(model_response: str) -> str:
+    """Drops a fence line opening and one closing the whole response."""
+    lines = model_response.strip().split('\n')
+    if lines and _FENCE_LINE.fullmatch(lines[0]):
+        lines = lines[1:]
+    if lines and _FENCE_LINE.fullmatch(lines[-1]):
+        lines = lines[:-1]
+    return '\n'.join(lines).strip()
+
+
+def repair(model_response: str) -> str:
+    """
+    Deterministically repairs a model response into a JSON array of code
+    outputs, raising ValueError when it cannot. A Markdown fence around the
+    whole output and a {"scripts": [...]} wrapper are removed; fences inside
+    the JSON belong to the generated files and are kept.
+    """
+    text = _strip_outer_fence(model_response)
+    start = min((pos for pos in (text.find('['), text.find('{')) if pos != -1), default=-1)
+    if start == -1:
+        raise ValueError("No JSON array or object found in the model output.")
+    repaired = _repair_text(text[start:])
+    try:
+        parsed, _ = json.JSONDecoder().raw_decode(repaired)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Could not repair JSON: {e}") from e
+
+    if isinstance(parsed, dict):
+        parsed = parsed.get('scripts', [parsed])
+    if not isinstance(parsed, list):
+        raise ValueError("Repaired JSON is not a list of code outputs.")
+    return json.dumps(parsed)
+
+
+class TierStats:
+    """
+    Records how often each parsing tier succeeds and how long it takes,
+    accumulated across runs in `.agentbee/parse_stats.json`.
+    """
+
+    def __init__(self, root: Path):
+        self.stats_path = root / STATS_FILE
+        self.run: Dict[str, Dict[str, float]] = {}
+
+    def track(self, name: str, invoke: Callable[[Any], Any]) -> Callable[[Any], Any]:
+        """Wraps a tier so its attempts, successes and latency are recorded."""
+        def tracked(value: Any) -> Any:
+            entry = self.run.setdefault(name, {"attempts": 0, "successes": 0, "seconds": 0.0})
+            entry["attempts"] += 1
+            start = time.perf_counter()
+            try:
+                result = invoke(value)
+            finally:
+                entry["seconds"] += time.perf_counter() - start
+            entry["successes"] += 1
+            return result
+        return tracked
+
+    def save(self):
+        """Merges this run's numbers into the persisted totals."""
+        if not self.run:
+            return
+        try:
+            totals = json.loads(self.stats_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            totals = {}
+        for name, entry in self.run.items():
+            total = totals.setdefault(name, {"attempts": 0, "successes": 0, "seconds": 0.0})
+            for field, value in entry.items():
+                total[field] = total.get(field, 0) + value
+        try:
+            self.stats_path.parent.mkdir(parents=True, exist_ok=True)
+            self.stats_path.write_text(json.dumps(totals, indent=2), encoding='utf-8')
+        except OSError as e:
+            print(f"⚠️ Warning: Could not save parse stats: {e}")
+
+    def summary(self) -> str:
+        parts = []
+        for name, entry in self.run.items():
+            ok = "ok" if entry["successes"] else "failed"
+            parts.append(f"{name} {ok} in {entry['seconds'] * 1000:.0f}ms")
+        return "parse tiers: " + ", ".join(parts)
@@ -0,0 +1,255 @@
+import ast
+import re
+from typing import Dict, NamedTuple, Optional, Pattern, Set, Tuple
+
+
+class Language(NamedTuple):
+    """Lexical rules needed to find comments without touching string literals."""
+    line_comments: Tuple[str, ...] = ()
+    block_comments: Tuple[Tuple[str, str], ...] = ()
+    # Quote characters whose literals may contain backslash escapes.
+    strings: Tuple[str, ...] = ('"', "'")
+    # Quote characters whose literals may span lines (e.g. JS template literals).
+    multiline_strings: Tuple[str, ...] = ()
+    # Triple-quoted strings, dropped when they are the docstring of a module, class or def.
+    docstrings: Tuple[str, ...] = ()
+    # Whether block comments nest, as in Rust and Swift.
+    nested_blocks: bool = False
+    # Whether "'" only delimits single-character literals (Rust lifetimes use a bare "'").
+    char_literals: bool = False
+    # Whether line comments must follow whitespace, as "#" does in shell and Perl.
+    word_bound_comments: bool = False
+    # Whether '/' after an operator or '(' opens a regex literal, as in JS.
+    regex_literals: bool = False
+
+
+C_STYLE = Language(line_comments=('//',), block_comments=(('/*', '*/'),))
+
+LANGUAGES: Dict[str, Language] = {
+    '.py': Language(line_comments=('#',), docstrings=('"""', "'''")),
+    '.sh': Language(line_comments=('#',), word_bound_comments=True),
+    '.rb': Language(line_comments=('#',)),
+    '.pl': Language(line_comments=('#',), word_bound_comments=True),
+    '.c': C_STYLE, '.cpp': C_STYLE, '.h': C_STYLE, '.hpp': C_STYLE,
+    '.java': C_STYLE, '.cs': C_STYLE, '.kt': C_STYLE,
+    '.js': C_STYLE._replace(multiline_strings=('`',), regex_literals=True),
+    '.ts': C_STYLE._replace(multiline_strings=('`',), regex_literals=True),
+    '.go': C_STYLE._replace(strings=('"', "'"), multiline_strings=('`',)),
+    '.rs': C_STYLE._replace(strings=('"',), nested_blocks=True, char_literals=True),
+    '.swift': C_STYLE._replace(strings=('"',), nested_blocks=True),
+    '.php': Language(line_comments=('//', '#'), block_comments=(('/*', '*/'),)),
+    '.lua': Language(line_comments=('--',), block_comments=(('--[[', ']]'),)),
+    '.sql': Language(line_comments=('--',), block_comments=(('/*', '*/'),), strings=("'", '"')),
+}
+
+_compiled: Dict[str, Pattern] = {}
+# Everything passed to register_language, to be replayed in worker processes.
+_registered: Dict[str, Language] = {}
+# A regex literal is told apart from division by what precedes it: an
+# operator, an opening bracket or a keyword. That is only looked behind at,
+# so a '{' or ';' before the literal stays a token for the outline walk.
+_REGEX_LITERAL = (r'(?:(?<=[(,=:\[!&|?{};])|(?<=\breturn)|(?<=\btypeof))[ \t]*'
+                  r'/(?![/*])(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[A-Za-z]*')
+_STRING_PREFIXES = 'rRuUbBfF'
+# Whitespace from a position up to and including the end of its line.
+_BLANK_TO_LINE_END = re.compile(r'[^\S\n]*(?:\n|\Z)')
+
+
+def register_language(file_ext: str, language: Language):
+    """Adds or replaces the lexical rules used for a file extension."""
+    LANGUAGES[file_ext] = language
+    _registered[file_ext] = language
+    _compiled.pop(file_ext, None)
+
+
+def registered_languages() -> Dict[str, Language]:
+    """The languages registered at runtime, which worker processes need handed to them."""
+    return dict(_registered)
+
+
+def install_languages(languages: Dict[str, Language]):
+    """
+    Registers languages inside a worker process. Workers started with the
+    spawn method re-import this module and only see the built-in table.
+    """
+    for file_ext, language in languages.items():
+        register_language(file_ext, language)
+
+
+def _string_regex(quote: str, multiline: bool) -> str:
+    q = re.escape(quote)
+    stop = q + r'\\' if multiline else q + r'\\\n'
+    # An unterminated single-line literal runs to the end of the line.
+    close = q if multiline else f'(?:{q}|$)'
+    return f'{q}[^{stop}]*(?:\\\\.[^{stop}]*)*{close}'
+
+
+def string_regex(language: Language) -> str:
+    """A regex fragment matching any string literal of the language, or '' if it has none."""
+    strings = []
+    for quote in language.multiline_strings:
+        strings.append(_string_regex(quote, multiline=True))
+    for quote in language.strings:
+        strings.append(_string_regex(quote, multiline=False))
+    if language.char_literals:
+        strings.append(r"'(?:[^'\\\n]|\\.)'")
+    if language.regex_literals:
+        strings.append(_REGEX_LITERAL)
+    return '|'.join(strings)
+
+
+def _build_pattern(language: Language) -> Pattern:
+    """Compiles one alternation matching every token the scrubber cares about."""
+    branches = []
+    if language.docstrings:
+        docs = '|'.join(f'{re.escape(d)}.*?{re.escape(d)}' for d in language.docstrings)
+        branches.append(f'(?P<doc>{docs})')
+    if language.block_comments:
+        if language.nested_blocks:
+            opens = '|'.join(re.escape(start) for start, _ in language.block_comments)
+            branches.append(f'(?P<nested>{opens})')
+        else:
+            blocks = '|'.join(f'{re.escape(start)}.*?{re.escape(end)}' for start, end in language.block_comments)
+            branches.append(f'(?P<block>{blocks})')
+    line_markers = sorted(language.line_comments, key=len, reverse=True)
+    if line_markers:
+        markers = '|'.join(re.escape(m) for m in line_markers)
+        guard = r'(?<!\S)' if language.word_bound_comments else ''
+        branches.append(f'(?P<line>{guard}(?:{markers})[^\\n]*)')
+    strings = string_regex(language)
+    if strings:
+        branches.append(f'(?P<string>{strings})')
+    return re.compile('|'.join(branches), re.DOTALL | re.MULTILINE)
+
+
+def _get_pattern(file_ext: str) -> Optional[Pattern]:
+    pattern = _compiled.get(file_ext)
+    if pattern is None:
+        language = LANGUAGES.get(file_ext)
+        if language is None:
+            return None
+        pattern = _compiled[file_ext] = _build_pattern(language)
+    return pattern
+
+
+def _nested_comment_end(content: str, pos: int, start: str, end: str) -> int:
+    """Returns the index just past the block comment opened at pos, honouring nesting."""
+    depth = 0
+    while True:
+        next_open = content.find(start, pos)
+        next_close = content.find(end, pos)
+        if next_close == -1:
+            return -1
+        if next_open != -1 and next_open < next_close:
+            depth += 1
+            pos = next_open + len(start)
+        else:
+            depth -= 1
+            pos = next_close + len(end)
+            if depth == 0:
+                return pos
+
+
+def _python_docstrings(content: str) -> Optional[Set[int]]:
+    """
+    The offsets of the opening quotes of every docstring that can be dropped:
+    the first statement of a module, or of a class or def with more to its
+    body (so the body stays valid). None when the source does not parse.
+    """
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError):
+        return None
+    # ast reports positions as (line, UTF-8 byte column).
+    lines = content.split('\n')
+    line_offsets = [0]
+    for line in lines:
+        line_offsets.append(line_offsets[-1] + len(line) + 1)
+    offsets = set()
+    for node in ast.walk(tree):
+        if not isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        body = node.body
+        if not body or (len(body) == 1 and not isinstance(node, ast.Module)):
+            continue
+        first = body[0]
+        if not (isinstance(first, ast.Expr) and isinstance(first.value, ast.Constant)
+                and isinstance(first.value.value, str)):
+            continue
+        prefix = lines[first.lineno - 1].encode('utf-8')[:first.col_offset]
+        offset = line_offsets[first.lineno - 1] + len(prefix.decode('utf-8', errors='ignore'))
+        while offset < len(content) and content[offset] in _STRING_PREFIXES:
+            offset += 1
+        offsets.add(offset)
+    return offsets
+
+
+def _line_start_after(content: str, start: int, end: int, line_start: int) -> int:
+    """The start of the line a token spanning content[start:end] ends on."""
+    newline = content.rfind('\n', start, end)
+    return line_start if newline == -1 else newline + 1
+
+
+def scrub(content: str, file_ext: str) -> str:
+    """
+    Removes comments (and Python docstrings) from content in a single pass.
+    String literals are skipped over, so comment markers inside them survive.
+    Lines left holding nothing but a comment are dropped entirely.
+    """
+    pattern = _get_pattern(file_ext)
+    if pattern is None:
+        return content
+    language = LANGUAGES[file_ext]
+    docstrings: Optional[Set[int]] = set()
+    if language.docstrings and any(d in content for d in language.docstrings):
+        # Only ast knows whether a triple-quoted string is a docstring or data.
+        docstrings = _python_docstrings(content) if file_ext == '.py' else None
+
+    pieces = []
+    emitted = 0  # content[:emitted] has already been copied or dropped
+    pos = 0
+    length = len(content)
+    # The start of the current line, and whether it holds only whitespace up
+    # to `scanned`. Kept up to date as the scan advances, so a long line is
+    # not searched again for every comment on it.
+    line_start = 0
+    blank_so_far = True
+    scanned = 0
+    while pos < length:
+        match = pattern.search(content, pos)
+        if match is None:
+            break
+        kind = match.lastgroup
+        start, end = match.span()
+        newline = content.rfind('\n', scanned, start)
+        if newline != -1:
+            line_start = newline + 1
+            blank_so_far = not content[line_start:start].strip()
+        elif blank_so_far:
+            blank_so_far = not content[scanned:start].strip()
+
+        if kind == 'nested':
+            open_delim, close_delim = language.block_comments[0]
+            end = _nested_comment_end(content, start, open_delim, close_delim)
+            if end == -1:
+                break
+        if kind == 'string' or (kind == 'doc' and (docstrings is None or start not in docstrings or not blank_so_far)):
+            # Strings, and triple-quoted strings that are not a docstring on their own line, are kept.
+            pos = max(end, start + 1)
+        else:
+            rest = _BLANK_TO_LINE_END.match(content, end)
+            if line_start >= emitted and blank_so_far and rest is not None:
+                # The comment has the line to itself, so the whole line goes.
+                pieces.append(content[emitted:line_start])
+                emitted = rest.end()
+            else:
+                before = content[emitted:start]
+                pieces.append(before.rstrip(' \t') if kind == 'line' else before)
+                emitted = end
+            pos = max(emitted, end)
+        line_start = _line_start_after(content, start, end, line_start)
+        blank_so_far = False
+        scanned = end
+
+    pieces.append(content[emitted:])
+    return ''.join(pieces)
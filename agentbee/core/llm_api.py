@@ -1,15 +1,41 @@
-from typing import Dict
-import json
+import os
+from pathlib import Path
 
-# from langchain_google_genai import GoogleGenerativeAI
-# from langchain_ollama import ChatOllama
-from pydantic import SecretStr
 from .. import config
+from .fakes import FakeStreamingModel
 
-def get_api_key() -> SecretStr:
+# Point this at a file holding a canned model response to run the chain offline.
+FAKE_RESPONSE_ENV = "AGENTBEE_FAKE_RESPONSE"
+# Seconds of latency the fake model adds to every call, e.g. to measure concurrency.
+FAKE_LATENCY_ENV = "AGENTBEE_FAKE_LATENCY"
+
+def using_fake_model() -> bool:
+    return bool(os.environ.get(FAKE_RESPONSE_ENV))
+
+def is_configured() -> bool:
+    """Whether a coding model is available: the fake one, or at least one configured endpoint."""
+    if using_fake_model():
+        return True
     try:
-        cfg =config.load_config()
-        return SecretStr(cfg['llm_api_key'])
-    except Exception as e:
-        print(f"🚨 API Error: {e}")
-        raise
+        return bool(config.load_router_config().coding)
+    except ValueError as e:
+        print(f"🚨 Configuration error: {e}")
+        return False
+
+def get_coding_model(temperature: float):
+    """
+    Returns the code generation model: a router over the endpoints in the
+    config file, or a fake model when AGENTBEE_FAKE_RESPONSE is set. Either
+    way it has invoke, stream and ainvoke, and a model_name for the response cache.
+    """
+    if using_fake_model():
+        latency = float(os.environ.get(FAKE_LATENCY_ENV) or 0)
+        return FakeStreamingModel.from_file(Path(os.environ[FAKE_RESPONSE_ENV]), latency=latency)
+    from .providers import get_router
+    return get_router(temperature)
+
+def get_fixer_model():
+    """Returns the model that repairs malformed JSON output, as a runnable for the fixer chain."""
+    from langchain_core.runnables import RunnableLambda
+    from .providers import get_fixer
+    return RunnableLambda(get_fixer().invoke)
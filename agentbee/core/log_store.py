@@ -0,0 +1,245 @@
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import struct
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; gzip is always available.
+    zstandard = None
+
+DEFAULT_MAX_SEGMENT_BYTES = 4 * 1024 * 1024
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_MAX_AGE_SECONDS = 30 * 24 * 3600
+# Appends between prunes; a prune walks every blob, so it is not done on each one.
+PRUNE_EVERY = 50
+
+# One fixed-width index record per entry id: segment number, offset, length.
+# Entry n lives at byte (n - 1) * INDEX_RECORD.size, so lookups never scan.
+INDEX_RECORD = struct.Struct("<iQI")
+
+
+def _segment_name(number: int) -> str:
+    return f"entries-{number:06d}.jsonl"
+
+
+class LogStore:
+    """
+    An append-only store of run logs. Entries are JSON lines in rotating
+    segment files; accumulated file contents, snapshot manifests and model
+    responses are compressed blobs addressed by their SHA-256, so identical
+    content is stored once however many runs log it.
+    """
+
+    def __init__(self, log_dir: Path, max_segment_bytes: int = DEFAULT_MAX_SEGMENT_BYTES,
+                 max_bytes: int = DEFAULT_MAX_BYTES, max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS):
+        self.log_dir = log_dir
+        self.blob_dir = log_dir / "blobs"
+        self.index_path = log_dir / "index.bin"
+        self.max_segment_bytes = max_segment_bytes
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+
+    # --- Blobs ---
+
+    def _blob_paths(self, sha: str) -> List[Path]:
+        base = self.blob_dir / sha[:2] / sha
+        return [base.with_suffix(".zst"), base.with_suffix(".gz")]
+
+    def put_blob(self, data: Union[str, bytes]) -> str:
+        """Stores data once under its SHA-256 and returns the hash."""
+        raw = data.encode("utf-8") if isinstance(data, str) else data
+        sha = hashlib.sha256(raw).hexdigest()
+        zst_path, gz_path = self._blob_paths(sha)
+        if zst_path.exists() or gz_path.exists():
+            return sha
+        if zstandard is not None:
+            path, compressed = zst_path, zstandard.ZstdCompressor().compress(raw)
+        else:
+            path, compressed = gz_path, gzip.compress(raw, compresslevel=6)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + f".{os.getpid()}.tmp")
+        tmp_path.write_bytes(compressed)
+        os.replace(tmp_path, path)
+        return sha
+
+    def read_blob(self, sha: str) -> str:
+        zst_path, gz_path = self._blob_paths(sha)
+        if zst_path.exists():
+            if zstandard is None:
+                raise RuntimeError("This blob is zstd-compressed; install 'zstandard' to read it.")
+            raw = zstandard.ZstdDecompressor().decompress(zst_path.read_bytes())
+        elif gz_path.exists():
+            raw = gzip.decompress(gz_path.read_bytes())
+        else:
+            raise FileNotFoundError(f"Log blob {sha[:12]} has been pruned.")
+        return raw.decode("utf-8")
+
+    # --- Entries ---
+
+    def count(self) -> int:
+        """The id of the newest entry (ids start at 1)."""
+        try:
+            return self.index_path.stat().st_size // INDEX_RECORD.size
+        except FileNotFoundError:
+            return 0
+
+    def _current_segment(self, rotate: bool = False) -> int:
+        """
+        The segment the next entry goes to, rotating once the newest one is
+        full, or when asked to (as long as it holds anything).
+        """
+        count = self.count()
+        if not count:
+            return 1
+        # The newest entry's segment is never pruned, so it is still on disk.
+        segment, offset, length = self._index_record(count)
+        return segment + 1 if rotate or offset + length >= self.max_segment_bytes else segment
+
+    def _index_record(self, entry_id: int) -> Tuple[int, int, int]:
+        with open(self.index_path, "rb") as index_file:
+            index_file.seek((entry_id - 1) * INDEX_RECORD.size)
+            return INDEX_RECORD.unpack(index_file.read(INDEX_RECORD.size))
+
+    def append(
+        self,
+        accumulated_code: Union[str, Iterable[Tuple[Path, str]]],
+        response_data: Optional[str] = None,
+        error_message: Optional[str] = None,
+        command: Optional[str] = None
+    ) -> int:
+        """
+        Records one run and returns its entry id. File contents are stored as
+        blobs while the chunks are consumed, so the code is never held whole;
+        an error raised by the chunk iterator is recorded and then re-raised.
+        """
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        # Pruned before this entry's blobs are written, since no segment refers to them yet.
+        rotate = (self.count() + 1) % PRUNE_EVERY == 0 and self.prune()
+        manifest: List[List[str]] = []
+        total_bytes = 0
+        accumulation_error = None
+        if isinstance(accumulated_code, str):
+            if accumulated_code.strip():
+                manifest.append(["", self.put_blob(accumulated_code)])
+                total_bytes = len(accumulated_code.encode("utf-8"))
+        else:
+            try:
+                for file_path, content in accumulated_code:
+                    manifest.append([Path(file_path).as_posix(), self.put_blob(content)])
+                    total_bytes += len(content.encode("utf-8"))
+            except Exception as e:
+                accumulation_error = e
+                error_message = error_message or str(e)
+
+        entry_id = self.count() + 1
+        now = time.time()
+        entry = {
+            "id": entry_id,
+            "time": datetime.datetime.fromtimestamp(now).strftime("%Y-%m-%d %H:%M:%S"),
+            "timestamp": now,
+            "command": command,
+            "status": "error" if error_message else "ok",
+            "error": error_message,
+            "files": len(manifest),
+            "bytes": total_bytes,
+            # Identical snapshots share one manifest blob.
+            "snapshot": self.put_blob(json.dumps(manifest)) if manifest else None,
+            "response": self.put_blob(response_data) if response_data else None,
+        }
+        line = (json.dumps(entry) + "\n").encode("utf-8")
+        segment = self._current_segment(rotate)
+        with open(self.log_dir / _segment_name(segment), "ab") as segment_file:
+            offset = segment_file.tell()
+            segment_file.write(line)
+        # The index record is written last, so a crash never indexes a partial line.
+        with open(self.index_path, "ab") as index_file:
+            index_file.write(INDEX_RECORD.pack(segment, offset, len(line)))
+
+        if accumulation_error:
+            raise accumulation_error
+        return entry_id
+
+    def get(self, entry_id: int) -> Optional[Dict]:
+        """Returns an entry by id in constant time, or None if unknown or pruned."""
+        if not 1 <= entry_id <= self.count():
+            return None
+        segment, offset, length = self._index_record(entry_id)
+        path = self.log_dir / _segment_name(segment)
+        if not path.exists():
+            return None
+        with open(path, "rb") as segment_file:
+            segment_file.seek(offset)
+            return json.loads(segment_file.read(length))
+
+    def last(self) -> Optional[Dict]:
+        return self.get(self.count())
+
+    def list(self, limit: int = 20) -> List[Dict]:
+        """The newest entries first, reading only the last `limit` index records."""
+        entries = []
+        for entry_id in range(self.count(), max(self.count() - limit, 0), -1):
+            entry = self.get(entry_id)
+            if entry is not None:
+                entries.append(entry)
+        return entries
+
+    def snapshot(self, entry: Dict) -> List[Tuple[str, str]]:
+        """The (path, blob sha) pairs of an entry's accumulated code."""
+        if not entry.get("snapshot"):
+            return []
+        return [tuple(pair) for pair in json.loads(self.read_blob(entry["snapshot"]))]
+
+    # --- Rotation ---
+
+    def prune(self) -> bool:
+        """
+        Deletes whole segments that are too old or push the store over its
+        size limit (the newest segment is always kept), then removes blobs
+        no surviving entry refers to. Returns whether the newest segment
+        should be closed so it can go too: the store is still over its size
+        limit, or that segment's first entry is past the age limit.
+        """
+        segments = sorted(self.log_dir.glob("entries-*.jsonl"))
+        if not segments:
+            return False
+        blob_files = [p for p in self.blob_dir.rglob("*") if p.is_file()]
+        total = sum(p.stat().st_size for p in segments + blob_files)
+        cutoff = time.time() - self.max_age_seconds
+        removed = False
+        for segment in segments[:-1]:
+            if segment.stat().st_mtime >= cutoff and total <= self.max_bytes:
+                break
+            total -= segment.stat().st_size
+            segment.unlink()
+            removed = True
+        if removed:
+            self._collect_blobs(blob_files)
+            total = sum(p.stat().st_size for p in self.log_dir.rglob("*") if p.is_file() and p != self.index_path)
+        with open(segments[-1], encoding="utf-8") as newest:
+            first = newest.readline()
+        return total > self.max_bytes or (bool(first) and json.loads(first).get("timestamp", cutoff) < cutoff)
+
+    def _collect_blobs(self, blob_files: List[Path]):
+        live = set()
+        for segment in self.log_dir.glob("entries-*.jsonl"):
+            with open(segment, encoding="utf-8") as segment_file:
+                for line in segment_file:
+                    entry = json.loads(line)
+                    for key in ("snapshot", "response"):
+                        if entry.get(key):
+                            live.add(entry[key])
+                    if entry.get("snapshot"):
+                        live.update(sha for _, sha in self.snapshot(entry))
+        for blob in blob_files:
+            if blob.name.split(".")[0] not in live:
+                blob.unlink()
+
+    def clear(self):
+        shutil.rmtree(self.log_dir, ignore_errors=True)
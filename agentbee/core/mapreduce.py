@@ -0,0 +1,327 @@
+"""
+Map-reduce assist for repositories larger than one model context. The
+accumulated files are split into context-sized shards along directory
+and import boundaries. A concurrent map pass asks each shard which of
+its files must change and why; a reduce pass then generates edits for
+the selected files only, shown whole next to outlines of the files they
+import. The reduce outputs are merged and deduplicated for saving.
+"""
+import asyncio
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from . import batch, context, file_io, outline, parser, runner, tracing
+
+# Tokens kept free in every call for the prompt template around the code.
+PROMPT_OVERHEAD_TOKENS = 1000
+# The per-call budget when --max-tokens is not given.
+DEFAULT_SHARD_TOKENS = 100_000
+
+
+class Selection(NamedTuple):
+    path: Path  # absolute, like the accumulated paths
+    reason: str
+    new: bool  # the file does not exist yet
+
+
+def _file_tokens(path: Path, content: str) -> int:
+    return context.estimate_tokens(file_io.format_file_header(path)) + context.estimate_tokens(content)
+
+
+def plan_shards(files: List[Tuple[Path, str]], max_tokens: int,
+                graph: Optional[Dict[int, Set[int]]] = None) -> List[List[int]]:
+    """
+    Splits files into shards of at most max_tokens estimated tokens, as lists
+    of indices in their original order. A directory's files stay together
+    when they fit. Each shard is then filled with the directories that share
+    the most imports with it, and after those with the next ones in path
+    order. A file larger than the budget gets a shard of its own.
+    """
+    sizes = [_file_tokens(path, content) for path, content in files]
+    by_directory: Dict[Path, List[int]] = {}
+    for i, (path, _) in enumerate(files):
+        by_directory.setdefault(path.parent, []).append(i)
+
+    # Directories larger than a shard are cut into consecutive pieces.
+    pieces: List[List[int]] = []
+    for directory in sorted(by_directory):
+        piece, used = [], 0
+        for i in by_directory[directory]:
+            if piece and used + sizes[i] > max_tokens:
+                pieces.append(piece)
+                piece, used = [], 0
+            piece.append(i)
+            used += sizes[i]
+        pieces.append(piece)
+    piece_sizes = [sum(sizes[i] for i in piece) for piece in pieces]
+
+    piece_of = {i: n for n, piece in enumerate(pieces) for i in piece}
+    links: List[Counter] = [Counter() for _ in pieces]
+    for i, neighbours in (graph if graph is not None else context.build_import_graph(files)).items():
+        for j in neighbours:
+            if piece_of[i] != piece_of[j]:
+                links[piece_of[i]][piece_of[j]] += 1
+
+    shards = []
+    remaining = set(range(len(pieces)))
+    while remaining:
+        first = min(remaining)
+        remaining.remove(first)
+        members, used = [first], piece_sizes[first]
+        affinity = Counter(links[first])
+        while True:
+            fitting = [n for n in remaining if used + piece_sizes[n] <= max_tokens]
+            if not fitting:
+                break
+            best = max(fitting, key=lambda n: (affinity[n], -n))
+            remaining.remove(best)
+            members.append(best)
+            used += piece_sizes[best]
+            affinity.update(links[best])
+        shards.append(sorted(i for n in members for i in pieces[n]))
+    return shards
+
+
+def merge_outputs(shard_outputs: List[List[parser.CodeOutput]], project_root: Path) -> Tuple[List[parser.CodeOutput], List[str]]:
+    """
+    Merges the reduce outputs into one list with one entry per file. Within
+    a shard a later output for a path replaces an earlier one. Across shards
+    the first shard to write a path keeps it. Returns the merged outputs and
+    the paths that several shards wrote differently.
+    """
+    merged: Dict[str, parser.CodeOutput] = {}
+    owner: Dict[str, int] = {}
+    conflicts: List[str] = []
+    for number, outputs in enumerate(shard_outputs):
+        for output in outputs:
+            relative_path = runner.resolve_output_path(output.file_path, project_root).as_posix()
+            if relative_path in owner and owner[relative_path] != number:
+                if merged[relative_path].code_content != output.code_content and relative_path not in conflicts:
+                    conflicts.append(relative_path)
+                continue
+            merged[relative_path] = output
+            owner[relative_path] = number
+    return list(merged.values()), conflicts
+
+
+class MapReduceRunner:
+    """
+    Runs one instruction over a snapshot too large for a single call. ainvoke
+    is the model's async call. Each pass has its own prompt, parser (for the
+    format instructions) and resilient parser. load_full returns the whole
+    content of a selected file when the accumulated files are outlines.
+    """
+
+    def __init__(
+        self,
+        project_root: Path,
+        files: List[Tuple[Path, str]],
+        ainvoke: Callable[[Any], Awaitable[str]],
+        map_prompt,
+        selection_parser,
+        parse_selection,
+        code_prompt,
+        code_parser,
+        parse_code,
+        max_tokens: int = DEFAULT_SHARD_TOKENS,
+        concurrency: int = 4,
+        rate: Optional[float] = None,
+        retries: int = 5,
+        load_full: Optional[Callable[[Path], str]] = None
+    ):
+        self.project_root = project_root
+        self.files = files
+        self.ainvoke = ainvoke
+        self.map_prompt = map_prompt
+        self.selection_format = selection_parser.get_format_instructions()
+        self.parse_selection = parse_selection
+        self.code_prompt = code_prompt
+        self.code_format = code_parser.get_format_instructions()
+        self.parse_code = parse_code
+        self.max_tokens = max_tokens
+        self.concurrency = concurrency
+        self.rate = rate
+        self.retries = retries
+        self.load_full = load_full
+        self._by_path = {self._relative(path): i for i, (path, _) in enumerate(files)}
+        self._imports: Optional[Dict[int, Set[int]]] = None
+
+    def _relative(self, file_path: Any) -> str:
+        return runner.resolve_output_path(str(file_path), self.project_root).as_posix()
+
+    def _budget(self, instructions: str, format_instructions: str) -> int:
+        """The tokens left for code in one call."""
+        overhead = PROMPT_OVERHEAD_TOKENS + context.estimate_tokens(instructions + format_instructions)
+        if overhead >= self.max_tokens:
+            raise ValueError(f"--max-tokens {self.max_tokens:,} leaves no room for code; "
+                             f"the prompt alone needs about {overhead:,} tokens.")
+        return self.max_tokens - overhead
+
+    def _find_imports(self) -> Dict[int, Set[int]]:
+        """Which files each file imports, found once and used for sharding and for the reduce outlines."""
+        if self._imports is None:
+            self._imports = context.find_imports(self.files)
+        return self._imports
+
+    def _import_graph(self) -> Dict[int, Set[int]]:
+        graph: Dict[int, Set[int]] = {i: set() for i in range(len(self.files))}
+        for i, imported in self._find_imports().items():
+            for j in imported:
+                graph[i].add(j)
+                graph[j].add(i)
+        return graph
+
+    async def _call(self, prompt, format_instructions: str, files: List[Tuple[Path, str]], query: str,
+                    parse, semaphore: asyncio.Semaphore, bucket: Optional[batch.TokenBucket]):
+        async with semaphore:
+            prompt_value = prompt.invoke(runner.format_for_prompt(files, query, format_instructions))
+            response = await batch.call_with_retries(self.ainvoke, prompt_value, self.retries, bucket)
+            return await parse.ainvoke(response)
+
+    async def _map_shard(self, number: int, total: int, shard: List[int], instructions: str,
+                         semaphore: asyncio.Semaphore, bucket: Optional[batch.TokenBucket]) -> Optional[List[Selection]]:
+        """Asks one shard which files must change; None if the call failed."""
+        files = [self.files[i] for i in shard]
+        start = time.perf_counter()
+        try:
+            with tracing.get_tracer().span(f"map:{number}") as counters:
+                parsed = await self._call(self.map_prompt, self.selection_format, files, instructions,
+                                          self.parse_selection, semaphore, bucket)
+                counters.update({"files": len(files), "selected": len(parsed.root)})
+        except Exception as e:
+            print(f"🚨 [map {number}/{total}] failed: {e}")
+            return None
+        selections = []
+        for item in parsed.root:
+            relative_path = self._relative(item.file_path)
+            index = self._by_path.get(relative_path)
+            path = self.files[index][0] if index is not None else self.project_root / relative_path
+            selections.append(Selection(path, item.reason.strip(), index is None))
+        print(f"🔎 [map {number}/{total}] {len(files)} file(s), {len(selections)} selected "
+              f"in {time.perf_counter() - start:.1f}s")
+        return selections
+
+    def _full_content(self, path: Path) -> str:
+        index = self._by_path[self._relative(path)]
+        if self.load_full is not None:
+            try:
+                return self.load_full(path)
+            except OSError as e:
+                print(f"⚠️ Warning: Could not read file {path}, using its accumulated content: {e}")
+        return self.files[index][1]
+
+    def _plan_reduce(self, selections: List[Selection], budget: int) -> List[Tuple[List[Selection], List[Tuple[Path, str]]]]:
+        """
+        Groups the selected files into reduce shards. Each shard gets its selected
+        files whole and, while the budget allows, outlines of the files they import.
+        New files go to the first shard.
+        """
+        existing = [s for s in selections if not s.new]
+        new_files = [s for s in selections if s.new]
+        contents = [(s.path, self._full_content(s.path)) for s in existing]
+        groups = plan_shards(contents, budget) if contents else [[]]
+        imports = self._find_imports()
+        plans = []
+        for number, group in enumerate(groups):
+            chosen = [existing[i] for i in group] + (new_files if number == 0 else [])
+            files = [contents[i] for i in group]
+            used = sum(_file_tokens(path, content) for path, content in files)
+            selected = {self._by_path[self._relative(s.path)] for s in chosen if not s.new}
+            neighbours = sorted({j for i in selected for j in imports.get(i, ())} - selected)
+            for j in neighbours:
+                path, content = self.files[j]
+                skeleton = outline.outline(content, path.suffix.lower())
+                if skeleton is None:
+                    continue
+                tokens = _file_tokens(path, skeleton)
+                if used + tokens <= budget:
+                    files.append((path, skeleton))
+                    used += tokens
+            plans.append((chosen, files))
+        return plans
+
+    def _reduce_query(self, instructions: str, chosen: List[Selection], files: List[Tuple[Path, str]]) -> str:
+        lines = [instructions, "", "Output complete code only for these files:"]
+        for selection in chosen:
+            lines.append(f"- {self._relative(selection.path)}{' (new file)' if selection.new else ''}: {selection.reason}")
+        if len(files) > len([s for s in chosen if not s.new]):
+            lines += ["", "The other files are outlines of code the files above use, for reference only; do not output them."]
+        return "\n".join(lines)
+
+    async def _reduce_shard(self, number: int, total: int, chosen: List[Selection], files: List[Tuple[Path, str]],
+                            instructions: str, semaphore: asyncio.Semaphore,
+                            bucket: Optional[batch.TokenBucket]) -> List[parser.CodeOutput]:
+        """Generates the edits for one group of selected files, keeping only outputs for those files."""
+        start = time.perf_counter()
+        try:
+            with tracing.get_tracer().span(f"reduce:{number}") as counters:
+                parsed = await self._call(self.code_prompt, self.code_format, files,
+                                          self._reduce_query(instructions, chosen, files),
+                                          self.parse_code, semaphore, bucket)
+                counters.update({"files": len(files), "outputs": len(parsed.root)})
+        except Exception as e:
+            print(f"🚨 [reduce {number}/{total}] failed: {e}")
+            return []
+        allowed = {self._relative(s.path) for s in chosen}
+        outputs = []
+        for output in parsed.root:
+            relative_path = self._relative(output.file_path)
+            if relative_path in allowed or relative_path not in self._by_path:
+                outputs.append(output)
+            else:
+                # The model only saw this file's outline, so its version would lose code.
+                print(f"⚠️ [reduce {number}/{total}] ignoring unrequested changes to {relative_path}")
+        print(f"✍️  [reduce {number}/{total}] {len(outputs)} file(s) in {time.perf_counter() - start:.1f}s")
+        return outputs
+
+    async def run_async(self, instructions: str) -> parser.CodeOutputRootList:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        bucket = batch.TokenBucket(self.rate) if self.rate else None
+
+        code_budget = self._budget(instructions, self.code_format)
+        if sum(_file_tokens(path, content) for path, content in self.files) <= code_budget:
+            print("\n📦 The snapshot fits in one call; skipping the map pass.")
+            with tracing.get_tracer().span("reduce"):
+                return await self._call(self.code_prompt, self.code_format, self.files, instructions,
+                                        self.parse_code, semaphore, bucket)
+
+        shards = plan_shards(self.files, self._budget(instructions, self.selection_format), self._import_graph())
+        print(f"\n🗺️  Map: {len(self.files)} file(s) in {len(shards)} shard(s), up to {self.concurrency} at a time...")
+        with tracing.get_tracer().span("map") as counters:
+            results = await asyncio.gather(*(
+                self._map_shard(number, len(shards), shard, instructions, semaphore, bucket)
+                for number, shard in enumerate(shards, 1)))
+            counters["shards"] = len(shards)
+        if all(result is None for result in results):
+            raise RuntimeError("Every map shard failed.")
+        failed = sum(result is None for result in results)
+        if failed:
+            print(f"⚠️ {failed} of {len(shards)} map shard(s) failed; their files were not considered.")
+
+        selections: Dict[str, Selection] = {}
+        for selection in (s for result in results if result for s in result):
+            key = self._relative(selection.path)
+            if key in selections:
+                # Several shards may ask for the same new file.
+                selection = selection._replace(reason=f"{selections[key].reason} {selection.reason}")
+            selections[key] = selection
+        if not selections:
+            print("➖ No shard selected any file to change.")
+            return parser.CodeOutputRootList([])
+
+        plans = self._plan_reduce(list(selections.values()), code_budget)
+        print(f"\n🎯 Reduce: {len(selections)} selected file(s) in {len(plans)} call(s)...")
+        with tracing.get_tracer().span("reduce") as counters:
+            shard_outputs = await asyncio.gather(*(
+                self._reduce_shard(number, len(plans), chosen, files, instructions, semaphore, bucket)
+                for number, (chosen, files) in enumerate(plans, 1)))
+            counters["shards"] = len(plans)
+        merged, conflicts = merge_outputs(list(shard_outputs), self.project_root)
+        for relative_path in conflicts:
+            print(f"⚠️ Several reduce calls wrote {relative_path} differently; kept the first.")
+        return parser.CodeOutputRootList(merged)
+
+    def run(self, instructions: str) -> parser.CodeOutputRootList:
+        return asyncio.run(self.run_async(instructions))
@@ -0,0 +1,259 @@
+"""
+Outlines: a file reduced to what the model needs to call into it without
+editing it, namely imports, constants, class and function signatures and
+their type hints, with function bodies replaced by '...'. Python files go
+through the `ast` module; the other languages known to the lexer go
+through a brace-aware extractor (C-like languages) or an indent-aware one
+(Ruby and Lua). Outlines never contain comments.
+"""
+import ast
+import re
+from typing import Dict, List, Optional, Pattern, Tuple
+
+from . import lexer
+
+# Assignments longer than this keep their target and lose their value.
+MAX_VALUE_CHARS = 120
+ELLIPSIS = "..."
+
+# A '{' after one of these, outside parentheses, opens a body whose members are kept.
+_CONTAINER_RE = re.compile(
+    r"\b(?:class|struct|interface|enum|trait|impl|namespace|module|mod|object|"
+    r"extension|protocol|union|record|extern|type)\b")
+_FUNCTION_RE = re.compile(r"\b(?:fn|func|fun|function|def|sub)\b")
+# A '{' right after one of these lists names: `import { a } from`, `const { a } = require(...)`.
+_NAME_LIST_RE = re.compile(r"\b(?:import|export|const|let|var)\s*(?:type\s*)?$")
+# Brace-like tokens that are not blocks: shell and Perl variable expansions.
+_NOT_BLOCKS: Dict[str, str] = {
+    '.sh': r'\$\{[^}\n]*\}',
+    '.pl': r'[$@%][\w:]*\{[^{}\n]*\}',
+    '.php': r'\$\{[^}\n]*\}|\{\$[^}\n]*\}',
+}
+# Lines opening a function body in the languages outlined by indentation.
+_INDENTED_DEFS: Dict[str, Pattern] = {
+    '.py': re.compile(r"^\s*(?:async\s+)?def\b"),
+    '.rb': re.compile(r"^\s*def\b"),
+    '.lua': re.compile(r"\bfunction\b"),
+}
+_BLOCK_END_RE = re.compile(r"end\b")
+_PREPROCESSOR_RE = re.compile(r"^[ \t]*#[^\n]*", re.MULTILINE)
+_DECLARATIVE = (ast.Import, ast.ImportFrom, ast.Assign, ast.AnnAssign, ast.Pass)
+
+_brace_patterns: Dict[str, Tuple[Pattern, Optional[Pattern]]] = {}
+
+
+def supports(file_ext: str) -> bool:
+    """Whether files with this extension can be outlined."""
+    return file_ext in _INDENTED_DEFS or (file_ext in lexer.LANGUAGES and file_ext != '.sql')
+
+
+def outline(content: str, file_ext: str) -> Optional[str]:
+    """Returns the outline of a file, or None when its language has no extractor."""
+    if not supports(file_ext):
+        return None
+    if file_ext == '.py':
+        outlined = _outline_python(content)
+        if outlined is not None:
+            return _tidy(lexer.scrub(outlined, file_ext))
+    scrubbed = lexer.scrub(content, file_ext)
+    if file_ext in _INDENTED_DEFS:
+        return _tidy(_outline_indented(scrubbed, _INDENTED_DEFS[file_ext]))
+    return _tidy(_outline_braces(scrubbed, file_ext))
+
+
+def _tidy(text: str) -> str:
+    """Drops trailing spaces and runs of blank lines left where bodies and comments were."""
+    text = re.sub(r"[ \t]+$", "", text, flags=re.MULTILINE)
+    return re.sub(r"\n{3,}", "\n\n", text).strip('\n') + '\n'
+
+
+class _Source:
+    """Slices source text by the (line, byte column) positions `ast` reports."""
+
+    def __init__(self, content: str):
+        # Only '\n' ends a line here, as it does for the tokenizer once newlines are normalized.
+        self.lines = re.findall(r"[^\n]*\n|[^\n]+$", content)
+
+    def prefix(self, line: int, col: int) -> str:
+        """The text of a line before a byte column."""
+        return self.lines[line - 1].encode('utf-8')[:col].decode('utf-8', errors='ignore')
+
+    def text(self, start_line: int, start_col: int, end_line: int, end_col: int) -> str:
+        if start_line == end_line:
+            head = self.prefix(start_line, start_col)
+            return self.prefix(start_line, end_col)[len(head):]
+        first = self.lines[start_line - 1][len(self.prefix(start_line, start_col)):]
+        middle = ''.join(self.lines[start_line:end_line - 1])
+        return first + middle + self.prefix(end_line, end_col)
+
+    def indent(self, line: int) -> str:
+        text = self.lines[line - 1]
+        return text[:len(text) - len(text.lstrip())]
+
+    def segment(self, node: ast.AST) -> str:
+        return self.text(node.lineno, node.col_offset, node.end_lineno, node.end_col_offset)
+
+
+def _outline_python(content: str) -> Optional[str]:
+    content = content.replace('\r\n', '\n').replace('\r', '\n')
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError):
+        return None
+    source = _Source(content)
+    out: List[str] = []
+    _outline_body(tree.body, source, out)
+    return ''.join(out)
+
+
+def _outline_body(body: List[ast.stmt], source: _Source, out: List[str]):
+    for node in body:
+        indent = source.indent(node.lineno)
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            out.append(_header(node, source) + '\n')
+            if isinstance(node, ast.ClassDef):
+                emitted = len(out)
+                _outline_body(node.body, source, out)
+                if len(out) > emitted:
+                    continue
+            # Functions, and classes with nothing but methods' bodies, end in '...'.
+            out[-1] = out[-1].rstrip('\n') + f" {ELLIPSIS}\n"
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            text = source.segment(node)
+            if node.value is not None and (len(text) > MAX_VALUE_CHARS or '\n' in text):
+                text = source.text(node.lineno, node.col_offset,
+                                   node.value.lineno, node.value.col_offset) + ELLIPSIS
+            out.append(indent + text + '\n')
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            out.append(indent + source.segment(node) + '\n')
+        elif _is_declarative(node):
+            # e.g. `if TYPE_CHECKING:` imports or `try: import x` fallbacks.
+            out.append(indent + source.segment(node) + '\n')
+
+
+def _is_declarative(node: ast.stmt) -> bool:
+    """Whether a compound statement holds only imports and assignments."""
+    if isinstance(node, (ast.If, ast.Try)):
+        children = node.body + node.orelse + getattr(node, 'finalbody', [])
+        children += [stmt for handler in getattr(node, 'handlers', []) for stmt in handler.body]
+        return all(isinstance(child, _DECLARATIVE) or _is_declarative(child) for child in children)
+    return False
+
+
+def _header(node, source: _Source) -> str:
+    """The decorators and signature of a def or class, up to and including its colon."""
+    start_line, start_col = node.lineno, node.col_offset
+    if node.decorator_list:
+        first = node.decorator_list[0]
+        line = source.lines[first.lineno - 1]
+        at = line.rfind('@', 0, len(source.prefix(first.lineno, first.col_offset)))
+        start_line, start_col = first.lineno, len(line[:max(at, 0)].encode('utf-8'))
+    body = node.body[0]
+    text = source.text(start_line, start_col, body.lineno, body.col_offset).rstrip()
+    return source.indent(start_line) + text
+
+
+def _brace_patterns_for(file_ext: str) -> Tuple[Pattern, Optional[Pattern]]:
+    """The token pattern for the brace walk, and the string literal pattern, compiled once per language."""
+    patterns = _brace_patterns.get(file_ext)
+    if patterns is None:
+        strings = lexer.string_regex(lexer.LANGUAGES[file_ext])
+        skip = '|'.join(s for s in (strings, _NOT_BLOCKS.get(file_ext, '')) if s)
+        branches = ([f'(?P<skip>{skip})'] if skip else []) + [r'(?P<token>[{};])']
+        patterns = _brace_patterns[file_ext] = (
+            re.compile('|'.join(branches), re.DOTALL | re.MULTILINE),
+            re.compile(strings, re.DOTALL | re.MULTILINE) if strings else None,
+        )
+    return patterns
+
+
+def _is_container(header: str, file_ext: str) -> bool:
+    """Whether a '{' after this header opens a type, namespace or name list rather than a function or data."""
+    strings = _brace_patterns_for(file_ext)[1]
+    if strings is not None:
+        header = strings.sub('""', header)
+    # Preprocessor lines belong to no declaration.
+    header = _PREPROCESSOR_RE.sub("", header)
+    if _NAME_LIST_RE.search(header):
+        return True
+    matches = list(_CONTAINER_RE.finditer(header))
+    if not matches:
+        return False
+    # `void f(struct s *x) {` mentions a keyword inside its parameter list, and in
+    # languages without semicolons the header can reach back past `import x.module`.
+    rest = header[matches[-1].end():]
+    return rest.count('(') == rest.count(')') and not _FUNCTION_RE.search(rest)
+
+
+def _outline_braces(content: str, file_ext: str) -> str:
+    """
+    Keeps everything outside function bodies: a '{' opens either a container
+    (class, struct, namespace...), whose members are walked in turn, or a
+    body, which is replaced by '...' up to its matching '}'.
+    """
+    pattern = _brace_patterns_for(file_ext)[0]
+    pieces = []
+    emitted = 0
+    statement_start = 0
+    pos = 0
+    while True:
+        match = pattern.search(content, pos)
+        if match is None:
+            break
+        pos = match.end()
+        if match.lastgroup == 'skip':
+            continue
+        token = match.group()
+        if token != '{':
+            statement_start = pos
+            continue
+        if _is_container(content[statement_start:match.start()], file_ext):
+            statement_start = pos
+            continue
+        end = _matching_brace(content, pattern, pos)
+        if end == -1:
+            # Unbalanced: leave this '{' as it is and keep walking.
+            statement_start = pos
+            continue
+        pieces.append(content[emitted:pos])
+        pieces.append(f" {ELLIPSIS} }}")
+        emitted = pos = statement_start = end
+    pieces.append(content[emitted:])
+    return ''.join(pieces)
+
+
+def _matching_brace(content: str, pattern: Pattern, pos: int) -> int:
+    """The index just past the '}' closing the block opened before pos, or -1."""
+    depth = 1
+    while depth:
+        match = pattern.search(content, pos)
+        if match is None:
+            return -1
+        pos = match.end()
+        if match.lastgroup == 'token':
+            depth += {'{': 1, '}': -1}.get(match.group(), 0)
+    return pos
+
+
+def _outline_indented(content: str, def_re: Pattern) -> str:
+    """Keeps every line outside function bodies, which are found by indentation."""
+    out = []
+    body_indent = None  # the indentation of the def whose body is being skipped
+    for line in content.splitlines(keepends=True):
+        stripped = line.strip()
+        if body_indent is not None:
+            if not stripped:
+                continue
+            indent = len(line) - len(line.lstrip())
+            if indent > body_indent:
+                continue
+            closes_body = indent == body_indent and _BLOCK_END_RE.match(stripped)
+            body_indent = None
+            if closes_body:
+                continue
+        if def_re.search(line):
+            out.append(line.rstrip('\r\n') + f" {ELLIPSIS}\n")
+            body_indent = len(line) - len(line.lstrip())
+        else:
+            out.append(line)
+    return ''.join(out)
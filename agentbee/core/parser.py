@@ -1,5 +1,4 @@
 from typing import List
-from langchain.output_parsers import PydanticOutputParser
 from pydantic import BaseModel,Field, RootModel
 
 
@@ -14,6 +13,35 @@ class CodeOutputRootList(RootModel[List[CodeOutput]]):
     """A list of code outputs that can be the root of a JSON document."""
     pass
 
+class FilePatch(BaseModel):
+    file_path: str = Field(description="The path, relative to the project root, of the file to change or create.")
+    patch: str = Field(
+        description="A unified diff (with @@ hunk headers and 3 lines of context) or one or more <<<<<<< SEARCH / ======= / >>>>>>> REPLACE blocks for this file. It MUST be a single, JSON-safe string with newlines escaped as \\n."
+    )
+
+class FilePatchRootList(RootModel[List[FilePatch]]):
+    """A list of file patches that can be the root of a JSON document."""
+    pass
+
+class FileSelection(BaseModel):
+    file_path: str = Field(description="The path of a file, exactly as given in its FILE header, that must change (or, for a new file, be created).")
+    reason: str = Field(description="One or two sentences on what must change in this file and why.")
+
+class FileSelectionRootList(RootModel[List[FileSelection]]):
+    """A list of selected files that can be the root of a JSON document."""
+    pass
+
 def get_scripts_list_parser():
     """Returns a PydanticOutputParser configured for a direct list of scripts."""
-    return PydanticOutputParser(pydantic_object=CodeOutputRootList)
\ No newline at end of file
+    from langchain.output_parsers import PydanticOutputParser
+    return PydanticOutputParser(pydantic_object=CodeOutputRootList)
+
+def get_patch_list_parser():
+    """Returns a PydanticOutputParser configured for a direct list of file patches."""
+    from langchain.output_parsers import PydanticOutputParser
+    return PydanticOutputParser(pydantic_object=FilePatchRootList)
+
+def get_selection_list_parser():
+    """Returns a PydanticOutputParser configured for a direct list of selected files."""
+    from langchain.output_parsers import PydanticOutputParser
+    return PydanticOutputParser(pydantic_object=FileSelectionRootList)
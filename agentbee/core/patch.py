@@ -0,0 +1,191 @@
+import re
+from typing import List, NamedTuple, Optional, Tuple
+
+# How far hunks may have drifted from the line numbers in their header.
+MAX_CONTEXT_FUZZ = 2
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,\d+)? \+\d+(?:,\d+)? @@")
+_SEARCH_REPLACE = re.compile(
+    r"^<{5,9} SEARCH[^\n]*\n(.*?)^={5,9}[ \t]*\n(.*?)^>{5,9} REPLACE[^\n]*$",
+    re.MULTILINE | re.DOTALL
+)
+
+
+class Hunk(NamedTuple):
+    old: List[str]
+    new: List[str]
+    # Zero-based line the hunk claims to start at, if known.
+    start: Optional[int]
+    # Leading and trailing unchanged lines, which fuzzy matching may drop.
+    leading_context: int = 0
+    trailing_context: int = 0
+
+
+class PatchError(Exception):
+    """Raised when a patch cannot be parsed or applied cleanly."""
+
+
+def _split_lines(text: str) -> List[str]:
+    return text.split('\n')
+
+
+def parse_unified_diff(patch_text: str) -> Tuple[List[Hunk], bool]:
+    """Parses the hunks of a single-file unified diff. Returns (hunks, creates_file)."""
+    hunks: List[Hunk] = []
+    creates_file = False
+    old: List[str] = []
+    new: List[str] = []
+    start: Optional[int] = None
+    in_hunk = False
+
+    def flush():
+        if in_hunk and (old or new):
+            leading = 0
+            while leading < min(len(old), len(new)) and old[leading] == new[leading]:
+                leading += 1
+            trailing = 0
+            while (trailing < min(len(old), len(new)) - leading
+                   and old[-1 - trailing] == new[-1 - trailing]):
+                trailing += 1
+            hunks.append(Hunk(list(old), list(new), start, leading, trailing))
+
+    for line in patch_text.rstrip('\n').split('\n'):
+        if line.startswith('--- '):
+            creates_file = creates_file or line[4:].strip() == '/dev/null'
+            continue
+        if line.startswith('+++ ') and not in_hunk:
+            continue
+        header = _HUNK_HEADER.match(line)
+        if header:
+            flush()
+            old, new, in_hunk = [], [], True
+            start = max(int(header.group(1)) - 1, 0)
+            continue
+        if not in_hunk or line.startswith('\\'):
+            continue
+        if line.startswith('-'):
+            old.append(line[1:])
+        elif line.startswith('+'):
+            new.append(line[1:])
+        else:
+            # Context line; models often drop the leading space on blank lines.
+            content = line[1:] if line.startswith(' ') else line
+            old.append(content)
+            new.append(content)
+    flush()
+    return hunks, creates_file
+
+
+def parse_search_replace(patch_text: str) -> List[Hunk]:
+    """Parses <<<<<<< SEARCH / ======= / >>>>>>> REPLACE blocks."""
+    hunks = []
+    for search, replace in _SEARCH_REPLACE.findall(patch_text):
+        hunks.append(Hunk(_split_lines(search.rstrip('\n')), _split_lines(replace.rstrip('\n')), None))
+    return hunks
+
+
+def parse_patch(patch_text: str) -> Tuple[List[Hunk], bool]:
+    """Parses either patch format, returning (hunks, creates_file)."""
+    if _SEARCH_REPLACE.search(patch_text):
+        return parse_search_replace(patch_text), False
+    return parse_unified_diff(patch_text)
+
+
+def _normalize(line: str) -> str:
+    return ' '.join(line.split())
+
+
+def _find_block(lines: List[str], block: List[str], hint: Optional[int], lo: int,
+                unique: bool = False) -> Optional[int]:
+    """
+    Finds where block occurs in lines at or after lo, preferring the match
+    closest to hint. Tries an exact match first, then ignores whitespace.
+    When unique, a block found at more than one place is not found at all.
+    """
+    if not block:
+        return min(max(hint or lo, lo), len(lines))
+    for normalize in (lambda s: s, _normalize):
+        target = [normalize(line) for line in block]
+        first = target[0]
+        candidates = [
+            i for i in range(lo, len(lines) - len(block) + 1)
+            if normalize(lines[i]) == first and [normalize(l) for l in lines[i:i + len(block)]] == target
+        ]
+        if unique and len(candidates) > 1:
+            return None
+        if candidates:
+            anchor = hint if hint is not None else lo
+            return min(candidates, key=lambda i: abs(i - anchor))
+    return None
+
+
+def _locate(lines: List[str], hunk: Hunk, lo: int, offset: int) -> Tuple[int, Hunk, List[str]]:
+    """
+    Locates a hunk, dropping up to MAX_CONTEXT_FUZZ context lines from each
+    end if needed; a hunk matched only that way must match at one place.
+    Returns the position, the hunk as located, and the hunk lines it matched.
+    """
+    hint = hunk.start + offset if hunk.start is not None else None
+    for fuzz in range(MAX_CONTEXT_FUZZ + 1):
+        head = min(fuzz, hunk.leading_context)
+        tail = min(fuzz, hunk.trailing_context)
+        old = hunk.old[head:len(hunk.old) - tail]
+        new = hunk.new[head:len(hunk.new) - tail]
+        if fuzz and not old:
+            break
+        position = _find_block(lines, old, hint + head if hint is not None else None, lo, unique=fuzz > 0)
+        if position is not None:
+            # Record the lines actually replaced, which may differ in whitespace from the hunk.
+            return position, hunk._replace(old=lines[position:position + len(old)], new=new, start=position), old
+    raise PatchError(f"Hunk not found: {' / '.join(hunk.old[:3])[:120]!r}")
+
+
+def apply_hunks(original: str, hunks: List[Hunk]) -> str:
+    """
+    Applies hunks in order with fuzzy matching, then verifies the result
+    against the original: every hunk's context and removed lines must equal
+    the original lines it replaced (ignoring whitespace), the hunks must not
+    overlap, and splicing them into the original must give the same text.
+    """
+    lines = _split_lines(original)
+    applied: List[Tuple[int, Hunk, List[str]]] = []
+    lo = 0
+    offset = 0
+    shift = 0  # how far the lines after the last applied hunk have moved
+    for hunk in hunks:
+        position, located, matched = _locate(lines, hunk, lo, offset)
+        lines[position:position + len(located.old)] = located.new
+        if hunk.start is not None:
+            offset = position - hunk.start + len(located.new) - len(located.old)
+        lo = position + len(located.new)
+        applied.append((position - shift, located, matched))
+        shift += len(located.new) - len(located.old)
+    result = '\n'.join(lines)
+
+    original_lines = _split_lines(original)
+    rebuilt: List[str] = []
+    copied = 0
+    for original_start, located, matched in applied:
+        if original_start < copied:
+            raise PatchError("Patch verification failed: hunks overlap.")
+        replaced = original_lines[original_start:original_start + len(matched)]
+        if [_normalize(line) for line in replaced] != [_normalize(line) for line in matched]:
+            raise PatchError(f"Patch verification failed: hunk does not match the file at line {original_start + 1}.")
+        rebuilt += original_lines[copied:original_start] + located.new
+        copied = original_start + len(matched)
+    rebuilt += original_lines[copied:]
+    if '\n'.join(rebuilt) != result:
+        raise PatchError("Patch verification failed: the patched file differs from the hunks spliced into the original.")
+    return result
+
+
+def apply_patch_text(original: Optional[str], patch_text: str) -> str:
+    """Applies a unified diff or search/replace patch to original (None for a new file)."""
+    hunks, creates_file = parse_patch(patch_text)
+    if not hunks:
+        raise PatchError("No hunks found in patch.")
+    if original is None:
+        if not creates_file and any(h.old for h in hunks):
+            raise PatchError("Patch modifies a file that does not exist.")
+        original = ''
+    return apply_hunks(original, hunks)
@@ -0,0 +1,58 @@
+import os
+import subprocess
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+
+class ProjectContext:
+    """
+    The git project containing a working directory: its root and git
+    directory, resolved with a single `git rev-parse` and then shared by the
+    accumulator, runner and file_io for the rest of the process.
+    """
+
+    def __init__(self, root: Path, git_dir: Path):
+        self.root = root
+        self.git_dir = git_dir
+        self._head: Optional[str] = None
+
+    @property
+    def head(self) -> Optional[str]:
+        """The commit HEAD points to, or None in a repository without commits."""
+        if self._head is None:
+            result = subprocess.run(
+                ['git', 'rev-parse', '--verify', '--quiet', 'HEAD'],
+                capture_output=True, text=True, cwd=self.root
+            )
+            self._head = result.stdout.strip() or None
+        return self._head
+
+
+_contexts: Dict[str, ProjectContext] = {}
+_lock = threading.Lock()
+
+
+def get_project_context() -> ProjectContext:
+    """
+    Returns the context for the current working directory, running git only
+    the first time. Raises CalledProcessError outside a git repository.
+    """
+    cwd = os.getcwd()
+    context = _contexts.get(cwd)
+    if context is not None:
+        return context
+    result = subprocess.run(
+        ['git', 'rev-parse', '--show-toplevel', '--absolute-git-dir'],
+        capture_output=True, text=True, check=True,
+    )
+    root, git_dir = result.stdout.splitlines()[:2]
+    context = ProjectContext(Path(root), Path(git_dir))
+    with _lock:
+        return _contexts.setdefault(cwd, context)
+
+
+def reset():
+    """Forgets the resolved contexts, e.g. after HEAD moves in a long-running process."""
+    with _lock:
+        _contexts.clear()
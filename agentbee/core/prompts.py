@@ -1,8 +1,13 @@
 from langchain.prompts import ChatPromptTemplate,PromptTemplate
 
+# The code comes first and alone in its message, ahead of anything that
+# varies between prompts, so providers can cache it as a shared prefix.
+CODE_MESSAGE = ("system", "{code_content}")
+
 def get_assist_prompt():
     return  ChatPromptTemplate(
         [
+            CODE_MESSAGE,
             (
                 "system",
                 "You are an advanced AI code analysis and writing assistant. \n"
@@ -10,8 +15,6 @@ def get_assist_prompt():
                 "User will provide instruction that will require code change like adding a new function, modifying existing function, etc.\n"
                 "Output only the list of file path and complete code content in the following schema:\n"
                 "{format_instructions} \n"
-                "Code content with file path: \n"
-                "{code_content} \n"
                 "Also try to follow: \n"
                 "1. Maximize the use of any exiting functions \n"
             ),
@@ -22,6 +25,49 @@ def get_assist_prompt():
         ]
     )
 
+def get_assist_diff_prompt():
+    return  ChatPromptTemplate(
+        [
+            CODE_MESSAGE,
+            (
+                "system",
+                "You are an advanced AI code analysis and writing assistant. \n"
+                "You have the a github source code each marked with its file path. \n"
+                "User will provide instruction that will require code change like adding a new function, modifying existing function, etc.\n"
+                "Do NOT repeat whole files. Output only the list of file paths and the minimal patch for each one in the following schema:\n"
+                "{format_instructions} \n"
+                "Each patch is either a unified diff or SEARCH/REPLACE blocks whose SEARCH text is copied exactly from the file. \n"
+                "For a new file, use a unified diff from /dev/null. \n"
+                "Also try to follow: \n"
+                "1. Maximize the use of any exiting functions \n"
+            ),
+            (
+                "human",
+                "{query}"
+            ),
+        ]
+    )
+
+def get_map_prompt():
+    return  ChatPromptTemplate(
+        [
+            CODE_MESSAGE,
+            (
+                "system",
+                "You are an advanced AI code analysis assistant. \n"
+                "You have one part of a github source code, each file marked with its file path; other parts are reviewed separately. \n"
+                "User will provide instruction that will require code change like adding a new function, modifying existing function, etc.\n"
+                "Do NOT write any code. Output only the files of this part that must change to carry out the instruction, and why, in the following schema:\n"
+                "{format_instructions} \n"
+                "Output an empty list if no file of this part needs to change. \n"
+            ),
+            (
+                "human",
+                "{query}"
+            ),
+        ]
+    )
+
 def fix_json_prompt():
     return PromptTemplate(
         template="fix the string so that it can parsed safely by any json library\n" 
@@ -0,0 +1,515 @@
+"""
+Model endpoints and the router in front of them. OpenAI-compatible
+endpoints (including Ollama) are spoken to directly over pooled keep-alive
+HTTP connections; Google endpoints go through langchain. The router picks
+the fastest healthy endpoint from the latencies recorded so far, fails over
+on errors, and hedges: when the first endpoint has not produced a token
+within its p95 time to first token, the next one is started as well and
+whichever answers first wins. Prompts lead with the code snapshot; Gemini
+endpoints with a cache_ttl keep it as cached content, and Ollama endpoints
+with a keep_alive keep the model that holds it in its prompt cache loaded.
+"""
+import asyncio
+import http.client
+import json
+import queue
+import ssl
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import urlsplit
+
+from .. import config
+from . import context, file_io, snapshot
+
+# Idle connections kept open per endpoint.
+MAX_IDLE_CONNECTIONS = 8
+# Latency samples kept per endpoint, and how many are needed before their quantile is trusted.
+MAX_SAMPLES = 100
+MIN_SAMPLES = 5
+# Consecutive failures after which an endpoint is tried last.
+FAILING_AFTER = 2
+STATS_FILE = config.CONFIG_DIR / "latency.json"
+CACHED_CONTENT_FILE = config.CONFIG_DIR / "cached_content.json"
+# Shorter leading messages are not worth a cached content.
+MIN_CACHED_TOKENS = 1024
+# A cached content this close to its expiry is not reused.
+EXPIRY_MARGIN = 60.0
+
+
+class ProviderError(Exception):
+    """An error response from an endpoint; status_code and headers come from the HTTP response."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, headers: Any = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.headers = headers
+
+
+def to_messages(prompt: Any) -> List[Dict[str, str]]:
+    """
+    Converts a langchain prompt value (or plain text) to OpenAI chat messages.
+    Consecutive system messages are joined into one, which every chat template
+    accepts, and which leaves the leading code snapshot a prefix of the text.
+    """
+    if hasattr(prompt, "to_messages"):
+        roles = {"system": "system", "human": "user", "ai": "assistant"}
+        messages: List[Dict[str, str]] = []
+        for message in prompt.to_messages():
+            role = roles.get(message.type, "user")
+            if role == "system" and messages and messages[-1]["role"] == "system":
+                messages[-1]["content"] += "\n\n" + message.content
+            else:
+                messages.append({"role": role, "content": message.content})
+        return messages
+    text = prompt.to_string() if hasattr(prompt, "to_string") else str(prompt)
+    return [{"role": "user", "content": text}]
+
+
+class ConnectionPool:
+    """
+    Keep-alive HTTP(S) connections to one server, shared by every request
+    and thread. A connection goes back to the pool once its response has
+    been read to the end; one abandoned mid-response is closed.
+    """
+
+    def __init__(self, base_url: str, timeout: float):
+        parts = urlsplit(base_url)
+        self.https = parts.scheme == "https"
+        self.host = parts.hostname
+        self.port = parts.port
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.created = 0
+        self._idle: List[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+        self._ssl = ssl.create_default_context() if self.https else None
+
+    def _connection(self) -> http.client.HTTPConnection:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+            self.created += 1
+        if self.https:
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout, context=self._ssl)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _release(self, connection: http.client.HTTPConnection):
+        with self._lock:
+            if len(self._idle) < MAX_IDLE_CONNECTIONS:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+    @contextmanager
+    def request(self, method: str, path: str, body: bytes, headers: Dict[str, str]) -> Iterator[http.client.HTTPResponse]:
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.request(method, self.prefix + path, body=body, headers=headers)
+                response = connection.getresponse()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # The server closed an idle keep-alive connection; retry once on a fresh one.
+                connection.close()
+                if attempt:
+                    raise
+            except BaseException:
+                connection.close()
+                raise
+        try:
+            yield response
+        except BaseException:
+            connection.close()
+            raise
+        if response.isclosed() and not response.will_close:
+            self._release(connection)
+        else:
+            connection.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+
+class OpenAICompatibleEndpoint:
+    """Any server implementing OpenAI's streaming /chat/completions, such as Ollama's /v1."""
+
+    def __init__(self, endpoint: config.EndpointConfig):
+        self.name = endpoint.name
+        self.model = endpoint.model
+        self.api_key = endpoint.api_key
+        self.keep_alive = endpoint.keep_alive
+        self.pool = ConnectionPool(endpoint.base_url, endpoint.timeout)
+
+    def stream(self, prompt: Any, temperature: float) -> Iterator[str]:
+        request = {
+            "model": self.model,
+            "messages": to_messages(prompt),
+            "temperature": temperature,
+            "stream": True,
+        }
+        if self.keep_alive:
+            request["keep_alive"] = self.keep_alive
+        body = json.dumps(request).encode('utf-8')
+        headers = {"Content-Type": "application/json", "Accept": "text/event-stream"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        with self.pool.request("POST", "/chat/completions", body, headers) as response:
+            if response.status != 200:
+                detail = response.read().decode('utf-8', errors='replace')[:500]
+                raise ProviderError(f"{self.name}: HTTP {response.status}: {detail}", response.status, response.headers)
+            # Server-sent events: "data: {...}" lines, ending with "data: [DONE]".
+            while True:
+                line = response.readline()
+                if not line:
+                    break
+                line = line.strip()
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    response.read()  # drain, so the connection can be reused
+                    break
+                choices = json.loads(data).get("choices") or [{}]
+                content = (choices[0].get("delta") or {}).get("content")
+                if content:
+                    yield content
+
+    def close(self):
+        self.pool.close()
+
+
+class CachedContentHandles:
+    """
+    The names of Gemini cached contents holding a code snapshot, by endpoint
+    and snapshot hash, with their expiry. They are kept across runs in
+    ~/.agentbee/cached_content.json, so a repeated run reuses them.
+    """
+
+    def __init__(self, path: Path = CACHED_CONTENT_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            self.data: Dict[str, Dict[str, Any]] = json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            self.data = {}
+
+    @staticmethod
+    def key(endpoint, digest: str) -> str:
+        return f"{endpoint.name}:{endpoint.model}:{digest}"
+
+    def get(self, endpoint, digest: str) -> Optional[str]:
+        entry = self.data.get(self.key(endpoint, digest))
+        if entry and entry["expires"] > time.time() + EXPIRY_MARGIN:
+            return entry["name"]
+        return None
+
+    def put(self, endpoint, digest: str, name: str, expires: float):
+        with self._lock:
+            now = time.time()
+            self.data = {key: entry for key, entry in self.data.items() if entry["expires"] > now}
+            self.data[self.key(endpoint, digest)] = {"name": name, "expires": expires}
+        self.save()
+
+    def drop(self, endpoint, digest: str):
+        with self._lock:
+            self.data.pop(self.key(endpoint, digest), None)
+        self.save()
+
+    def save(self):
+        with self._lock:
+            text = json.dumps(self.data, indent=1)
+        try:
+            file_io.write_atomic(self.path, text)
+        except OSError as e:
+            print(f"⚠️ Warning: Could not save cached content names: {e}")
+
+
+class GoogleEndpoint:
+    """
+    Gemini through langchain; the client (and its connections) is kept per
+    temperature. With a cache_ttl, a prompt's leading code snapshot is stored
+    once as cached content and later prompts with the same snapshot send
+    only what follows it.
+    """
+
+    def __init__(self, endpoint: config.EndpointConfig, handles: Optional[CachedContentHandles] = None):
+        self.name = endpoint.name
+        self.model = endpoint.model
+        self.api_key = endpoint.api_key
+        self.cache_ttl = endpoint.cache_ttl
+        self.handles = handles if handles is not None else CachedContentHandles()
+        self._clients: Dict[float, Any] = {}
+        self._genai_client = None
+        self._uncacheable = set()  # snapshot hashes the API refused to cache
+        self._lock = threading.Lock()
+        # Concurrent calls (--batch, --map-reduce) wait for one cached content instead of each creating one.
+        self._cache_lock = threading.Lock()
+
+    def _client(self, temperature: float):
+        with self._lock:
+            if temperature not in self._clients:
+                from langchain_google_genai import GoogleGenerativeAI
+                from pydantic import SecretStr
+                self._clients[temperature] = GoogleGenerativeAI(
+                    model=self.model, temperature=temperature, api_key=SecretStr(self.api_key))
+            return self._clients[temperature]
+
+    def _genai(self):
+        with self._lock:
+            if self._genai_client is None:
+                from google import genai
+                self._genai_client = genai.Client(api_key=self.api_key)
+            return self._genai_client
+
+    def _cached_content(self, prefix: str, digest: str) -> Optional[str]:
+        """The name of a cached content holding prefix, created if needed; None if it cannot be cached."""
+        try:
+            from google.genai import types
+        except ImportError:
+            print(f"⚠️ Warning: {self.name}: cache_ttl needs the google-genai package; sending the code snapshot whole.")
+            self.cache_ttl = 0
+            return None
+        with self._cache_lock:
+            name = self.handles.get(self, digest)
+            if name is not None or digest in self._uncacheable:
+                return name
+            try:
+                cached = self._genai().caches.create(model=self.model, config=types.CreateCachedContentConfig(
+                    system_instruction=prefix, ttl=f"{int(self.cache_ttl)}s", display_name=f"agentbee-{digest[:12]}"))
+            except Exception as e:
+                self._uncacheable.add(digest)
+                print(f"⚠️ Warning: {self.name}: could not cache the code snapshot, sending it whole: {e}")
+                return None
+            self.handles.put(self, digest, cached.name, time.time() + self.cache_ttl)
+        print(f"🧊 {self.name}: cached the code snapshot as {cached.name} for {self.cache_ttl:.0f}s")
+        return cached.name
+
+    def _stream_cached(self, name: str, rest: str, temperature: float) -> Iterator[str]:
+        from google.genai import types
+        config = types.GenerateContentConfig(cached_content=name, temperature=temperature)
+        for chunk in self._genai().models.generate_content_stream(model=self.model, contents=rest, config=config):
+            if chunk.text:
+                yield chunk.text
+
+    def stream(self, prompt: Any, temperature: float) -> Iterator[str]:
+        messages = prompt.to_messages() if self.cache_ttl and hasattr(prompt, "to_messages") else []
+        if (len(messages) > 1 and messages[0].type == "system"
+                and context.estimate_tokens(messages[0].content) >= MIN_CACHED_TOKENS):
+            digest = snapshot.digest_of(messages[0].content)
+            name = self._cached_content(messages[0].content, digest)
+            if name is not None:
+                chunks = self._stream_cached(name, "\n\n".join(m.content for m in messages[1:]), temperature)
+                try:
+                    first = next(chunks, None)
+                except Exception as e:
+                    # Usually a cached content deleted or expired early; send the prompt whole instead.
+                    self.handles.drop(self, digest)
+                    print(f"⚠️ Warning: {self.name}: cached content {name} failed, sending the prompt whole: {e}")
+                else:
+                    if first is not None:
+                        yield first
+                    yield from chunks
+                    return
+        yield from self._client(temperature).stream(prompt)
+
+    def close(self):
+        pass
+
+
+_endpoints: Dict[config.EndpointConfig, Any] = {}
+_endpoints_lock = threading.Lock()
+
+
+def get_endpoint(endpoint: config.EndpointConfig):
+    """The endpoint client for a configuration, created once per process so connections stay warm."""
+    with _endpoints_lock:
+        if endpoint not in _endpoints:
+            if endpoint.provider == "google":
+                _endpoints[endpoint] = GoogleEndpoint(endpoint)
+            else:
+                if endpoint.provider == "openai" and not endpoint.base_url:
+                    raise ValueError(f"Endpoint '{endpoint.name}' needs a base_url.")
+                _endpoints[endpoint] = OpenAICompatibleEndpoint(endpoint)
+        return _endpoints[endpoint]
+
+
+class LatencyStats:
+    """
+    Time to first token and failures per endpoint, kept across runs in
+    ~/.agentbee/latency.json and used to order and hedge endpoints.
+    """
+
+    def __init__(self, path: Path = STATS_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            self.data: Dict[str, Dict[str, Any]] = json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            self.data = {}
+
+    @staticmethod
+    def key(endpoint) -> str:
+        return f"{endpoint.name}:{endpoint.model}"
+
+    def _entry(self, endpoint) -> Dict[str, Any]:
+        return self.data.setdefault(self.key(endpoint), {"first_token": [], "failures": 0})
+
+    def record_first_token(self, endpoint, seconds: float):
+        with self._lock:
+            entry = self._entry(endpoint)
+            entry["first_token"] = (entry["first_token"] + [round(seconds, 4)])[-MAX_SAMPLES:]
+            entry["failures"] = 0
+
+    def record_failure(self, endpoint):
+        with self._lock:
+            self._entry(endpoint)["failures"] += 1
+
+    def quantile(self, endpoint, q: float) -> Optional[float]:
+        samples = sorted(self.data.get(self.key(endpoint), {}).get("first_token", []))
+        if len(samples) < MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def rank(self, endpoints: List[Any]) -> List[Any]:
+        """Healthy endpoints first, then by median time to first token; untried ones keep their configured order."""
+        def sort_key(item):
+            index, endpoint = item
+            entry = self.data.get(self.key(endpoint), {})
+            median = self.quantile(endpoint, 0.5)
+            return (entry.get("failures", 0) >= FAILING_AFTER, median if median is not None else float("inf"), index)
+        return [endpoint for _, endpoint in sorted(enumerate(endpoints), key=sort_key)]
+
+    def save(self):
+        with self._lock:
+            text = json.dumps(self.data, indent=1)
+        try:
+            file_io.write_atomic(self.path, text)
+        except OSError as e:
+            print(f"⚠️ Warning: Could not save endpoint latencies: {e}")
+
+
+class Router:
+    """
+    A model in front of one or more endpoints, with the same invoke, stream
+    and ainvoke calls as a langchain LLM. Endpoints are tried in the order
+    given by `LatencyStats.rank`. When hedging, the next endpoint is started
+    if the current ones have produced no token within the first one's p95
+    time to first token; the first endpoint to produce a token wins and the
+    others are abandoned. An endpoint failing before its first token hands
+    over to the next one.
+    """
+
+    def __init__(self, endpoints: List[Any], temperature: float, stats: LatencyStats,
+                 hedge: bool = True, hedge_quantile: float = 0.95, hedge_after: float = 10.0):
+        if not endpoints:
+            raise ValueError("No coding endpoints are configured. Please run 'agentbee config set --help'.")
+        self.endpoints = endpoints
+        self.temperature = temperature
+        self.stats = stats
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_after = hedge_after
+        # Names the model for the response cache; routing does not change what was asked for.
+        self.model_name = "+".join(LatencyStats.key(endpoint) for endpoint in endpoints)
+
+    def _hedge_delay(self, endpoint) -> float:
+        quantile = self.stats.quantile(endpoint, self.hedge_quantile)
+        return quantile if quantile is not None else self.hedge_after
+
+    def _pump(self, endpoint, prompt: Any, events: "queue.Queue", cancel: threading.Event):
+        start = time.perf_counter()
+        first = True
+        try:
+            for chunk in endpoint.stream(prompt, self.temperature):
+                if cancel.is_set():
+                    return  # leaving the loop closes the stream and its connection
+                if first:
+                    self.stats.record_first_token(endpoint, time.perf_counter() - start)
+                    first = False
+                events.put((endpoint, "chunk", chunk))
+            events.put((endpoint, "done", None))
+        except Exception as e:
+            if first:
+                self.stats.record_failure(endpoint)
+            events.put((endpoint, "error", e))
+
+    def stream(self, prompt: Any) -> Iterator[str]:
+        candidates = self.stats.rank(self.endpoints)
+        events: "queue.Queue" = queue.Queue()
+        cancel = threading.Event()
+        running = []
+        winner = None
+        error: Optional[Exception] = None
+
+        def start_next() -> bool:
+            if len(running) == len(candidates):
+                return False
+            endpoint = candidates[len(running)]
+            running.append(endpoint)
+            threading.Thread(target=self._pump, args=(endpoint, prompt, events, cancel),
+                             daemon=True, name=f"agentbee-{endpoint.name}").start()
+            return True
+
+        start_next()
+        active = 1
+        try:
+            while True:
+                can_hedge = winner is None and self.hedge and len(running) < len(candidates)
+                try:
+                    endpoint, kind, value = events.get(
+                        timeout=self._hedge_delay(candidates[0]) if can_hedge else None)
+                except queue.Empty:
+                    print(f"⏱️  No token from {', '.join(e.name for e in running)} yet; "
+                          f"hedging with {candidates[len(running)].name}")
+                    start_next()
+                    active += 1
+                    continue
+                if kind == "chunk":
+                    if winner is None:
+                        winner = endpoint
+                    if endpoint is winner:
+                        yield value
+                elif kind == "done":
+                    if winner is None or endpoint is winner:
+                        return
+                elif endpoint is winner:
+                    raise value
+                elif winner is None:
+                    active -= 1
+                    error = value
+                    print(f"⚠️ Warning: {endpoint.name} failed: {value}")
+                    if active == 0:
+                        if not start_next():
+                            raise error
+                        active += 1
+        finally:
+            cancel.set()
+            self.stats.save()
+
+    def invoke(self, prompt: Any) -> str:
+        return "".join(self.stream(prompt))
+
+    async def ainvoke(self, prompt: Any) -> str:
+        return await asyncio.get_running_loop().run_in_executor(None, self.invoke, prompt)
+
+
+def get_router(temperature: float) -> Router:
+    """The coding model router described by the config file."""
+    router_config = config.load_router_config()
+    return Router(
+        [get_endpoint(endpoint) for endpoint in router_config.coding], temperature, LatencyStats(),
+        hedge=router_config.hedge, hedge_quantile=router_config.hedge_quantile,
+        hedge_after=router_config.hedge_after,
+    )
+
+
+def get_fixer(temperature: float = 0) -> Router:
+    """The (usually local) model that repairs malformed JSON, without hedging."""
+    router_config = config.load_router_config()
+    return Router([get_endpoint(router_config.fixer)], temperature, LatencyStats(), hedge=False)
@@ -0,0 +1,176 @@
+import hashlib
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, Tuple
+
+CACHE_FILE = Path(".agentbee") / "responses.db"
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 128 * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    response TEXT,
+    size INTEGER,
+    latency REAL,
+    created REAL,
+    last_used REAL
+);
+"""
+
+
+class CacheMissError(Exception):
+    """Raised in cache-only mode when a prompt has no cached response."""
+
+
+class ResponseCache:
+    """
+    A SQLite cache of model responses keyed by a hash of the rendered prompt,
+    model name and temperature, with TTL and size-based (LRU) eviction.
+    A fresh response is only held until `commit` is called with it, once it
+    has parsed; one that never parses is never stored, so a retry of the
+    same prompt asks the model again.
+    """
+
+    def __init__(self, root: Path, ttl_seconds: float = DEFAULT_TTL_SECONDS, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.db_path = root / CACHE_FILE
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        # Responses from the model that have not parsed yet: response -> (key, latency).
+        self._pending: Dict[str, Tuple[str, float]] = {}
+
+    @staticmethod
+    def make_key(prompt: str, model_name: str, temperature: float) -> str:
+        digest = hashlib.sha256()
+        for part in (model_name, repr(float(temperature)), prompt):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns a fresh cached response, or None."""
+        row = self.conn.execute(
+            "SELECT response, latency, created FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or time.time() - row[2] > self.ttl_seconds:
+            self.misses += 1
+            return None
+        with self.conn:
+            self.conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+        self.hits += 1
+        self.saved_seconds += row[1]
+        return row[0]
+
+    def put(self, key: str, response: str, latency: float):
+        now = time.time()
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, latency, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, response, len(response.encode('utf-8')), latency, now, now)
+            )
+            self._evict(now)
+
+    def hold(self, key: str, response: str, latency: float):
+        """Keeps a fresh response aside until it is committed."""
+        self._pending[response] = (key, latency)
+
+    def commit(self, response: str):
+        """Stores a held response now that it has parsed; other responses are ignored."""
+        held = self._pending.pop(response, None)
+        if held is not None:
+            self.put(held[0], response, held[1])
+
+    def _evict(self, now: float):
+        """Drops expired entries, then the least recently used ones beyond the size bound."""
+        self.conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY last_used").fetchall():
+            if total <= self.max_bytes:
+                break
+            self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+
+    def wrap(self, invoke: Callable[[Any], str], model_name: str, temperature: float, mode: str = "default"):
+        """
+        Wraps a model call so cached responses skip the network. mode is
+        "default" (read and write), "off" (bypass the cache) or "only" (never
+        call the model; a miss raises CacheMissError). New responses are held
+        until committed.
+        """
+        def cached_invoke(prompt_value: Any) -> str:
+            if mode == "off":
+                return invoke(prompt_value)
+            prompt = prompt_value.to_string() if hasattr(prompt_value, "to_string") else str(prompt_value)
+            key = self.make_key(prompt, model_name, temperature)
+            cached = self.get(key)
+            if cached is not None:
+                print("💾 Using cached model response")
+                return cached
+            if mode == "only":
+                raise CacheMissError("No cached response for this prompt and --cache-only was given.")
+            start = time.perf_counter()
+            response = invoke(prompt_value)
+            self.hold(key, response, time.perf_counter() - start)
+            return response
+        return cached_invoke
+
+    def wrap_async(self, ainvoke: Callable[[Any], Awaitable[str]], model_name: str, temperature: float, mode: str = "default"):
+        """Like `wrap`, for an async model call."""
+        async def cached_ainvoke(prompt_value: Any) -> str:
+            if mode == "off":
+                return await ainvoke(prompt_value)
+            prompt = prompt_value.to_string() if hasattr(prompt_value, "to_string") else str(prompt_value)
+            key = self.make_key(prompt, model_name, temperature)
+            cached = self.get(key)
+            if cached is not None:
+                print("💾 Using cached model response")
+                return cached
+            if mode == "only":
+                raise CacheMissError("No cached response for this prompt and --cache-only was given.")
+            start = time.perf_counter()
+            response = await ainvoke(prompt_value)
+            self.hold(key, response, time.perf_counter() - start)
+            return response
+        return cached_ainvoke
+
+    def wrap_stream(self, stream: Callable[[Any], Iterator[str]], model_name: str, temperature: float, mode: str = "default"):
+        """Like `wrap`, for a streaming model call; a cached response is replayed as one chunk."""
+        def cached_stream(prompt_value: Any) -> Iterator[str]:
+            if mode == "off":
+                yield from stream(prompt_value)
+                return
+            prompt = prompt_value.to_string() if hasattr(prompt_value, "to_string") else str(prompt_value)
+            key = self.make_key(prompt, model_name, temperature)
+            cached = self.get(key)
+            if cached is not None:
+                print("💾 Using cached model response")
+                yield cached
+                return
+            if mode == "only":
+                raise CacheMissError("No cached response for this prompt and --cache-only was given.")
+            start = time.perf_counter()
+            chunks = []
+            for chunk in stream(prompt_value):
+                chunks.append(chunk)
+                yield chunk
+            self.hold(key, "".join(chunks), time.perf_counter() - start)
+        return cached_stream
+
+    def summary(self) -> str:
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups * 100 if lookups else 0.0
+        return (f"response cache: {self.hits} hit(s), {self.misses} miss(es) "
+                f"({rate:.0f}% hit rate), saved ~{self.saved_seconds:.1f}s")
+
+    def close(self):
+        self.conn.close()
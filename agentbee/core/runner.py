@@ -1,29 +1,261 @@
-import subprocess
-from pathlib import Path
-from langchain_core.runnables import RunnableLambda
+import time
+from functools import partial
 from pathlib import Path
 
-from .. import config, logger
-from . import accumulator, file_io, llm_api, parser
-from typing import List,Dict
+from . import accumulator, beeinclude, classify, context, file_io, git_source, index, outline, parser, patch, snapshot, streaming, tracing
+from .cache import AccumulationCache
+from typing import Callable, Iterable, Iterator, List, Dict, Optional, Tuple
 
-def accumulate(runnable_input: dict):
+def iter_accumulated(runnable_input: dict) -> Iterator[Tuple[Path, str]]:
+    """Streams (path, content) chunks for the files selected by the runnable input."""
     path = runnable_input.get("path",None)
     no_scrub = runnable_input.get("no_scrub", False)
+    jobs = runnable_input.get("jobs", 1)
+    rev = runnable_input.get("rev")
+    changed_since = runnable_input.get("changed_since")
     project_root = accumulator.get_project_root()
-    file_paths = accumulator.get_file_paths(project_root, path)
-    accumulated_code = file_io.accumulate_code(file_paths, scrub_comments=not no_scrub)
-    print(f"\n✅ Accumulated code from {len(file_paths)} files")
+    classifier = make_classifier(project_root, runnable_input)
+    outlined = make_outline_filter(project_root, runnable_input)
+
+    if rev:
+        # Read the commit straight from the object store, without checking it out.
+        with tracing.get_tracer().span("list_files") as counters:
+            entries = git_source.list_blobs(project_root, rev, path, accumulator.read_bee_include(project_root))
+            if changed_since:
+                selected = set(select_changed(project_root, changed_since, rev, runnable_input))
+                entries = [entry for entry in entries if entry.path in selected]
+            counters["files"] = len(entries)
+        with tracing.get_tracer().span("classify") as counters:
+            keep = classifier.filter_blobs([(entry.path, entry.size) for entry in entries])
+            entries = [entry for entry, kept in zip(entries, keep) if kept]
+            counters["skipped"] = sum(classifier.skipped.values())
+        cache = AccumulationCache(project_root, use_git=False)
+        count = 0
+        sizes = {project_root / entry.path: entry.size for entry in entries}
+        chunks = git_source.iter_blob_code(project_root, entries, scrub_comments=not no_scrub,
+                                           cache=cache, classifier=classifier, outlined=outlined)
+        # Binary blobs can only be recognised once read, so the count is taken as files are yielded.
+        for chunk in report_outlines(chunks, outlined, sizes.get):
+            count += 1
+            yield chunk
+        report_skipped(classifier)
+        print(f"\n✅ Accumulated code from {count} files at {rev} ({cache.summary()})")
+        return
+
+    file_paths = list_files(project_root, runnable_input, classifier)
+    report_skipped(classifier)
+    # Blob SHAs are only meaningful for files listed by git; --path scans fall back to stat keys.
+    cache = AccumulationCache(project_root, use_git=path is None)
+    chunks = file_io.iter_accumulated_code(file_paths, scrub_comments=not no_scrub, cache=cache, jobs=jobs,
+                                           outlined=outlined)
+    yield from report_outlines(chunks, outlined, lambda file_path: file_path.stat().st_size)
+    print(f"\n✅ Accumulated code from {len(file_paths)} files ({cache.summary()})")
+
+def list_files(project_root: Path, runnable_input: dict,
+               classifier: Optional[classify.FileClassifier] = None) -> List[Path]:
+    """The working-tree files selected by the runnable input, without reading any of them."""
+    path = runnable_input.get("path")
+    changed_since = runnable_input.get("changed_since")
+    with tracing.get_tracer().span("list_files") as counters:
+        file_paths = accumulator.get_file_paths(project_root, path)
+        if changed_since:
+            selected = {project_root / name for name in select_changed(project_root, changed_since, None, runnable_input)}
+            file_paths = [file_path for file_path in file_paths if file_path in selected]
+        counters["files"] = len(file_paths)
+    if classifier is None:
+        return file_paths
+    with tracing.get_tracer().span("classify") as counters:
+        # Binary, generated, vendored and oversized files are dropped before anything is read.
+        file_paths = classifier.filter_paths(file_paths, runnable_input.get("jobs", 1))
+        counters["skipped"] = sum(classifier.skipped.values())
+        counters["bytes_skipped"] = classifier.bytes_skipped
+    return file_paths
+
+def make_classifier(project_root: Path, runnable_input: dict) -> classify.FileClassifier:
+    """Builds the file classifier from the --max-file-size, --max-total-size and --no-skip options."""
+    max_file_size = runnable_input.get("max_file_size")
+    max_total_size = runnable_input.get("max_total_size")
+    no_skip = runnable_input.get("no_skip", False)
+    if max_file_size:
+        max_file_bytes = classify.parse_size(max_file_size)
+    else:
+        max_file_bytes = None if no_skip else classify.DEFAULT_MAX_FILE_BYTES
+    max_total_bytes = classify.parse_size(max_total_size) if max_total_size else None
+    return classify.FileClassifier(project_root, max_file_bytes, max_total_bytes, detect=not no_skip)
+
+def make_outline_filter(project_root: Path, runnable_input: dict) -> Optional[Callable[[Path], bool]]:
+    """
+    Which files are reduced to outlines: every file with --outline, or, with
+    --full patterns, every file the patterns don't match. None when neither is given.
+    """
+    full = runnable_input.get("full") or []
+    if not (runnable_input.get("outline") or full):
+        return None
+    if not full:
+        return lambda file_path: True
+    # --full patterns follow the same gitignore-style rules as .beeinclude.
+    matcher = beeinclude.IncludeMatcher(full)
+    def outlined(file_path: Path) -> bool:
+        try:
+            return not matcher.matches(file_path.relative_to(project_root).as_posix())
+        except ValueError:
+            return True
+    return outlined
+
+def report_outlines(chunks: Iterable[Tuple[Path, str]], outlined: Optional[Callable[[Path], bool]],
+                    size_of: Callable[[Path], int]) -> Iterator[Tuple[Path, str]]:
+    """Passes chunks through, then prints how much smaller the outlined files became."""
+    if outlined is None:
+        yield from chunks
+        return
+    count = full_bytes = outline_bytes = 0
+    for file_path, content in chunks:
+        if outlined(file_path) and outline.supports(file_path.suffix.lower()):
+            try:
+                full_bytes += size_of(file_path)
+            except OSError:
+                pass
+            outline_bytes += len(content.encode('utf-8'))
+            count += 1
+        yield file_path, content
+    if count:
+        saved = 1 - outline_bytes / full_bytes if full_bytes else 0
+        print(f"🦴 Outlined {count} file(s): {classify.format_size(full_bytes)} of source "
+              f"sent as {classify.format_size(outline_bytes)} ({saved:.0%} smaller)")
+
+def report_skipped(classifier: classify.FileClassifier):
+    summary = classifier.summary()
+    if summary:
+        print(f"🚫 {summary}")
+
+def select_changed(project_root: Path, base: str, rev: Optional[str], runnable_input: dict) -> List[str]:
+    """The files changed since base, plus the files that import them when asked for."""
+    changed = git_source.changed_paths(project_root, base, rev)
+    importers = git_source.find_importers(project_root, changed, rev) if runnable_input.get("with_importers") else []
+    print(f"🔀 {len(changed)} file(s) changed since {base}"
+          + (f", {len(importers)} direct importer(s)" if runnable_input.get("with_importers") else ""))
+    return changed + importers
+
+def accumulate(runnable_input: dict):
+    accumulated_code = file_io.join_code(iter_accumulated(runnable_input))
     return(accumulated_code)
 
-def format_for_prompt(accumulated_code, instructions, format_instructions):
-    """Transform accumulated code and instructions into prompt format"""
+def accumulate_files(runnable_input: dict) -> List[Tuple[Path, str]]:
+    """Accumulates the selected files as a list of (path, content) pairs."""
+    return list(iter_accumulated(runnable_input))
+
+def pack_context(files: List[Tuple[Path, str]], instructions: str, max_tokens: Optional[int] = None, explain: bool = False,
+                 path: Optional[Path] = None):
+    """
+    Keeps the files most relevant to the instructions that fit in the token
+    budget. path is the run's --path, which limits the index update to it.
+    """
+    return pack_contexts(files, [instructions], max_tokens, explain, path)[0]
+
+def pack_contexts(files: List[Tuple[Path, str]], instructions: List[str], max_tokens: Optional[int] = None,
+                  explain: bool = False, path: Optional[Path] = None) -> List[List[Tuple[Path, str]]]:
+    """
+    Packs the files for each of several instructions, updating the index only
+    once for all of them.
+    """
+    if max_tokens is None and not explain:
+        return [files for _ in instructions]
+    lexical: List[Optional[List[float]]] = [None] * len(instructions)
+    project_root = accumulator.get_project_root()
+    if index.CodeIndex.exists(project_root):
+        # Reuse the persistent index instead of re-tokenizing every file.
+        with index.open_updated(project_root, path) as code_index:
+            relative_paths = [code_index.relative_path(file_path) for file_path, _ in files]
+            for i, query in enumerate(instructions):
+                scores = dict(code_index.query(query, limit=None))
+                lexical[i] = [scores.get(relative_path, 0.0) for relative_path in relative_paths]
+    packed = []
+    for query, scores in zip(instructions, lexical):
+        kept, report = context.pack(files, query, max_tokens, scores)
+        if explain:
+            context.print_report(report, max_tokens)
+        if len(kept) < len(files):
+            print(f"\n✂️  Packed context to {len(kept)} of {len(files)} files to fit {max_tokens:,} tokens")
+        packed.append(kept)
+    return packed
+
+def format_for_prompt(accumulated_code, instructions, format_instructions, store: Optional[snapshot.SnapshotStore] = None):
+    """
+    Transform accumulated code and instructions into prompt format. Files are
+    rendered as a canonical snapshot, so the code is the same prefix on every
+    run; with a store, the snapshot is saved and reported as new or reused.
+    """
+    if not isinstance(accumulated_code, str):
+        rendered = snapshot.render(accumulated_code, accumulator.get_project_root())
+        if store is not None:
+            state = "new" if store.save(rendered) else "unchanged since an earlier run"
+            print(f"\n🧊 Code snapshot {rendered.digest[:12]} ({rendered.files} files): {state}")
+        accumulated_code = rendered.text
     return {
         "code_content": accumulated_code,
         "query": instructions,
         "format_instructions": format_instructions
     }
 
+def get_output_components(output_format: str, in_place: bool = False):
+    """The prompt, parser and saver for an output format: 'full' files or 'diff' patches."""
+    from . import prompts
+    if output_format == "diff":
+        return prompts.get_assist_diff_prompt(), parser.get_patch_list_parser(), partial(apply_patches, in_place=in_place)
+    return prompts.get_assist_prompt(), parser.get_scripts_list_parser(), save_script
+
+def build_parser_with_fallback(code_parser, local_model, parse_stats,
+                               on_parsed: Optional[Callable[[str], None]] = None):
+    """
+    A resilient parser for the model's raw output: the plain parser first,
+    then the deterministic repair tier, then the local model fixer, with
+    each tier's attempts recorded in parse_stats. on_parsed is called with
+    the raw output once one of the tiers has parsed it.
+    """
+    from langchain_core.runnables import RunnableLambda
+    from langchain_core.output_parsers import StrOutputParser
+    from . import json_repair, prompts
+
+    markdown_cleaner = RunnableLambda(clean_markdown_json)
+
+    # The main parsing chain that takes the model's raw string output
+    code_parser_chain = markdown_cleaner | code_parser
+
+    # A deterministic repair tier that handles the common breakages locally
+    json_repair_chain = RunnableLambda(json_repair.repair) | code_parser
+
+    # The fallback "fixer" chain for when the main parser and the repair tier fail
+    json_fixer_chain = (
+        RunnableLambda(lambda x: print("🔴 Code Parsing failed. Trying to fix with local model..."))
+        | RunnableLambda(lambda x: {"input": x})  # Wrap the faulty string for the prompt
+         | prompts.fix_json_prompt()
+         | local_model
+         | StrOutputParser()
+         | markdown_cleaner
+         | code_parser
+    )
+
+    resilient_parser = RunnableLambda(parse_stats.track("parse", code_parser_chain.invoke)).with_fallbacks(
+        fallbacks=[
+            RunnableLambda(parse_stats.track("repair", json_repair_chain.invoke)),
+            RunnableLambda(parse_stats.track("local_model", json_fixer_chain.invoke)),
+        ],
+    )
+    if on_parsed is None:
+        return resilient_parser
+
+    def parse(model_response: str):
+        parsed = resilient_parser.invoke(model_response)
+        on_parsed(model_response)
+        return parsed
+
+    async def aparse(model_response: str):
+        parsed = await resilient_parser.ainvoke(model_response)
+        on_parsed(model_response)
+        return parsed
+
+    return RunnableLambda(parse, afunc=aparse)
+
 def log_model_output(model_response: str) -> str:
     """A utility to print the model's raw output for debugging."""
     print(f"\n🤖 Model Output:")
@@ -61,31 +293,98 @@ def clean_markdown_json(model_response: str) -> str:
     except json.JSONDecodeError:
         return cleaned_response
 
+def resolve_output_path(file_path: str, project_root: Path) -> Path:
+    """Turns a path returned by the model into a path relative to the project root."""
+    model_path = Path(file_path)
+    
+    # Determine the correct relative path
+    if model_path.is_absolute():
+        # If the path from the model is absolute, make it relative to the project root
+        try:
+            return model_path.relative_to(project_root)
+        except ValueError:
+            # Fallback for absolute paths outside the project, use only the name
+            return Path(model_path.name)
+    # If the path is already relative, use it as is
+    return model_path
+
+def save_code_output(script: "parser.CodeOutput", project_root: Path):
+    """Saves a single generated file, resolving its path relative to the project root."""
+    # The save function constructs the full path inside .beecode.d
+    file_io.save_code_to_beecode(
+        resolve_output_path(script.file_path, project_root),
+        script.code_content
+    )
+
 def save_script(parsed_response):
     """
     Save parsed scripts to files, ensuring paths are correctly resolved
     relative to the project root.
     """
     project_root = accumulator.get_project_root()
-    
-    for script in parsed_response.root:
-        model_path = Path(script.file_path)
-        
-        # Determine the correct relative path
-        if model_path.is_absolute():
-            # If the path from the model is absolute, make it relative to the project root
-            try:
-                relative_path = model_path.relative_to(project_root)
-            except ValueError:
-                # Fallback for absolute paths outside the project, use only the name
-                relative_path = model_path.name
-        else:
-            # If the path is already relative, use it as is
-            relative_path = model_path
-
-        # The save function constructs the full path inside .beecode.d
-        file_io.save_code_to_beecode(
-            Path(relative_path),
-            script.code_content
-        )
-    return parsed_response
\ No newline at end of file
+    beecode_dir = project_root / file_io.BEECODE_DIR
+    relative_paths = [resolve_output_path(script.file_path, project_root) for script in parsed_response.root]
+    file_io.contained_paths(beecode_dir, relative_paths)
+
+    # All files are written together at the end: atomically, in parallel, skipping unchanged ones.
+    with file_io.WriteSession(beecode_dir) as session:
+        for relative_path, script in zip(relative_paths, parsed_response.root):
+            session.add(relative_path, script.code_content)
+    return parsed_response
+
+def apply_patches(parsed_response, in_place: bool = False):
+    """
+    Applies parsed file patches, saving results to .beecode.d (or in place).
+    Several patches to one file are applied in the order given. Files whose
+    patches do not apply are reported and skipped.
+    """
+    project_root = accumulator.get_project_root()
+    by_path: Dict[Path, List[str]] = {}
+    for file_patch in parsed_response.root:
+        by_path.setdefault(resolve_output_path(file_patch.file_path, project_root), []).append(file_patch.patch)
+    failed = []
+    for relative_path, patch_texts in by_path.items():
+        try:
+            file_io.apply_patch(relative_path, patch_texts, in_place=in_place)
+        except (patch.PatchError, OSError) as e:
+            print(f"⚠️ Warning: Could not apply patch to {relative_path}: {e}")
+            failed.append(relative_path)
+    if failed and len(failed) == len(by_path):
+        raise patch.PatchError(f"None of the patches to {len(failed)} file(s) could be applied.")
+    return parsed_response
+
+def stream_and_save(chunks: Iterable[str], fallback_parser):
+    """
+    Saves each file from a streamed model response as soon as it is complete.
+    If the stream could not be parsed cleanly, the full response is handed to
+    fallback_parser and any files it recovers that were not saved yet are written.
+    """
+    project_root = accumulator.get_project_root()
+    incremental_parser = streaming.IncrementalCodeOutputParser()
+    saved: Dict[str, "parser.CodeOutput"] = {}
+    response = []
+    start = time.perf_counter()
+    first_file_at = None
+
+    print("\n🤖 Streaming model output...")
+    for chunk in chunks:
+        response.append(chunk)
+        for script in incremental_parser.feed(chunk):
+            save_code_output(script, project_root)
+            saved[script.file_path] = script
+            if first_file_at is None:
+                first_file_at = time.perf_counter() - start
+    total = time.perf_counter() - start
+    # The whole response is logged like a non-streamed one, before any fallback parse saves files.
+    full_response = log_model_output("".join(response))
+
+    if not incremental_parser.complete:
+        print("🟠 Streamed output did not parse cleanly; parsing the full response...")
+        for script in fallback_parser.invoke(full_response).root:
+            if saved.get(script.file_path) != script:
+                save_code_output(script, project_root)
+                saved[script.file_path] = script
+
+    if first_file_at is not None:
+        print(f"\n⏱️  First file saved after {first_file_at:.1f}s of {total:.1f}s total generation")
+    return parser.CodeOutputRootList(list(saved.values()))
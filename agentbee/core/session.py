@@ -0,0 +1,303 @@
+"""
+A warm assist session: the accumulated snapshot, the model clients, the
+prompts and the parsers are built once and reused for every instruction,
+instead of paying for imports, client construction and a full
+re-accumulation on each `agentbee assist`. A session runs either as a
+REPL or as a daemon on a Unix socket, which `assist` uses transparently.
+"""
+import contextlib
+import json
+import os
+import socket
+import socketserver
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import accumulator, file_io
+from .cache import AccumulationCache
+
+SOCKET_PATH = Path(".agentbee") / "session.sock"
+TEMPERATURE = 0
+# Accumulation options fixed for the lifetime of a session. An assist run
+# is only handed to a daemon that was started with the same ones.
+SNAPSHOT_OPTIONS = ("path", "no_scrub", "max_file_size", "max_total_size", "no_skip", "outline", "full")
+
+
+def _normalize(options: Dict[str, Any]) -> Dict[str, Any]:
+    """The snapshot options in a JSON-friendly form that compares equal across processes."""
+    return {key: str(options[key]) if isinstance(options.get(key), Path) else options.get(key)
+            for key in SNAPSHOT_OPTIONS}
+
+
+class Snapshot:
+    """
+    The accumulated files of the working tree, kept in memory between
+    instructions. `refresh` polls the tree: it re-lists the files, stats
+    them, and classifies and reads only those whose mtime or size changed.
+    Skipped files are remembered too, so they are not sniffed again.
+    """
+
+    def __init__(self, root: Path, options: Dict[str, Any]):
+        self.root = root
+        self.options = options
+        self._contents: Dict[Path, str] = {}
+        self._stamps: Dict[Path, Tuple[int, int]] = {}
+        self._order: List[Path] = []
+
+    def refresh(self) -> Tuple[int, int]:
+        """Brings the snapshot up to date; returns the number of changed and removed files."""
+        from . import runner
+
+        stamps = {}
+        for file_path in runner.list_files(self.root, self.options):
+            try:
+                st = file_path.stat()
+            except OSError:
+                continue
+            stamps[file_path] = (st.st_mtime_ns, st.st_size)
+        changed = [p for p, stamp in stamps.items() if self._stamps.get(p) != stamp]
+        removed = [p for p in self._stamps if p not in stamps]
+        for file_path in removed + changed:
+            self._contents.pop(file_path, None)
+
+        if changed:
+            classifier = runner.make_classifier(self.root, self.options)
+            # Unchanged files keep their place under the total size cap.
+            classifier.total_bytes = sum(stamps[p][1] for p in self._contents)
+            readable = classifier.filter_paths(changed, self.options.get("jobs", 1))
+            runner.report_skipped(classifier)
+            cache = AccumulationCache(self.root, use_git=self.options.get("path") is None)
+            for file_path, content in file_io.iter_accumulated_code(
+                    readable, scrub_comments=not self.options.get("no_scrub", False),
+                    cache=cache, jobs=self.options.get("jobs", 1),
+                    outlined=runner.make_outline_filter(self.root, self.options)):
+                self._contents[file_path] = content
+            for file_path in readable:
+                if file_path not in self._contents:
+                    del stamps[file_path]  # unreadable this time; try again on the next refresh
+        self._stamps = stamps
+        self._order = [p for p in stamps if p in self._contents]
+        return len(changed), len(removed)
+
+    def files(self) -> List[Tuple[Path, str]]:
+        return [(file_path, self._contents[file_path]) for file_path in self._order]
+
+
+class Session:
+    """
+    Runs assist instructions one at a time against a warm snapshot, reusing
+    the same model clients (and their HTTP connections), response cache and
+    parsers. The snapshot is refreshed before every instruction.
+    """
+
+    def __init__(self, options: Dict[str, Any]):
+        from . import json_repair, llm_api
+        from .response_cache import ResponseCache
+        from .snapshot import SnapshotStore
+
+        self.root = accumulator.get_project_root()
+        self.options = options
+        self.snapshot = Snapshot(self.root, options)
+        self.llm = llm_api.get_coding_model(TEMPERATURE)
+        self.local_model = llm_api.get_fixer_model()
+        self.response_cache = ResponseCache(self.root)
+        self.parse_stats = json_repair.TierStats(self.root)
+        self.snapshot_store = SnapshotStore(self.root)
+        self._outputs: Dict[Tuple[str, bool], tuple] = {}
+        self._lock = threading.Lock()
+
+    def _output_components(self, output_format: str, in_place: bool) -> tuple:
+        """The prompt, parser, saver and resilient parser for a format, built on first use."""
+        from . import runner
+
+        key = (output_format, in_place)
+        if key not in self._outputs:
+            prompt, code_parser, save = runner.get_output_components(output_format, in_place)
+            parse = runner.build_parser_with_fallback(code_parser, self.local_model, self.parse_stats,
+                                                      self.response_cache.commit)
+            self._outputs[key] = (prompt, code_parser, save, parse)
+        return self._outputs[key]
+
+    def refresh(self):
+        first = not self.snapshot.files()
+        changed, removed = self.snapshot.refresh()
+        if first:
+            print(f"📸 Snapshot loaded: {len(self.snapshot.files())} file(s) in context")
+        elif changed or removed:
+            print(f"🔄 Snapshot refreshed: {changed} changed, {removed} removed, "
+                  f"{len(self.snapshot.files())} file(s) in context")
+
+    def assist(
+        self,
+        instructions: str,
+        max_tokens: Optional[int] = None,
+        explain_context: bool = False,
+        cache_mode: str = "default",
+        output_format: str = "full",
+        in_place: bool = False
+    ):
+        """Runs one instruction through the assist chain and saves the result."""
+        from . import runner
+
+        if output_format == "diff" and not self.options.get("no_scrub"):
+            raise ValueError("--format diff needs a session started with --no-scrub, "
+                             "since patches are matched against the files on disk.")
+        with self._lock:
+            self.refresh()
+            prompt, code_parser, save, parse = self._output_components(output_format, in_place)
+            files = runner.pack_context(self.snapshot.files(), instructions, max_tokens, explain_context,
+                                       self.options.get("path"))
+            prompt_value = prompt.invoke(
+                runner.format_for_prompt(files, instructions, code_parser.get_format_instructions(),
+                                         self.snapshot_store))
+            invoke = self.response_cache.wrap(self.llm.invoke, self.llm.model_name, TEMPERATURE, cache_mode)
+            response = runner.log_model_output(invoke(prompt_value))
+            try:
+                result = save(parse.invoke(response))
+            finally:
+                if self.parse_stats.run:
+                    print(f"📊 {self.parse_stats.summary()}")
+                    self.parse_stats.save()
+                    self.parse_stats.run = {}
+            print(f"📊 {self.response_cache.summary()}")
+            return result
+
+    def close(self):
+        self.response_cache.close()
+
+
+class _SocketWriter:
+    """A text stream that forwards everything printed during a request to the client."""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+
+    def write(self, text: str) -> int:
+        if text:
+            _send(self.wfile, {"output": text})
+        return len(text)
+
+    def flush(self):
+        self.wfile.flush()
+
+
+def _send(wfile, message: Dict[str, Any]):
+    wfile.write(json.dumps(message).encode('utf-8') + b"\n")
+    wfile.flush()
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Handles one assist request: a JSON line in, JSON lines of output and a status out."""
+
+    def handle(self):
+        session: Session = self.server.session
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError:
+            return
+        if request.get("options") != _normalize(session.options):
+            _send(self.wfile, {"rejected": "the session was started with different accumulation options"})
+            return
+        ok = True
+        # Requests are served one at a time, so redirecting stdout is safe here.
+        with contextlib.redirect_stdout(_SocketWriter(self.wfile)):
+            try:
+                session.assist(request["instructions"], **request.get("assist", {}))
+                print(f"\n✅ Code generation completed and saved")
+            except Exception as e:
+                ok = False
+                print(f"🚨 Operation failed: {e}")
+        _send(self.wfile, {"done": True, "ok": ok})
+
+
+def serve(session: Session):
+    """Serves assist requests on the project's session socket until interrupted."""
+    if not hasattr(socket, "AF_UNIX"):
+        raise RuntimeError("Session daemons need Unix domain sockets; use the interactive session instead.")
+    socket_path = session.root / SOCKET_PATH
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+    if socket_path.exists():
+        if _connect(socket_path) is not None:
+            raise RuntimeError(f"A session is already listening on {socket_path}")
+        socket_path.unlink()  # left behind by a session that did not shut down cleanly
+    session.refresh()
+    # Requests can write to the project, so only the owner may connect. The
+    # umask closes the window between creating the socket and the chmod.
+    old_umask = os.umask(0o177)
+    try:
+        server = socketserver.UnixStreamServer(str(socket_path), _RequestHandler)
+    finally:
+        os.umask(old_umask)
+    os.chmod(socket_path, 0o600)
+    with server:
+        server.session = session
+        print(f"🐝 Session listening on {socket_path}; 'agentbee assist' will use it. Press Ctrl-C to stop.")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            socket_path.unlink(missing_ok=True)
+
+
+def _connect(socket_path: Path) -> Optional[socket.socket]:
+    if not hasattr(socket, "AF_UNIX") or not socket_path.exists():
+        return None
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(str(socket_path))
+    except OSError:
+        client.close()
+        return None
+    return client
+
+
+def run_via_daemon(root: Path, instructions: str, options: Dict[str, Any],
+                   assist_options: Dict[str, Any]) -> Optional[bool]:
+    """
+    Hands an assist run to a session daemon for this project and prints its
+    output. Returns whether it succeeded, or None when no daemon with the
+    same accumulation options is listening, so the caller runs it itself.
+    """
+    client = _connect(root / SOCKET_PATH)
+    if client is None:
+        return None
+    with client, client.makefile('rwb') as stream:
+        _send(stream, {"instructions": instructions, "options": _normalize(options), "assist": assist_options})
+        for line in stream:
+            message = json.loads(line)
+            if "output" in message:
+                print(message["output"], end="", flush=True)
+            elif "rejected" in message:
+                return None
+            elif message.get("done"):
+                return message["ok"]
+    return False  # the daemon went away mid-request
+
+
+def repl(session: Session, **assist_options):
+    """Reads instructions from the terminal and runs each against the warm session."""
+    print("🐝 AgentBee session. Enter an instruction, or :refresh, :files or :quit.")
+    session.refresh()
+    while True:
+        try:
+            line = input("\n🐝 > ").strip()
+        except (EOFError, KeyboardInterrupt):
+            print()
+            return
+        if not line:
+            continue
+        if line in (":quit", ":q", ":exit"):
+            return
+        if line == ":refresh":
+            session.refresh()
+        elif line == ":files":
+            for file_path, content in session.snapshot.files():
+                print(f"  {len(content):>9,}  {os.path.relpath(file_path, session.root)}")
+        else:
+            try:
+                session.assist(line, **assist_options)
+                print(f"\n✅ Code generation completed and saved")
+            except Exception as e:
+                print(f"🚨 Operation failed: {e}")
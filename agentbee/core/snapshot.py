@@ -0,0 +1,83 @@
+"""
+Prompt-ready snapshots of the accumulated code. The files are rendered in
+one canonical form: sorted by their path relative to the project root, each
+under a FILE header with that relative path. The same tree therefore gives
+the same text on every run, in every checkout and for every output format.
+Prompts send this text first, ahead of their instructions, so it forms a
+byte-identical prefix that providers' prompt caches can reuse. Snapshots
+are stored under .agentbee/snapshots, named by their hash.
+"""
+import hashlib
+import os
+from pathlib import Path
+from typing import Iterable, NamedTuple, Optional, Tuple
+
+from . import file_io
+
+SNAPSHOT_DIR = Path(".agentbee") / "snapshots"
+# Snapshots kept on disk; the least recently used ones beyond this are deleted.
+MAX_SNAPSHOTS = 4
+PREAMBLE = "Code content with file path:\n"
+
+
+class PromptSnapshot(NamedTuple):
+    text: str
+    digest: str  # sha256 of text
+    files: int
+
+
+def digest_of(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def relative_posix(file_path: Path, project_root: Path) -> str:
+    """The path as shown in the snapshot: relative to the project root when it is inside it."""
+    try:
+        return file_path.relative_to(project_root).as_posix()
+    except ValueError:
+        return file_path.as_posix()
+
+
+def render(files: Iterable[Tuple[Path, str]], project_root: Path) -> PromptSnapshot:
+    """Renders (path, content) chunks in the canonical form, whatever order they come in."""
+    ordered = sorted((relative_posix(file_path, project_root), content) for file_path, content in files)
+    parts = [PREAMBLE]
+    for relative_path, content in ordered:
+        parts.append(file_io.format_file_header(Path(relative_path)))
+        parts.append(content)
+    text = "".join(parts)
+    return PromptSnapshot(text, digest_of(text), len(ordered))
+
+
+class SnapshotStore:
+    """Rendered snapshots on disk, one file per hash."""
+
+    def __init__(self, root: Path):
+        self.directory = root / SNAPSHOT_DIR
+
+    def path(self, digest: str) -> Path:
+        return self.directory / f"{digest}.txt"
+
+    def save(self, snapshot: PromptSnapshot) -> bool:
+        """Stores a snapshot unless it is already there; returns whether it is new."""
+        path = self.path(snapshot.digest)
+        try:
+            if path.exists():
+                os.utime(path)  # marks it as recently used
+                return False
+            file_io.write_atomic(path, snapshot.text)
+            self._prune()
+        except OSError as e:
+            print(f"⚠️ Warning: Could not store the prompt snapshot: {e}")
+        return True
+
+    def load(self, digest: str) -> Optional[str]:
+        try:
+            return self.path(digest).read_text(encoding='utf-8')
+        except OSError:
+            return None
+
+    def _prune(self):
+        stored = sorted(self.directory.glob("*.txt"), key=lambda p: p.stat().st_mtime, reverse=True)
+        for stale in stored[MAX_SNAPSHOTS:]:
+            stale.unlink(missing_ok=True)
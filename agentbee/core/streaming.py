@@ -0,0 +1,74 @@
+import json
+from typing import List
+
+from pydantic import ValidationError
+
+from .parser import CodeOutput
+
+
+class IncrementalCodeOutputParser:
+    """
+    Parses a streamed model response chunk by chunk and returns each
+    `CodeOutput` as soon as its closing brace arrives.
+
+    Objects are recognised as elements of the first JSON array in the
+    stream, so markdown fences and a `{"scripts": [...]}` wrapper around the
+    array are tolerated. Braces and brackets inside strings are ignored.
+    """
+
+    def __init__(self):
+        self._buffer: List[str] = []
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escaped = False
+        self._object_depth = None  # stack depth of the object being collected
+        self.errors: List[str] = []
+        self.parsed = 0
+
+    def feed(self, chunk: str) -> List[CodeOutput]:
+        """Consumes the next chunk and returns the outputs it completed."""
+        completed = []
+        for char in chunk:
+            if self._object_depth is not None:
+                self._buffer.append(char)
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in '[{':
+                if char == '{' and self._object_depth is None and self._stack and self._stack[-1] == '[':
+                    self._object_depth = len(self._stack)
+                    self._buffer = ['{']
+                self._stack.append(char)
+            elif char in ']}':
+                if self._stack:
+                    self._stack.pop()
+                if char == '}' and self._object_depth == len(self._stack):
+                    output = self._emit(''.join(self._buffer))
+                    if output is not None:
+                        completed.append(output)
+                    self._object_depth = None
+                    self._buffer = []
+        return completed
+
+    def _emit(self, text: str):
+        try:
+            output = CodeOutput.model_validate(json.loads(text))
+        except (json.JSONDecodeError, ValidationError) as e:
+            self.errors.append(str(e))
+            return None
+        self.parsed += 1
+        return output
+
+    @property
+    def complete(self) -> bool:
+        """True when at least one object was parsed and nothing failed or is left open."""
+        return self.parsed > 0 and not self.errors and self._object_depth is None
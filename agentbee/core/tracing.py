@@ -0,0 +1,130 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional
+
+TRACE_DIR = Path(".agentbee") / "profile"
+
+
+class Span(NamedTuple):
+    name: str
+    start: float
+    seconds: float
+    thread_id: int
+    counters: Dict[str, Any]
+
+
+class Tracer:
+    """
+    Records timing spans and counters for the stages of a run. A disabled
+    tracer hands back the original callables and a shared no-op context, so
+    leaving instrumentation in place costs nothing when profiling is off.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.spans: List[Span] = []
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def _record(self, name: str, start: float, counters: Dict[str, Any]):
+        span = Span(name, start - self._origin, time.perf_counter() - start, threading.get_ident(), counters)
+        with self._lock:
+            self.spans.append(span)
+
+    @contextmanager
+    def _span(self, name: str) -> Iterator[Dict[str, Any]]:
+        counters: Dict[str, Any] = {}
+        start = time.perf_counter()
+        try:
+            yield counters
+        finally:
+            self._record(name, start, counters)
+
+    def span(self, name: str):
+        """A context manager timing a block; it yields a dict for counters."""
+        return self._span(name) if self.enabled else _NULL_SPAN
+
+    def wrap(self, name: str, invoke: Callable[[Any], Any],
+             counters: Optional[Callable[[Any, Any], Dict[str, Any]]] = None) -> Callable[[Any], Any]:
+        """
+        Times each call of invoke. counters(input, output) may return values
+        to attach to the span, such as sizes or token counts.
+        """
+        if not self.enabled:
+            return invoke
+
+        def traced(value: Any) -> Any:
+            with self._span(name) as span_counters:
+                result = invoke(value)
+                if counters is not None:
+                    span_counters.update(counters(value, result))
+            return result
+        return traced
+
+    def runnable(self, name: str, runnable, counters: Optional[Callable[[Any, Any], Dict[str, Any]]] = None):
+        """Wraps a langchain runnable as a traced stage, or returns it unchanged when disabled."""
+        if not self.enabled:
+            return runnable
+        from langchain_core.runnables import RunnableLambda
+        return RunnableLambda(self.wrap(name, runnable.invoke, counters))
+
+    def summary(self) -> str:
+        """A table of total time and counters per stage, in the order stages first ran."""
+        totals: Dict[str, Dict[str, Any]] = {}
+        for span in self.spans:
+            entry = totals.setdefault(span.name, {"calls": 0, "seconds": 0.0, "counters": {}})
+            entry["calls"] += 1
+            entry["seconds"] += span.seconds
+            for key, value in span.counters.items():
+                entry["counters"][key] = entry["counters"].get(key, 0) + value
+        wall = max((s.start + s.seconds for s in self.spans), default=0.0)
+        rows = [f"{'stage':<28} {'calls':>5} {'ms':>10} {'% wall':>7}  counters"]
+        for name, entry in totals.items():
+            share = entry["seconds"] / wall * 100 if wall else 0.0
+            counters = ", ".join(f"{k}={v:,}" for k, v in entry["counters"].items())
+            rows.append(f"{name:<28} {entry['calls']:>5} {entry['seconds'] * 1000:>10.1f} {share:>6.1f}%  {counters}")
+        rows.append(f"{'wall':<28} {'':>5} {wall * 1000:>10.1f}")
+        return "\n".join(rows)
+
+    def export_chrome(self, path: Path) -> Path:
+        """Writes the spans as Chrome trace-event JSON (chrome://tracing, ui.perfetto.dev)."""
+        pid = os.getpid()
+        events = [
+            {
+                "name": span.name, "cat": "agentbee", "ph": "X",
+                "ts": round(span.start * 1e6, 1), "dur": round(span.seconds * 1e6, 1),
+                "pid": pid, "tid": span.thread_id, "args": span.counters,
+            }
+            for span in self.spans
+        ]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}), encoding='utf-8')
+        return path
+
+
+class _NullSpan:
+    """A reusable no-op span; the counters it yields are discarded."""
+
+    def __enter__(self) -> Dict[str, Any]:
+        return {}
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+_tracer = Tracer(enabled=False)
+
+
+def get_tracer() -> Tracer:
+    """The tracer for the current run; disabled unless a command installed one."""
+    return _tracer
+
+
+def set_tracer(tracer: Tracer):
+    global _tracer
+    _tracer = tracer
@@ -1,56 +1,90 @@
 # agentbee/logger.py
-import os
 import json
-import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Iterator, Optional, Tuple, Union
 
-# Define the log file path relative to the current working directory
-LOG_FILE_PATH = Path.cwd() / ".bee.log"
+from .core.file_io import format_file_header
+from .core.log_store import LogStore
+
+# Define the log directory relative to the current working directory
+LOG_DIR = Path.cwd() / ".agentbee" / "logs"
+
+def get_log_store() -> LogStore:
+    return LogStore(LOG_DIR)
 
 def setup_logging(fresh: bool):
     """
-    Prepares the logging session, deleting the old log if requested.
+    Prepares the logging session, deleting the old logs if requested.
     """
-    if fresh and LOG_FILE_PATH.exists():
+    if fresh and LOG_DIR.exists():
         try:
-            os.remove(LOG_FILE_PATH)
-            print(f"🗑️  Removed old log file at {LOG_FILE_PATH}")
+            get_log_store().clear()
+            print(f"🗑️  Removed old logs at {LOG_DIR}")
         except OSError as e:
-            print(f"🚨 Error removing log file: {e}")
+            print(f"🚨 Error removing logs: {e}")
 
 def log_output(
-    accumulated_code: str,
+    accumulated_code: Union[str, Iterable[Tuple[Path, str]]],
     response_data: Optional[str] = None,
-    error_message: Optional[str] = None
-):
+    error_message: Optional[str] = None,
+    command: Optional[str] = None
+) -> Optional[int]:
     """
-    Logs the accumulated code, API response, and any errors to the log file.
+    Logs the accumulated code, API response, and any errors as a new entry in
+    the log store, returning its id. The accumulated code may also be an
+    iterable of (path, content) chunks, which are stored as they arrive; an
+    error raised while producing them is recorded in the entry and then re-raised.
     """
+    accumulation_errors: list = []
+    if not isinstance(accumulated_code, str):
+        accumulated_code = _recording_errors(accumulated_code, accumulation_errors)
     try:
-        with open(LOG_FILE_PATH, 'a', encoding='utf-8') as log_file:
-            timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            log_file.write(f"\n--- LOG ENTRY: {timestamp} ---\n")
-
-            if error_message:
-                log_file.write(f"--- STATUS: ERROR ---\n")
-                log_file.write(f"{error_message}\n")
-
-            log_file.write("\n--- ACCUMULATED CODE ---\n")
-            log_file.write(accumulated_code if accumulated_code.strip() else "No code was accumulated.\n")
-
-            log_file.write("\n--- API RESPONSE ---\n")
-            if response_data:
-                # Try to format if it's a JSON string, otherwise write as is
-                try:
-                    parsed_json = json.loads(response_data)
-                    log_file.write(json.dumps(parsed_json, indent=2))
-                except (json.JSONDecodeError, TypeError):
-                    log_file.write(response_data)
-            else:
-                log_file.write("No API response was generated or provided for logging.\n")
-
-            log_file.write("\n--- END OF LOG ENTRY ---\n")
-    except Exception as e:
+        return get_log_store().append(accumulated_code, response_data, error_message, command)
+    except OSError as e:
+        if accumulation_errors and e is accumulation_errors[0]:
+            raise  # the accumulation failed, not the log store
         # Critical error if logging itself fails
-        print(f"🚨 CRITICAL: Could not write to log file {LOG_FILE_PATH}: {e}")
\ No newline at end of file
+        print(f"🚨 CRITICAL: Could not write to log store {LOG_DIR}: {e}")
+        return None
+
+def _recording_errors(chunks: Iterable[Tuple[Path, str]], errors: list) -> Iterator[Tuple[Path, str]]:
+    """Passes chunks through, noting an error raised while producing them."""
+    try:
+        yield from chunks
+    except Exception as e:
+        errors.append(e)
+        raise
+
+def format_entry(entry: dict) -> str:
+    """A one-line summary of a log entry."""
+    status = "🔴" if entry["status"] == "error" else "🟢"
+    return (f"{status} #{entry['id']:<5} {entry['time']}  {entry.get('command') or '-':<10} "
+            f"{entry['files']:>5} file(s) {entry['bytes'] / 1024:>9.1f} KB")
+
+def iter_entry_text(store: LogStore, entry: dict, with_code: bool = False) -> Iterator[str]:
+    """Renders an entry in the old .bee.log layout, a piece at a time."""
+    yield f"\n--- LOG ENTRY #{entry['id']}: {entry['time']} ---\n"
+    if entry.get("error"):
+        yield f"--- STATUS: ERROR ---\n{entry['error']}\n"
+
+    yield "\n--- ACCUMULATED CODE ---\n"
+    snapshot = store.snapshot(entry)
+    if not snapshot:
+        yield "No code was accumulated.\n"
+    for file_path, sha in snapshot:
+        if with_code:
+            yield (format_file_header(Path(file_path)) if file_path else "") + store.read_blob(sha)
+        else:
+            yield f"  {file_path or '(text)'}  {sha[:12]}\n"
+
+    yield "\n--- API RESPONSE ---\n"
+    if entry.get("response"):
+        response_data = store.read_blob(entry["response"])
+        # Try to format if it's a JSON string, otherwise write as is
+        try:
+            yield json.dumps(json.loads(response_data), indent=2)
+        except json.JSONDecodeError:
+            yield response_data
+    else:
+        yield "No API response was generated or provided for logging.\n"
+    yield "\n--- END OF LOG ENTRY ---\n"
@@ -1,21 +1,33 @@
 import os
 import typer
 from pathlib import Path
+from typing import List
 from typing_extensions import Annotated
 from functools import partial
-from langchain_core.runnables import RunnableLambda
-from langchain_core.output_parsers import StrOutputParser
-from langchain_google_genai import GoogleGenerativeAI
-from langchain_ollama import ChatOllama
 
+# Only light modules are imported here. langchain and the model providers take
+# over a second to import, so they are loaded inside the commands that use them.
 from . import config, logger
-from .core import accumulator, file_io, llm_api, prompts, runner, parser
+from .core import accumulator, index
 
 app = typer.Typer(help="🐝 AgentBee: An AI-powered code assistant.")
+index_app = typer.Typer(help="Manage the local code search index in .agentbee/index.")
+app.add_typer(index_app, name="index")
+log_app = typer.Typer(help="Browse the run logs in .agentbee/logs.")
+app.add_typer(log_app, name="log")
 
 FreshOption = Annotated[bool, typer.Option("--fresh", help="Start with a fresh log file, deleting the old one.")]
 NoScrubOption = Annotated[bool, typer.Option("--no-scrub", help="Include comments in the accumulated code.")]
 PathOption = Annotated[Path, typer.Option("--path", help="Scan a specific relative path instead of using 'git ls-files'.")]
+JobsOption = Annotated[int, typer.Option("--jobs", "-j", help="Number of parallel workers used to read and scrub files.")]
+RevOption = Annotated[str, typer.Option("--rev", help="Accumulate the files of this commit from git's object store instead of the working tree.")]
+ChangedSinceOption = Annotated[str, typer.Option("--changed-since", help="Only include files added or modified since this ref.")]
+WithImportersOption = Annotated[bool, typer.Option("--with-importers", help="With --changed-since, also include files that directly import a changed file.")]
+MaxFileSizeOption = Annotated[str, typer.Option("--max-file-size", help="Skip files larger than this, e.g. '512K' or '2M' (default 1M).")]
+MaxTotalSizeOption = Annotated[str, typer.Option("--max-total-size", help="Stop adding files once their total size would exceed this, e.g. '20M'.")]
+NoSkipOption = Annotated[bool, typer.Option("--no-skip", help="Read every listed file, including binary, generated, vendored and oversized ones.")]
+OutlineOption = Annotated[bool, typer.Option("--outline", help="Send only imports, constants and class and function signatures instead of whole files.")]
+FullOption = Annotated[List[str], typer.Option("--full", help="Send files matching this .beeinclude-style pattern whole and outline the rest; can be repeated.")]
 
 
 @app.callback()
@@ -26,80 +38,264 @@ def main_callback():
 def accumulate(
     path: PathOption = None,
     no_scrub: NoScrubOption = False,
-    fresh: FreshOption = False
+    fresh: FreshOption = False,
+    jobs: JobsOption = 1,
+    rev: RevOption = None,
+    changed_since: ChangedSinceOption = None,
+    with_importers: WithImportersOption = False,
+    max_file_size: MaxFileSizeOption = None,
+    max_total_size: MaxTotalSizeOption = None,
+    no_skip: NoSkipOption = False,
+    outline: OutlineOption = False,
+    full: FullOption = None
 ):
-    runnable = RunnableLambda(runner.accumulate)
+    if with_importers and not changed_since:
+        print("🚨 --with-importers only works together with --changed-since.")
+        return
+    from .core import runner
+
+    error_message_for_log = None
+    entry_logged = False
     try:
-        runnable_input = {"path":path,"no_scrub":no_scrub}
-        accumulated_script = runnable.invoke(runnable_input)
+        runnable_input = {"path":path,"no_scrub":no_scrub,"jobs":jobs,"rev":rev,
+                          "changed_since":changed_since,"with_importers":with_importers,
+                          "max_file_size":max_file_size,"max_total_size":max_total_size,"no_skip":no_skip,
+                          "outline":outline,"full":full}
         logger.setup_logging(fresh)
-        logger.log_output(accumulated_script)
-        print(f"\n✅ Saved accumulated code logged to {logger.LOG_FILE_PATH}")
+        # Stream each file straight into the log instead of building one big string.
+        # The entry is written even when accumulation fails part-way, with the error in it.
+        entry_logged = True
+        entry_id = logger.log_output(runner.iter_accumulated(runnable_input), command="accumulate")
+        if entry_id is not None:
+            print(f"\n✅ Saved accumulated code as log entry #{entry_id} (see 'agentbee log show {entry_id}')")
     except Exception as e:
+        error_message_for_log = str(e)
         print(f"🚨 Operation failed: {e}")
-        logger.log_output("", error_message=str(e))
-    return accumulated_script
+    finally:
+        if not entry_logged:
+            logger.log_output("", error_message=error_message_for_log, command="accumulate")
     
 @app.command()
 def assist(
-    instructions: Annotated[str, typer.Argument(help="Your specific instructions for the AI assistant.")],
+    instructions: Annotated[str, typer.Argument(help="Your specific instructions for the AI assistant.")] = None,
     output: Annotated[Path, typer.Option("-o", "--output", help="Directory to save generated files.")] = Path(".beecode.d"),
     path: PathOption = None,
     no_scrub: NoScrubOption = False,
-    fresh: FreshOption = False  # Changed from FreshFlag to FreshOption
+    fresh: FreshOption = False,  # Changed from FreshFlag to FreshOption
+    jobs: JobsOption = 1,
+    rev: RevOption = None,
+    changed_since: ChangedSinceOption = None,
+    with_importers: WithImportersOption = False,
+    max_file_size: MaxFileSizeOption = None,
+    max_total_size: MaxTotalSizeOption = None,
+    no_skip: NoSkipOption = False,
+    outline: OutlineOption = False,
+    full: FullOption = None,
+    max_tokens: Annotated[int, typer.Option("--max-tokens", help="Token budget for the code sent to the model; the most relevant files are kept.")] = None,
+    explain_context: Annotated[bool, typer.Option("--explain-context", help="Show which files were kept or dropped and the estimated token count.")] = False,
+    no_cache: Annotated[bool, typer.Option("--no-cache", help="Always call the model, bypassing the response cache.")] = False,
+    cache_only: Annotated[bool, typer.Option("--cache-only", help="Only use cached model responses; fail on a cache miss.")] = False,
+    stream: Annotated[bool, typer.Option("--stream", help="Stream the model output and save each file as soon as it is complete.")] = False,
+    output_format: Annotated[str, typer.Option("--format", help="'full' to have the model return whole files, 'diff' to have it return patches.")] = "full",
+    in_place: Annotated[bool, typer.Option("--in-place", help="With --format diff, patch the project files directly instead of writing to .beecode.d.")] = False,
+    profile: Annotated[bool, typer.Option("--profile", help="Time every stage, print a summary and export a Chrome trace to .agentbee/profile.")] = False,
+    no_daemon: Annotated[bool, typer.Option("--no-daemon", help="Run in this process even if an 'agentbee session --serve' daemon is listening.")] = False,
+    batch: Annotated[Path, typer.Option("--batch", help="A JSONL file of tasks, {\"instructions\": ..., \"id\": ...} per line, run concurrently against one snapshot.")] = None,
+    map_reduce: Annotated[bool, typer.Option("--map-reduce", help="For code larger than one context: find the files to change shard by shard, then edit only those. --max-tokens sets the size of each call.")] = False,
+    concurrency: Annotated[int, typer.Option("--concurrency", help="With --batch or --map-reduce, the maximum number of model calls in flight.")] = 4,
+    rate: Annotated[float, typer.Option("--rate", help="With --batch or --map-reduce, the maximum model calls started per second.")] = None,
+    retries: Annotated[int, typer.Option("--retries", help="With --batch or --map-reduce, retries with backoff after a rate-limit (429) error.")] = 5
 ):
     
+    if (instructions is None) == (batch is None):
+        print("🚨 Give either instructions or --batch <tasks.jsonl>.")
+        return
+    if batch is not None and (stream or output_format != "full"):
+        print("🚨 --batch is only supported with --format full and without --stream.")
+        return
+    if map_reduce and (batch is not None or stream or output_format != "full"):
+        print("🚨 --map-reduce is only supported with --format full, without --stream or --batch.")
+        return
+    if with_importers and not changed_since:
+        print("🚨 --with-importers only works together with --changed-since.")
+        return
+    if no_cache and cache_only:
+        print("🚨 --no-cache and --cache-only cannot be used together.")
+        return
+    if output_format not in ("full", "diff"):
+        print(f"🚨 Unknown --format '{output_format}'. Use 'full' or 'diff'.")
+        return
+    if output_format == "diff" and stream:
+        print("🚨 --stream is only supported with --format full.")
+        return
+    if concurrency < 1:
+        print("🚨 --concurrency must be at least 1.")
+        return
+    if output_format == "diff" and outline and not full:
+        print("🚨 --format diff patches whole files; choose the files to send whole with --full.")
+        return
+    if not (no_daemon or batch or map_reduce or rev or changed_since or stream or profile or fresh):
+        # A warm session daemon skips the imports, client setup and re-accumulation below.
+        from .core import session
+        options = {"path": path, "no_scrub": no_scrub or output_format == "diff", "max_file_size": max_file_size,
+                   "max_total_size": max_total_size, "no_skip": no_skip, "outline": outline, "full": full}
+        assist_options = {"max_tokens": max_tokens, "explain_context": explain_context,
+                          "cache_mode": "off" if no_cache else "only" if cache_only else "default",
+                          "output_format": output_format, "in_place": in_place}
+        try:
+            if session.run_via_daemon(accumulator.get_project_root(), instructions, options, assist_options) is not None:
+                return
+        except Exception as e:
+            print(f"⚠️ Warning: Could not use the session daemon, running here instead: {e}")
+
+    from langchain_core.runnables import RunnableLambda
+    import time
+    from .core import context, file_io, json_repair, llm_api, runner, snapshot, tracing
+    from .core.response_cache import ResponseCache
+
+    if output_format == "diff":
+        # Patches are matched against the files on disk, so the model must see them unscrubbed.
+        no_scrub = True
     logger.setup_logging(fresh)
     api_response = None
+    response_cache = None
+    parse_stats = None
+    # Disabled tracers return stages unwrapped, so this costs nothing without --profile.
+    tracer = tracing.Tracer(enabled=profile)
+    tracing.set_tracer(tracer)
     accumulated_code = ""
     error_message_for_log = None
     
     try:
-        cfg = config.load_config()
-        if not all(cfg.values()):
+        if not llm_api.is_configured():
             print("🚨 API configuration is incomplete. Please run 'agentbee config set --help'.")
             return
 
         # Create the runnable components
-        coding_model = GoogleGenerativeAI(model="gemini-2.0-flash", temperature=0, api_key=llm_api.get_api_key())
-        local_model = ChatOllama(model="phi3.5:latest", temperature=0)
-        assist_prompt = prompts.get_assist_prompt()
-        code_parser = parser.get_scripts_list_parser()        
-        fix_json_prompt = prompts.fix_json_prompt()
-        code_accumulator = RunnableLambda(runner.accumulate)
+        temperature = 0
+        llm = llm_api.get_coding_model(temperature)
+        model_name = llm.model_name
+        # Identical prompts (e.g. CI retries on an unchanged tree) are answered from the cache.
+        response_cache = ResponseCache(accumulator.get_project_root())
+        cache_mode = "off" if no_cache else "only" if cache_only else "default"
+        coding_model = RunnableLambda(response_cache.wrap(llm.invoke, model_name, temperature, cache_mode))
+        local_model = llm_api.get_fixer_model()
+        assist_prompt, code_parser, save = runner.get_output_components(output_format, in_place)
+        script_saver = RunnableLambda(save)
+        code_accumulator = RunnableLambda(runner.accumulate_files)
+        context_packer = RunnableLambda(
+            partial(runner.pack_context,
+                   instructions=instructions,
+                   max_tokens=max_tokens,
+                   explain=explain_context,
+                   path=path)
+        )
         model_logger = RunnableLambda(runner.log_model_output)
-        markdown_cleaner = RunnableLambda(runner.clean_markdown_json)
-        script_saver = RunnableLambda(runner.save_script)    
 
-        # The main parsing chain that takes the model's raw string output
-        code_parser_chain = markdown_cleaner | code_parser
-        
-        # The fallback "fixer" chain for when the main parser fails
-        json_fixer_chain = (
-            RunnableLambda(lambda x: print("🔴 Code Parsing failed. Trying to fix with local model..."))
-            | RunnableLambda(lambda x: {"input": x})  # Wrap the faulty string for the prompt
-             | fix_json_prompt
-             | local_model
-             | StrOutputParser()
-             | markdown_cleaner
-             | code_parser
-        )
-        
-        # Create a resilient parser by attaching the fallback
-        code_parser_with_fallback = code_parser_chain.with_fallbacks(
-            fallbacks=[json_fixer_chain],
-        )
+        # Create a resilient parser with repair and local-model fallbacks, recording how each tier fares
+        parse_stats = json_repair.TierStats(accumulator.get_project_root())
+        # A response is only cached once it parses, so a malformed one is not replayed on retry.
+        code_parser_with_fallback = runner.build_parser_with_fallback(code_parser, local_model, parse_stats,
+                                                                      response_cache.commit)
 
         # Create a pre-configured formatter using partial
         data_formatter = RunnableLambda(
             partial(runner.format_for_prompt, 
                    instructions=instructions,
-                   format_instructions=code_parser.get_format_instructions())
+                   format_instructions=code_parser.get_format_instructions(),
+                   store=snapshot.SnapshotStore(accumulator.get_project_root()))
         )
 
+        # Prepare input for the chain
+        runnable_input = {
+            "path": path,
+            "no_scrub": no_scrub,
+            "jobs": jobs,
+            "rev": rev,
+            "changed_since": changed_since,
+            "with_importers": with_importers,
+            "max_file_size": max_file_size,
+            "max_total_size": max_total_size,
+            "no_skip": no_skip,
+            "outline": outline,
+            "full": full,
+            "instructions": instructions
+        }
+
+        # Attach timing spans and counters to each stage (a no-op without --profile)
+        code_accumulator = tracer.runnable("code_accumulator", code_accumulator, lambda _, files: {
+            "files": len(files), "bytes": sum(len(content.encode('utf-8')) for _, content in files)})
+        context_packer = tracer.runnable("context_packer", context_packer, lambda _, files: {"files_kept": len(files)})
+        data_formatter = tracer.runnable("data_formatter", data_formatter)
+        assist_prompt = tracer.runnable("assist_prompt", assist_prompt, lambda _, prompt_value: {
+            "prompt_tokens": context.estimate_tokens(prompt_value.to_string())})
+        coding_model = tracer.runnable("coding_model", coding_model, lambda _, response: {
+            "output_tokens": context.estimate_tokens(response)})
+        code_parser_with_fallback = tracer.runnable("code_parser_with_fallback", code_parser_with_fallback, lambda _, __: {
+            "fallbacks": sum(entry["attempts"] for name, entry in parse_stats.run.items() if name != "parse")})
+        script_saver = tracer.runnable("script_saver", script_saver, lambda _, parsed: {"files_written": len(parsed.root)})
+
+        if batch is not None:
+            from .core import batch as batch_mode
+            tasks = batch_mode.load_tasks(batch)
+            files = code_accumulator.invoke(runnable_input)
+            batch_runner = batch_mode.BatchRunner(
+                files,
+                response_cache.wrap_async(llm.ainvoke, model_name, temperature, cache_mode),
+                assist_prompt, code_parser, code_parser_with_fallback,
+                accumulator.get_project_root() / file_io.BEECODE_DIR,
+                max_tokens=max_tokens, concurrency=concurrency, rate=rate, retries=retries, path=path
+            )
+            print(f"\n🐝 Running {len(tasks)} task(s), up to {concurrency} at a time...")
+            start = time.perf_counter()
+            results = batch_runner.run(tasks)
+            seconds = time.perf_counter() - start
+            batch_mode.print_summary(results, batch_runner.conflicts(), seconds)
+            print(f"📝 Report written to {batch_runner.write_report(results, seconds)}")
+            return
+
+        if map_reduce:
+            from .core import mapreduce, parser, prompts
+            files = code_accumulator.invoke(runnable_input)
+            selection_parser = parser.get_selection_list_parser()
+            # Outlined files are read again in full once they are selected for editing.
+            load_full = partial(file_io.read_code, scrub_comments=not no_scrub) if (outline or full) and not rev else None
+            map_reduce_runner = mapreduce.MapReduceRunner(
+                accumulator.get_project_root(), files,
+                response_cache.wrap_async(llm.ainvoke, model_name, temperature, cache_mode),
+                prompts.get_map_prompt(), selection_parser,
+                runner.build_parser_with_fallback(selection_parser, local_model, parse_stats, response_cache.commit),
+                assist_prompt, code_parser, code_parser_with_fallback,
+                max_tokens=max_tokens or mapreduce.DEFAULT_SHARD_TOKENS,
+                concurrency=concurrency, rate=rate, retries=retries, load_full=load_full
+            )
+            api_response = script_saver.invoke(map_reduce_runner.run(instructions))
+            print(f"\n✅ Code generation completed and saved")
+            return
+
+        if stream:
+            # Render the prompt, then parse and save files while the model is still generating.
+            prompt_chain = code_accumulator | context_packer | data_formatter | assist_prompt
+            prompt_value = prompt_chain.invoke(runnable_input)
+            stream_model = response_cache.wrap_stream(llm.stream, model_name, temperature, cache_mode)
+            response_chunks = []
+
+            def collect(chunks):
+                for chunk in chunks:
+                    response_chunks.append(chunk)
+                    yield chunk
+
+            with tracer.span("stream_and_save") as counters:
+                api_response = runner.stream_and_save(collect(stream_model(prompt_value)), code_parser_with_fallback)
+                counters["files_written"] = len(api_response.root)
+            response_cache.commit("".join(response_chunks))
+            print(f"\n✅ Code generation completed and saved")
+            return
+
         # Assemble the full chain
         assist_chain = (
             code_accumulator 
+            | context_packer
             | data_formatter 
             | assist_prompt 
             | coding_model 
@@ -108,13 +304,6 @@ def assist(
             | script_saver
         )
         
-        # Prepare input for the chain
-        runnable_input = {
-            "path": path,
-            "no_scrub": no_scrub,
-            "instructions": instructions
-        }
-        
         # Execute the chain
         api_response = assist_chain.invoke(runnable_input)
         
@@ -123,6 +312,18 @@ def assist(
     except Exception as e:
         error_message_for_log = str(e)
         print(f"🚨 Operation failed: {e}")
+    finally:
+        if response_cache:
+            print(f"📊 {response_cache.summary()}")
+            response_cache.close()
+        if parse_stats and parse_stats.run:
+            print(f"📊 {parse_stats.summary()}")
+            parse_stats.save()
+        if tracer.spans:
+            print(f"\n⏱️  Profile:\n{tracer.summary()}")
+            trace_name = f"assist-{time.strftime('%Y%m%d-%H%M%S')}.json"
+            trace_path = tracer.export_chrome(accumulator.get_project_root() / tracing.TRACE_DIR / trace_name)
+            print(f"📈 Chrome trace written to {trace_path} (open it in chrome://tracing or ui.perfetto.dev)")
     # finally:
     #     logger.log_output(accumulated_code, response_data=api_response, error_message=error_message_for_log)
 
@@ -130,9 +331,188 @@ def assist(
 def auto(
     test_script: Annotated[Path, typer.Option("--test", help="Path to the shell script for verification.")],
     max_iterations: Annotated[int, typer.Option("--max-iterations", help="Maximum number of attempts.")] = 5,
-    fresh: FreshOption = False
+    fresh: FreshOption = False,
+    candidates: Annotated[int, typer.Option("--candidates", "-n", help="Number of candidate fixes generated and tested in parallel per iteration.")] = 3,
+    timeout: Annotated[float, typer.Option("--timeout", help="Seconds after which a candidate's test run is killed.")] = None,
+    path: PathOption = None,
+    no_scrub: NoScrubOption = False,
+    jobs: JobsOption = 1,
+    max_file_size: MaxFileSizeOption = None,
+    no_skip: NoSkipOption = False
 ):
-    pass
+    """Runs the test script and asks the model for fixes until it passes."""
+    import time
+    from .core import auto as candidate_search
+    from .core import llm_api, parser, prompts, runner
+
+    if candidates < 1:
+        print("🚨 --candidates must be at least 1.")
+        return
+    if not test_script.is_file():
+        print(f"🚨 Test script not found: {test_script}")
+        return
+    logger.setup_logging(fresh)
+    start = time.perf_counter()
+
+    try:
+        if not llm_api.is_configured():
+            print("🚨 API configuration is incomplete. Please run 'agentbee config set --help'.")
+            return
+
+        project_root = accumulator.get_project_root().resolve()
+        print(f"🧪 Running {test_script}...")
+        baseline = candidate_search.run_test(test_script.resolve(), project_root, timeout=timeout)
+        if baseline.passed:
+            print(f"✅ Test already passes ({baseline.seconds:.1f}s)")
+            return
+        print(f"🔴 Test failed ({baseline.seconds:.1f}s)")
+
+        files = runner.accumulate_files({"path": path, "no_scrub": no_scrub, "jobs": jobs,
+                                         "max_file_size": max_file_size, "no_skip": no_skip})
+        # Candidates are sampled with some temperature so parallel requests differ.
+        llm = llm_api.get_coding_model(0.7)
+        assist_prompt = prompts.get_assist_prompt()
+        format_instructions = parser.get_scripts_list_parser().get_format_instructions()
+        search = candidate_search.CandidateSearch(project_root, test_script, llm.invoke, candidates, timeout)
+
+        failed = []
+        for iteration in range(1, max_iterations + 1):
+            query = candidate_search.build_query(test_script, baseline.output, failed)
+            prompt_value = assist_prompt.invoke(runner.format_for_prompt(files, query, format_instructions))
+            print(f"\n🐝 Iteration {iteration}/{max_iterations}: trying {candidates} candidate(s)...")
+            winner, results = search.run(prompt_value)
+            candidate_search.print_round(iteration, results)
+            if winner is not None:
+                written = candidate_search.write_scripts(winner.scripts, project_root)
+                print(f"\n🩹 Applied candidate #{winner.number}: {', '.join(written)}")
+                print(f"✅ Green after {iteration} iteration(s) in {time.perf_counter() - start:.1f}s")
+                return
+            failed.extend(r for r in results if r.status != "cancelled")
+        print(f"\n🚨 No candidate passed after {max_iterations} iteration(s) "
+              f"({time.perf_counter() - start:.1f}s)")
+    except Exception as e:
+        print(f"🚨 Operation failed: {e}")
+
+@app.command()
+def session(
+    path: PathOption = None,
+    no_scrub: NoScrubOption = False,
+    jobs: JobsOption = 1,
+    max_file_size: MaxFileSizeOption = None,
+    max_total_size: MaxTotalSizeOption = None,
+    no_skip: NoSkipOption = False,
+    outline: OutlineOption = False,
+    full: FullOption = None,
+    max_tokens: Annotated[int, typer.Option("--max-tokens", help="Token budget for the code sent to the model; the most relevant files are kept.")] = None,
+    output_format: Annotated[str, typer.Option("--format", help="'full' to have the model return whole files, 'diff' to have it return patches.")] = "full",
+    serve: Annotated[bool, typer.Option("--serve", help="Run as a daemon on .agentbee/session.sock that 'agentbee assist' uses transparently.")] = False
+):
+    """Keeps the accumulated code and model clients warm across instructions."""
+    from .core import llm_api
+    from .core import session as warm_session
+
+    if output_format not in ("full", "diff"):
+        print(f"🚨 Unknown --format '{output_format}'. Use 'full' or 'diff'.")
+        return
+    if output_format == "diff" and outline and not full:
+        print("🚨 --format diff patches whole files; choose the files to send whole with --full.")
+        return
+    if not llm_api.is_configured():
+        print("🚨 API configuration is incomplete. Please run 'agentbee config set --help'.")
+        return
+    options = {"path": path, "no_scrub": no_scrub or output_format == "diff", "jobs": jobs,
+               "max_file_size": max_file_size, "max_total_size": max_total_size, "no_skip": no_skip,
+               "outline": outline, "full": full}
+    try:
+        current = warm_session.Session(options)
+    except Exception as e:
+        print(f"🚨 Operation failed: {e}")
+        return
+    try:
+        if serve:
+            warm_session.serve(current)
+        else:
+            warm_session.repl(current, max_tokens=max_tokens, output_format=output_format)
+    except Exception as e:
+        print(f"🚨 Operation failed: {e}")
+    finally:
+        current.close()
+
+@index_app.command("build")
+def index_build(path: PathOption = None):
+    """Builds the code search index from scratch."""
+    try:
+        project_root = accumulator.get_project_root()
+        file_paths = accumulator.get_file_paths(project_root, path)
+        with index.CodeIndex(project_root) as code_index:
+            count = code_index.build(file_paths)
+            print(f"✅ Indexed {count} files ({code_index.size_bytes() / 1024:.0f} KB) in {code_index.db_path}")
+    except Exception as e:
+        print(f"🚨 Operation failed: {e}")
+
+@index_app.command("update")
+def index_update(path: PathOption = None):
+    """Re-indexes only the files changed since the last indexed commit."""
+    try:
+        project_root = accumulator.get_project_root()
+        file_paths = accumulator.get_file_paths(project_root, path)
+        with index.CodeIndex(project_root) as code_index:
+            reindexed, removed = code_index.update(file_paths, index.path_scope(project_root, path))
+            print(f"✅ Re-indexed {reindexed} files, removed {removed}")
+    except Exception as e:
+        print(f"🚨 Operation failed: {e}")
+
+@index_app.command("query")
+def index_query(
+    text: Annotated[str, typer.Argument(help="Words or identifiers to search for.")],
+    limit: Annotated[int, typer.Option("--limit", "-n", help="Maximum number of results.")] = 20
+):
+    """Lists the files that best match a query."""
+    try:
+        project_root = accumulator.get_project_root()
+        if not index.CodeIndex.exists(project_root):
+            print("🚨 No index found. Please run 'agentbee index build' first.")
+            return
+        with index.CodeIndex(project_root) as code_index:
+            for rel_path, score in code_index.query(text, limit=limit):
+                print(f"  {score:7.2f}  {rel_path}")
+    except Exception as e:
+        print(f"🚨 Operation failed: {e}")
+
+@log_app.command("list")
+def log_list(limit: Annotated[int, typer.Option("--limit", "-n", help="Number of entries to show.")] = 20):
+    """Lists the most recent log entries, newest first."""
+    entries = logger.get_log_store().list(limit)
+    if not entries:
+        print(f"No log entries found in {logger.LOG_DIR}")
+    for entry in entries:
+        print(logger.format_entry(entry))
+
+@log_app.command("show")
+def log_show(
+    entry_id: Annotated[int, typer.Argument(help="The id of the entry, as shown by 'agentbee log list'.")],
+    code: Annotated[bool, typer.Option("--code", help="Print the accumulated code instead of the file list.")] = False
+):
+    """Prints one log entry."""
+    store = logger.get_log_store()
+    entry = store.get(entry_id)
+    if entry is None:
+        print(f"🚨 No log entry #{entry_id} (it may have been rotated out).")
+        return
+    try:
+        for text in logger.iter_entry_text(store, entry, with_code=code):
+            print(text, end="")
+    except (OSError, RuntimeError) as e:
+        print(f"\n🚨 Could not read log entry: {e}")
+
+@log_app.command("last")
+def log_last(code: Annotated[bool, typer.Option("--code", help="Print the accumulated code instead of the file list.")] = False):
+    """Prints the most recent log entry."""
+    count = logger.get_log_store().count()
+    if not count:
+        print(f"No log entries found in {logger.LOG_DIR}")
+        return
+    log_show(count, code=code)
 
 @app.command("show")
 def show_config():
@@ -149,6 +529,16 @@ def show_config():
         
         for key, value in cfg.items():
             print(f"  - {key}: {value}")
+    try:
+        router_config = config.load_router_config()
+    except ValueError as e:
+        print(f"🚨 Configuration error: {e}")
+        return
+    if router_config.coding:
+        print("Coding endpoints, in order of preference:")
+        for endpoint in router_config.coding:
+            print(f"  - {endpoint.name}: {endpoint.provider} {endpoint.model} {endpoint.base_url}".rstrip())
+        print(f"Fixer endpoint: {router_config.fixer.name} ({router_config.fixer.provider} {router_config.fixer.model})")
 
 @app.command()
 def config_set(
@@ -0,0 +1,85 @@
+"""
+`.beeinclude` filtering on synthetic git repos: the per-(path, pattern)
+`Path.match` loop it replaced, the compiled matcher, and the compiled matcher
+behind git pathspec pushdown (listing plus filtering, as `get_file_paths` does).
+
+    python -m benchmarks.bench_beeinclude --sizes 10000 100000
+"""
+import argparse
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from agentbee.core import beeinclude
+
+from . import synthetic_repo
+
+PATTERNS = [
+    "pkg1/**/*.py", "pkg2/**/*.js", "pkg3/sub1/", "pkg4/*/*.c", "*.md", "pkg5*/**",
+    "!pkg5/sub2/", "pkg6/sub[0-4]/*.py", "!**/file_1*.js", "pkg7/**/*.go", "pkg8/", "!pkg8/sub9/",
+]
+
+
+def legacy_filter(paths: List[Path], patterns: List[str], root: Path) -> List[Path]:
+    """The pre-compiled implementation, kept verbatim as the baseline."""
+    filtered = []
+    for path in paths:
+        if any(path.match(str((root / p).resolve().relative_to(root.resolve()))) for p in patterns):
+            filtered.append(path)
+    return filtered
+
+
+def git_ls_files(root: Path, pathspecs: List[str]) -> List[str]:
+    result = subprocess.run(['git', 'ls-files', '-z', '--', *pathspecs],
+                            cwd=root, capture_output=True, text=True, check=True)
+    return [p for p in result.stdout.split('\0') if p]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def bench(files: int, legacy_limit: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        synthetic_repo.generate(root, synthetic_repo.RepoSpec(
+            files=files, size_distribution="fixed:0.1", languages={"py": 4, "js": 3, "c": 1, "go": 1, "md": 1}))
+
+        list_s, relative_paths = timed(lambda: git_ls_files(root, []))
+        paths = [root / p for p in relative_paths]
+        # Only positive patterns: the legacy code has no exclusion support.
+        positive = [p for p in PATTERNS if not p.startswith('!')]
+
+        if files <= legacy_limit:
+            legacy_s, legacy_kept = timed(lambda: legacy_filter(paths, positive, root))
+            legacy = f"{legacy_s * 1000:10.1f} ({len(legacy_kept)})"
+        else:
+            legacy = f"{'skipped':>10}"
+
+        compile_s, matcher = timed(lambda: beeinclude.IncludeMatcher(PATTERNS))
+        compiled_s, kept = timed(lambda: matcher.filter_paths(paths, root))
+        pushdown_s, pushed = timed(lambda: matcher.filter(git_ls_files(root, matcher.to_pathspecs())))
+        assert sorted(pushed) == sorted(p.relative_to(root).as_posix() for p in kept)
+
+        print(f"{files:>7} {legacy:>18} {compiled_s * 1000:10.1f} ({len(kept)}) "
+              f"{(list_s + compiled_s + compile_s) * 1000:12.1f} {pushdown_s * 1000:12.1f}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    arg_parser.add_argument("--legacy-limit", type=int, default=20000,
+                            help="Skip the legacy matcher above this many files; it is very slow.")
+    args = arg_parser.parse_args()
+    print(f"{len(PATTERNS)} patterns; times in ms, files kept in parentheses")
+    print(f"{'files':>7} {'legacy':>18} {'compiled':>17} {'ls+compiled':>12} {'pushdown':>12}")
+    for files in args.sizes:
+        bench(files, args.legacy_limit)
+
+
+if __name__ == "__main__":
+    main()
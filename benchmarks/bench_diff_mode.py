@@ -0,0 +1,71 @@
+"""
+Compares `assist --format full` against `--format diff` on the same
+instructions: output tokens, model latency, local apply time and end-to-end
+time. Runs against the configured model from the current repository (or the
+canned AGENTBEE_FAKE_RESPONSE model). Nothing is written to disk.
+
+    python -m benchmarks.bench_diff_mode "Rename helper foo to bar" --path src
+"""
+import argparse
+import time
+from pathlib import Path
+
+from agentbee.core import accumulator, context, json_repair, llm_api, parser, patch, prompts, runner
+
+
+def run_mode(output_format: str, instructions: str, path: Path, llm) -> dict:
+    start = time.perf_counter()
+    files = runner.accumulate_files({"path": path, "no_scrub": output_format == "diff"})
+    if output_format == "diff":
+        prompt, code_parser = prompts.get_assist_diff_prompt(), parser.get_patch_list_parser()
+    else:
+        prompt, code_parser = prompts.get_assist_prompt(), parser.get_scripts_list_parser()
+    prompt_value = prompt.invoke(
+        runner.format_for_prompt(files, instructions, code_parser.get_format_instructions())
+    )
+
+    model_start = time.perf_counter()
+    response = llm.invoke(prompt_value)
+    model_s = time.perf_counter() - model_start
+
+    apply_start = time.perf_counter()
+    parsed = code_parser.parse(json_repair.repair(response))
+    applied = 0
+    if output_format == "diff":
+        project_root = accumulator.get_project_root()
+        for file_patch in parsed.root:
+            source = project_root / runner.resolve_output_path(file_patch.file_path, project_root)
+            original = source.read_text(encoding='utf-8') if source.exists() else None
+            try:
+                patch.apply_patch_text(original, file_patch.patch)
+                applied += 1
+            except patch.PatchError as e:
+                print(f"⚠️ {file_patch.file_path}: {e}")
+    else:
+        applied = len(parsed.root)
+    apply_s = time.perf_counter() - apply_start
+
+    return {
+        "output_tokens": context.estimate_tokens(response),
+        "model_s": model_s,
+        "apply_s": apply_s,
+        "total_s": time.perf_counter() - start,
+        "files": f"{applied}/{len(parsed.root)}",
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("instructions")
+    arg_parser.add_argument("--path", type=Path, default=None)
+    args = arg_parser.parse_args()
+
+    llm = llm_api.get_coding_model(0)
+    results = {mode: run_mode(mode, args.instructions, args.path, llm) for mode in ("full", "diff")}
+    print(f"\n{'mode':<6}{'out tokens':>12}{'model s':>10}{'apply s':>10}{'total s':>10}{'files':>8}")
+    for mode, r in results.items():
+        print(f"{mode:<6}{r['output_tokens']:>12,}{r['model_s']:>10.2f}{r['apply_s']:>10.3f}{r['total_s']:>10.2f}{r['files']:>8}")
+
+
+if __name__ == "__main__":
+    main()
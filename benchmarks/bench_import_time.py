@@ -0,0 +1,65 @@
+"""
+CLI startup-time budget. Runs each subcommand under `python -X importtime`
+and fails when the total import time exceeds its budget, so heavy imports
+(langchain, model providers) can't creep back into light commands.
+
+    python -m benchmarks.bench_import_time
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+# Budgets in milliseconds of total import time. `--help` exits before the
+# command body runs, so these measure what every invocation pays up front;
+# rendering help loads `rich`, hence the higher budgets.
+BUDGETS_MS = {
+    "show": 200,
+    "config-set --help": 400,
+    "accumulate --help": 400,
+    "index query --help": 400,
+    "assist --help": 400,
+    "session --help": 400,
+    "log last": 200,
+}
+
+_IMPORT_LINE = re.compile(r"^import time:\s+(\d+)\s+\|")
+
+
+def import_time_ms(subcommand: str) -> float:
+    """Sums the self time of every module imported while running a subcommand."""
+    with tempfile.TemporaryDirectory() as home:
+        # An empty HOME keeps `show` from reading the developer's real config.
+        env = dict(os.environ, HOME=home)
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-m", "agentbee.main", *subcommand.split()],
+            capture_output=True, text=True, env=env
+        )
+    total_us = 0
+    for line in result.stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match:
+            total_us += int(match.group(1))
+    return total_us / 1000
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--repeat", type=int, default=3, help="Runs per subcommand; the best is reported.")
+    args = arg_parser.parse_args()
+
+    failures = []
+    print(f"{'subcommand':<22}{'import ms':>12}{'budget ms':>12}")
+    for subcommand, budget in BUDGETS_MS.items():
+        elapsed = min(import_time_ms(subcommand) for _ in range(args.repeat))
+        flag = "" if elapsed <= budget else "  ❌ over budget"
+        print(f"{subcommand:<22}{elapsed:>12.1f}{budget:>12}{flag}")
+        if elapsed > budget:
+            failures.append(subcommand)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
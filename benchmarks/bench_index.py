@@ -0,0 +1,84 @@
+"""
+Build time, incremental update time, query latency and on-disk size of the
+persistent code search index (`agentbee.core.index`) on synthetic git repos.
+
+    python -m benchmarks.bench_index --sizes 1000 10000 100000
+"""
+import argparse
+import random
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from agentbee.core import accumulator, index
+
+WORDS = [
+    "request", "response", "handler", "session", "token", "user", "account", "cache",
+    "parser", "render", "config", "client", "server", "router", "model", "query",
+    "index", "buffer", "stream", "worker", "queue", "event", "logger", "schema",
+]
+QUERIES = ["session token handler", "parseConfig", "render_stream buffer", "QueueWorker event"]
+
+
+def _git(root: Path, *args: str):
+    subprocess.run(['git', *args], cwd=root, check=True, capture_output=True)
+
+
+def generate_repo(root: Path, files: int, seed: int = 0):
+    rng = random.Random(seed)
+    for i in range(files):
+        target = root / f"pkg{i % 100}" / f"mod{i // 100 % 100}" / f"file_{i}.py"
+        target.parent.mkdir(parents=True, exist_ok=True)
+        lines = []
+        for _ in range(rng.randint(10, 60)):
+            a, b = rng.sample(WORDS, 2)
+            lines.append(f"def {a}_{b}_{rng.randint(0, 999)}({b}): return {a}.{rng.choice(WORDS)}({b})")
+        target.write_text("\n".join(lines) + "\n", encoding='utf-8')
+    _git(root, 'init', '-q')
+    _git(root, 'add', '.')
+    _git(root, '-c', 'user.email=bench@example.com', '-c', 'user.name=bench', 'commit', '-qm', 'initial')
+
+
+def bench(files: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        generate_repo(root, files)
+        file_paths = accumulator.get_file_paths(root, None)
+
+        with index.CodeIndex(root) as code_index:
+            start = time.perf_counter()
+            code_index.build(file_paths)
+            build_s = time.perf_counter() - start
+
+            # Touch 1% of the files, then commit, so update has real work to do.
+            for file_path in file_paths[::100]:
+                with open(file_path, 'a', encoding='utf-8') as f:
+                    f.write("def freshly_added(): return 1\n")
+            _git(root, '-c', 'user.email=bench@example.com', '-c', 'user.name=bench', 'commit', '-qam', 'touch')
+            start = time.perf_counter()
+            code_index.update(file_paths)
+            update_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            rounds = 5
+            for _ in range(rounds):
+                for query in QUERIES:
+                    code_index.query(query)
+            query_ms = (time.perf_counter() - start) / (rounds * len(QUERIES)) * 1000
+            size_mb = code_index.size_bytes() / (1024 * 1024)
+
+    print(f"{files:>8} {build_s:>10.2f} {update_s:>10.2f} {query_ms:>10.1f} {size_mb:>10.1f}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = arg_parser.parse_args()
+    print(f"{'files':>8} {'build s':>10} {'update s':>10} {'query ms':>10} {'size MB':>10}")
+    for files in args.sizes:
+        bench(files)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Lookup latency and on-disk size of the log store (`agentbee.core.log_store`)
+as its history grows, compared with the bytes the old append-only `.bee.log`
+would have written for the same runs.
+
+    python -m benchmarks.bench_log_store --entries 100 1000 5000 --files 200
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from agentbee.core.log_store import LogStore
+
+SAMPLE_LINE = "def handler(request):\n    return request.body\n"
+
+
+def directory_bytes(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob('*') if p.is_file())
+
+
+def timed_ms(fn, repeat: int = 200) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def bench(entries: int, files: int, file_kb: int):
+    rng = random.Random(0)
+    body = SAMPLE_LINE * (file_kb * 1024 // len(SAMPLE_LINE) + 1)
+    contents = {f"pkg/module_{i}.py": body + f"# {i}\n" for i in range(files)}
+    with tempfile.TemporaryDirectory() as tmp:
+        # Generous limits, so this measures growth rather than pruning.
+        store = LogStore(Path(tmp) / "logs", max_segment_bytes=64 * 1024, max_bytes=1 << 40)
+        plain_bytes = 0
+        start = time.perf_counter()
+        for run in range(entries):
+            # Each run edits one file, as a typical edit-and-rerun loop would.
+            edited = f"pkg/module_{rng.randrange(files)}.py"
+            contents[edited] = body + f"# run {run}\n"
+            store.append(list(contents.items()), response_data='[{"file_path": "x.py"}]', command="bench")
+            plain_bytes += sum(len(path) + len(code) + 20 for path, code in contents.items())
+        append_ms = (time.perf_counter() - start) / entries * 1000
+
+        last_ms = timed_ms(store.last)
+        get_ms = timed_ms(lambda: store.get(rng.randint(1, entries)))
+        list_ms = timed_ms(lambda: store.list(20), repeat=50)
+        stored_mb = directory_bytes(store.log_dir) / 1024 / 1024
+        print(f"{entries:>7} {append_ms:>10.1f} {last_ms:>8.3f} {get_ms:>8.3f} {list_ms:>9.3f} "
+              f"{stored_mb:>10.1f} {plain_bytes / 1024 / 1024:>11.1f}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--entries", type=int, nargs="+", default=[100, 1000])
+    arg_parser.add_argument("--files", type=int, default=200)
+    arg_parser.add_argument("--file-kb", type=int, default=4)
+    args = arg_parser.parse_args()
+
+    print(f"{'entries':>7} {'append ms':>10} {'last ms':>8} {'show ms':>8} {'list20 ms':>9} "
+          f"{'store MB':>10} {'.bee.log MB':>11}")
+    for entries in args.entries:
+        bench(entries, args.files, args.file_kb)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Checks map-reduce assist offline against a scripted model on a synthetic
+repository in which some files carry a marker: the snapshot is split into
+several shards, the map pass selects exactly the marked files (plus one new
+file asked for by every shard), the reduce pass writes only those, with
+duplicates merged and edits to outlined files dropped, and no more calls
+than --concurrency are in flight. Then compares the run time with one call
+at a time and with --concurrency calls.
+
+    python -m benchmarks.bench_map_reduce --files 400 --concurrency 8
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+from agentbee.core import fakes, mapreduce, parser, prompts, runner
+
+MARKER = "CHANGE_ME"
+NEW_FILE = "pkg_new/registry.py"
+_HEADER_RE = re.compile(r"--- FILE: (.+?) ---\n")
+
+
+def make_files(root: Path, count: int, per_directory: int, every: int) -> List[Tuple[Path, str]]:
+    """Python modules importing their neighbours; every `every`-th one carries the marker."""
+    files = []
+    for n in range(count):
+        directory = f"pkg_{n // per_directory:03d}"
+        previous = max(n - 1, 0)
+        lines = [f"from pkg_{previous // per_directory:03d}.mod_{previous:04d} import handler_{previous}_0", "", ""]
+        for k in range(12):
+            lines += [f"def handler_{n}_{k}(request, retries=3):",
+                      f"    value = handler_{previous}_0(request)",
+                      f"    return value * {k} + len(request)", ""]
+        if n % every == 0:
+            lines.append(f"# {MARKER}: this module must change")
+        files.append((root / directory / f"mod_{n:04d}.py", "\n".join(lines) + "\n"))
+    return files
+
+
+def sections(prompt: str) -> List[Tuple[str, str]]:
+    """The (path, content) of each FILE section in a rendered prompt."""
+    parts = _HEADER_RE.split(prompt)
+    return [(parts[i], parts[i + 1]) for i in range(1, len(parts) - 1, 2)]
+
+
+def script(root: Path):
+    def respond(prompt: str) -> str:
+        if "Do NOT write any code" in prompt:
+            selected = [{"file_path": path, "reason": "it carries the marker"}
+                        for path, content in sections(prompt) if MARKER in content]
+            selected.append({"file_path": NEW_FILE, "reason": "the registry is new"})
+            return json.dumps(selected)
+        requested = re.findall(r"^- (\S+?)(?: \(new file\))?: ", prompt, re.MULTILINE)
+        outputs = [{"file_path": path, "code_content": "# first draft\n"} for path in requested[:1]]
+        outputs += [{"file_path": path, "code_content": f"# edited {path}\n"} for path in requested]
+        # An edit to a file shown only as an outline, which must be dropped.
+        outlined = [path for path, _ in sections(prompt) if path not in requested]
+        outputs += [{"file_path": path, "code_content": "# outline clobbered\n"} for path in outlined[:1]]
+        return json.dumps(outputs)
+    return respond
+
+
+def run_once(root: Path, files, model: fakes.ScriptedModel, max_tokens: int, concurrency: int):
+    _, code_parser, _ = runner.get_output_components("full")
+    selection_parser = parser.get_selection_list_parser()
+    map_reduce_runner = mapreduce.MapReduceRunner(
+        root, files, model.ainvoke, prompts.get_map_prompt(), selection_parser, selection_parser,
+        prompts.get_assist_prompt(), code_parser, code_parser, max_tokens=max_tokens, concurrency=concurrency)
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = map_reduce_runner.run("Apply the marker change.")
+        seconds = time.perf_counter() - start
+    return result.root, seconds
+
+
+def check(name: str, condition: bool, detail: str = ""):
+    print(f"  {'ok  ' if condition else 'FAIL'} {name}{': ' + detail if detail else ''}")
+    if not condition:
+        raise SystemExit(1)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--files", type=int, default=400)
+    arg_parser.add_argument("--per-directory", type=int, default=20)
+    arg_parser.add_argument("--every", type=int, default=25, help="Mark one file in this many.")
+    arg_parser.add_argument("--max-tokens", type=int, default=30_000, help="The budget of each call.")
+    arg_parser.add_argument("--concurrency", type=int, default=8)
+    arg_parser.add_argument("--latency", type=float, default=0.05, help="Seconds per simulated model call.")
+    args = arg_parser.parse_args()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp).resolve()
+        # Prompts show paths relative to the project root, which is found from the working directory.
+        subprocess.run(["git", "init", "-q", str(root)], check=True)
+        os.chdir(root)
+        try:
+            files = make_files(root, args.files, args.per_directory, args.every)
+            relative = [path.relative_to(root).as_posix() for path, _ in files]
+            marked = {path for path, (_, content) in zip(relative, files) if MARKER in content}
+            expected = marked | {NEW_FILE}
+
+            print("Checks:")
+            model = fakes.ScriptedModel(script(root), latency=args.latency)
+            outputs, parallel = run_once(root, files, model, args.max_tokens, args.concurrency)
+            map_calls = sum("Do NOT write any code" in prompt for prompt in model.prompts)
+            reduce_calls = len(model.prompts) - map_calls
+            check("splits the snapshot into several shards", map_calls > 1, f"{map_calls} map call(s)")
+            mapped = [path for prompt in model.prompts if "Do NOT write any code" in prompt for path, _ in sections(prompt)]
+            check("shows every file to exactly one map call", sorted(mapped) == sorted(relative))
+            written = [output.file_path for output in outputs]
+            check("writes exactly the selected files", set(written) == expected,
+                  f"{len(written)} written, {len(expected)} expected")
+            check("writes each file once", len(written) == len(set(written)))
+            check("keeps the last version of a file within a call",
+                  all(output.code_content == f"# edited {output.file_path}\n" for output in outputs))
+            reduce_prompts = [prompt for prompt in model.prompts if "Do NOT write any code" not in prompt]
+            check("shows the reduce calls outlines of imported files",
+                  any("for reference only" in prompt for prompt in reduce_prompts))
+            check("drops edits to outlined files", all("clobbered" not in output.code_content for output in outputs))
+            check("keeps calls within --concurrency", model.max_in_flight == min(args.concurrency, map_calls),
+                  f"at most {model.max_in_flight} in flight")
+
+            serial_model = fakes.ScriptedModel(script(root), latency=args.latency)
+            _, serial = run_once(root, files, serial_model, args.max_tokens, 1)
+        finally:
+            os.chdir(cwd)
+
+    print(f"\n{len(files)} files, {map_calls} map and {reduce_calls} reduce call(s) of {args.latency * 1000:.0f} ms:")
+    print(f"  one call at a time {serial:.2f}s, {args.concurrency} at a time {parallel:.2f}s "
+          f"({serial / parallel:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
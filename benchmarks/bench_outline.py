@@ -0,0 +1,84 @@
+"""
+Compares whole-file accumulation with outlines (signatures, type hints,
+constants and imports only): the size of the code sent to the model, in
+bytes and estimated tokens, and accumulation time with a cold and a warm
+cache. Runs on a synthetic repository, or on an existing one with --repo.
+
+    python -m benchmarks.bench_outline --files 5000
+    python -m benchmarks.bench_outline --repo ~/src/some-project --jobs 4
+"""
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Tuple
+
+from agentbee.core import cache, context, file_io, runner
+
+from . import synthetic_repo
+
+MODES: Dict[str, Dict[str, object]] = {
+    "full": {},
+    "outline": {"outline": True},
+}
+
+
+def accumulate(root: Path, options: Dict[str, object], jobs: int, cold: bool) -> Tuple[float, str]:
+    """Accumulates the repository at root; returns the seconds taken and the accumulated code."""
+    if cold:
+        shutil.rmtree(root / cache.CACHE_DIR, ignore_errors=True)
+    runnable_input = dict(options, jobs=jobs)
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        code = file_io.join_code(runner.iter_accumulated(runnable_input))
+        seconds = time.perf_counter() - start
+    return seconds, code
+
+
+def run(root: Path, jobs: int):
+    cwd = os.getcwd()
+    # The project root is resolved from the working directory.
+    os.chdir(root)
+    try:
+        print(f"{'mode':<9} {'bytes':>12} {'est. tokens':>12} {'cold s':>8} {'warm s':>8}")
+        sizes = {}
+        for name, options in MODES.items():
+            cold, code = accumulate(root, options, jobs, cold=True)
+            warm, _ = accumulate(root, options, jobs, cold=False)
+            size, tokens = len(code.encode('utf-8')), context.estimate_tokens(code)
+            sizes[name] = (size, tokens)
+            print(f"{name:<9} {size:>12,} {tokens:>12,} {cold:>8.2f} {warm:>8.2f}")
+    finally:
+        os.chdir(cwd)
+    (full_bytes, full_tokens), (outline_bytes, outline_tokens) = sizes["full"], sizes["outline"]
+    print(f"\nOutlines are {1 - outline_bytes / full_bytes:.0%} smaller in bytes "
+          f"and {1 - outline_tokens / full_tokens:.0%} in estimated tokens")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    synthetic_repo.add_spec_arguments(arg_parser)
+    arg_parser.add_argument("--repo", type=Path, help="Benchmark this git repository instead of a synthetic one.")
+    arg_parser.add_argument("--jobs", type=int, default=1)
+    args = arg_parser.parse_args()
+    if args.repo:
+        # The cache is cleared between runs, so work on a copy.
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp).resolve() / "repo"
+            shutil.copytree(args.repo, root, symlinks=True, ignore=shutil.ignore_patterns(".agentbee"))
+            run(root, args.jobs)
+        return
+    spec = synthetic_repo.spec_from_args(args)
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp).resolve()
+        print(f"Generating {spec.files} files...")
+        synthetic_repo.generate(root, spec)
+        run(root, args.jobs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Measures offline what a byte-stable code prefix saves with providers that
+cache prompt prefixes. PrefixCacheStub is a local OpenAI-compatible server
+that prices and delays each request like such a provider: the leading
+blocks of a prompt that started an earlier prompt are cached, billed at a
+discount and prefilled faster. A series of assist prompts, with different
+instructions, alternating output formats and two checkouts of the same
+tree, is sent through the router twice: laid out as before snapshots (the
+code inside the system message after the format instructions, under
+absolute paths) and as canonical snapshots ahead of the instructions. The
+code is accumulated without scrubbing, as --format diff requires.
+
+    python -m benchmarks.bench_prefix_cache --files 100 --runs 12
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Set
+
+from langchain.prompts import ChatPromptTemplate
+
+from agentbee import config
+from agentbee.core import file_io, providers, runner
+
+from . import synthetic_repo
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+INSTRUCTIONS = [
+    "Add retries with backoff to the request handlers.",
+    "Rename the session token helpers to use snake case.",
+    "Log every cache miss in the parsers.",
+    "Add type hints to the router functions.",
+]
+
+# The assist prompts as they were laid out before canonical snapshots.
+_LEGACY_HEAD = ("You are an advanced AI code analysis and writing assistant. \n"
+                "You have the a github source code each marked with its file path. \n"
+                "User will provide instruction that will require code change like adding a new function, modifying existing function, etc.\n")
+_LEGACY_TAIL = ("Code content with file path: \n"
+                "{code_content} \n"
+                "Also try to follow: \n"
+                "1. Maximize the use of any exiting functions \n")
+LEGACY_PROMPTS = {
+    "full": ChatPromptTemplate([
+        ("system", _LEGACY_HEAD + "Output only the list of file path and complete code content in the following schema:\n"
+                                  "{format_instructions} \n" + _LEGACY_TAIL),
+        ("human", "{query}"),
+    ]),
+    "diff": ChatPromptTemplate([
+        ("system", _LEGACY_HEAD + "Do NOT repeat whole files. Output only the list of file paths and the minimal patch for each one in the following schema:\n"
+                                  "{format_instructions} \n"
+                                  "Each patch is either a unified diff or SEARCH/REPLACE blocks whose SEARCH text is copied exactly from the file. \n"
+                                  "For a new file, use a unified diff from /dev/null. \n" + _LEGACY_TAIL),
+        ("human", "{query}"),
+    ]),
+}
+
+
+class Pricing(NamedTuple):
+    input_per_million: float = 1.25  # dollars per million uncached prompt tokens
+    cached_fraction: float = 0.1  # what a cached token costs and takes to prefill, relative to an uncached one
+    prefill_ms_per_thousand: float = 5.0  # prefill time per thousand uncached prompt tokens
+    block_tokens: int = 128  # prefixes are cached in whole blocks
+    min_tokens: int = 1024  # shorter prompts are never cached
+
+
+class Record(NamedTuple):
+    prompt_tokens: int
+    cached_tokens: int
+    cost: float
+    first_token_seconds: float
+
+
+class PrefixCacheStub:
+    """
+    An OpenAI-compatible /chat/completions server that caches prompt prefixes
+    like a hosted provider. Each prompt is cut into blocks of tokens, each
+    identified by a hash of all the text before its end; the leading blocks
+    already seen are cached. The reply is delayed by the simulated prefill
+    time and reports the cached tokens in its usage, and every request is
+    recorded in `records`.
+    """
+
+    def __init__(self, pricing: Pricing = Pricing(), reply: str = "[]"):
+        self.pricing = pricing
+        self.reply = reply
+        self.records: List[Record] = []
+        self._blocks: Set[str] = set()
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                record = stub.admit(request["messages"])
+                time.sleep(record.first_token_seconds)
+                usage = {"prompt_tokens": record.prompt_tokens, "completion_tokens": 1,
+                         "prompt_tokens_details": {"cached_tokens": record.cached_tokens}}
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                self._chunk(f"data: {json.dumps({'choices': [{'delta': {'content': stub.reply}}]})}\n\n")
+                self._chunk(f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n")
+                self._chunk("data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _chunk(self, text: str):
+                data = text.encode('utf-8')
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def admit(self, messages: List[Dict[str, str]]) -> Record:
+        """Prices one prompt against the prefixes seen so far, then caches its blocks."""
+        pricing = self.pricing
+        # Roughly how a chat template lays the messages out before tokenizing them.
+        tokens = _TOKEN_RE.findall("".join(f"<{m['role']}>\n{m['content']}\n" for m in messages))
+        digest = hashlib.sha256()
+        hashes = []
+        for start in range(0, len(tokens) - pricing.block_tokens + 1, pricing.block_tokens):
+            digest.update("\0".join(tokens[start:start + pricing.block_tokens]).encode('utf-8'))
+            hashes.append(digest.copy().hexdigest())
+        with self._lock:
+            cached_blocks = 0
+            if len(tokens) >= pricing.min_tokens:
+                while cached_blocks < len(hashes) and hashes[cached_blocks] in self._blocks:
+                    cached_blocks += 1
+                self._blocks.update(hashes)
+            cached = cached_blocks * pricing.block_tokens
+            uncached = len(tokens) - cached
+            weight = uncached + cached * pricing.cached_fraction
+            record = Record(len(tokens), cached, weight * pricing.input_per_million / 1e6,
+                            weight * pricing.prefill_ms_per_thousand / 1e6)
+            self.records.append(record)
+        return record
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def accumulate(root: Path) -> list:
+    with contextlib.redirect_stdout(io.StringIO()):
+        return list(runner.iter_accumulated({"no_scrub": True}))
+
+
+def render(layout: str, checkout: Path, files: list, output_format: str, instructions: str):
+    """The prompt for one run in the 'legacy' or 'snapshot' layout."""
+    prompt, code_parser, _ = runner.get_output_components(output_format)
+    format_instructions = code_parser.get_format_instructions()
+    if layout == "legacy":
+        return LEGACY_PROMPTS[output_format].invoke(
+            {"code_content": file_io.join_code(files), "query": instructions, "format_instructions": format_instructions})
+    cwd = os.getcwd()
+    os.chdir(checkout)  # the project root, which paths are made relative to, is found from here
+    try:
+        return prompt.invoke(runner.format_for_prompt(files, instructions, format_instructions))
+    finally:
+        os.chdir(cwd)
+
+
+def run_series(layout: str, checkouts: List[Path], accumulated: Dict[Path, list], runs: int, pricing: Pricing,
+               stats_dir: Path) -> List[Record]:
+    stub = PrefixCacheStub(pricing)
+    endpoint = providers.OpenAICompatibleEndpoint(
+        config.EndpointConfig(f"stub-{layout}", "openai", "stub-model", stub.base_url))
+    router = providers.Router([endpoint], 0, providers.LatencyStats(stats_dir / f"{layout}.json"), hedge=False)
+    for run in range(runs):
+        checkout = checkouts[run % len(checkouts)]
+        output_format = ("full", "diff")[run // len(checkouts) % 2]
+        router.invoke(render(layout, checkout, accumulated[checkout], output_format, INSTRUCTIONS[run % len(INSTRUCTIONS)]))
+    endpoint.close()
+    stub.close()
+    return stub.records
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    synthetic_repo.add_spec_arguments(arg_parser)
+    arg_parser.set_defaults(files=100)
+    arg_parser.add_argument("--runs", type=int, default=12)
+    arg_parser.add_argument("--price", type=float, default=Pricing().input_per_million,
+                            help="Dollars per million uncached prompt tokens.")
+    arg_parser.add_argument("--cached-fraction", type=float, default=Pricing().cached_fraction,
+                            help="Cost and prefill time of a cached token relative to an uncached one.")
+    arg_parser.add_argument("--prefill-ms", type=float, default=Pricing().prefill_ms_per_thousand,
+                            help="Prefill milliseconds per thousand uncached prompt tokens.")
+    args = arg_parser.parse_args()
+    pricing = Pricing(args.price, args.cached_fraction, args.prefill_ms)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_path = Path(tmp).resolve()
+        first = tmp_path / "checkout-a"
+        print(f"Generating {args.files} files...")
+        synthetic_repo.generate(first, synthetic_repo.spec_from_args(args))
+        second = tmp_path / "checkout-b"
+        shutil.copytree(first, second, symlinks=True)
+        checkouts = [first, second]
+        accumulated = {}
+        cwd = os.getcwd()
+        try:
+            for checkout in checkouts:
+                os.chdir(checkout)
+                accumulated[checkout] = accumulate(checkout)
+        finally:
+            os.chdir(cwd)
+
+        print(f"{args.runs} runs over {len(checkouts)} checkouts and both output formats:\n")
+        print(f"{'layout':<9} {'prompt tokens':>14} {'cached':>8} {'cost $':>9} {'prefill s':>10} {'wall s':>8}")
+        results = {}
+        for layout in ("legacy", "snapshot"):
+            start = time.perf_counter()
+            records = run_series(layout, checkouts, accumulated, args.runs, pricing, tmp_path)
+            wall = time.perf_counter() - start
+            prompt_tokens = sum(r.prompt_tokens for r in records)
+            cached = sum(r.cached_tokens for r in records) / prompt_tokens
+            cost = sum(r.cost for r in records)
+            prefill = sum(r.first_token_seconds for r in records)
+            results[layout] = (cost, prefill)
+            print(f"{layout:<9} {prompt_tokens:>14,} {cached:>8.0%} {cost:>9.4f} {prefill:>10.2f} {wall:>8.2f}")
+
+    (legacy_cost, legacy_prefill), (cost, prefill) = results["legacy"], results["snapshot"]
+    print(f"\nSnapshots cost {1 - cost / legacy_cost:.0%} less and prefill {1 - prefill / legacy_prefill:.0%} faster")
+
+
+if __name__ == "__main__":
+    main()
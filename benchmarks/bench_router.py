@@ -0,0 +1,177 @@
+"""
+Checks the provider router against local stub OpenAI-compatible servers:
+keep-alive connection reuse, streaming, failover on errors, 429 reporting,
+and hedging to a second endpoint when the first is slow to produce a token.
+Then compares pooled connections with a new connection per request.
+
+    python -m benchmarks.bench_router --requests 200
+"""
+import argparse
+import http.client
+import json
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Tuple
+
+from agentbee import config
+from agentbee.core import providers
+
+
+class StubServer:
+    """
+    An OpenAI-compatible /chat/completions server streaming a fixed reply,
+    after first_token_delay seconds, or failing with the given status.
+    """
+
+    def __init__(self, reply: str = "hello from the stub", first_token_delay: float = 0.0, status: int = 200):
+        self.reply = reply
+        self.first_token_delay = first_token_delay
+        self.status = status
+        self.connections = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Streaming servers send each event as it is ready; without this,
+            # Nagle holds every small write until the client's delayed ACK.
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                stub.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                assert request["stream"] and request["messages"]
+                if stub.status != 200:
+                    body = b'{"error": "stub failure"}'
+                    self.send_response(stub.status)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.send_header("Retry-After", "1")
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+                time.sleep(stub.first_token_delay)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for word in stub.reply.split(" "):
+                    self._chunk(f"data: {json.dumps({'choices': [{'delta': {'content': word + ' '}}]})}\n\n")
+                self._chunk("data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _chunk(self, text: str):
+                data = text.encode('utf-8')
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def endpoint(self, name: str) -> providers.OpenAICompatibleEndpoint:
+        return providers.OpenAICompatibleEndpoint(config.EndpointConfig(name, "openai", "stub-model", self.base_url))
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def router(stats_dir: Path, *endpoints, **kwargs) -> providers.Router:
+    stats = providers.LatencyStats(stats_dir / f"latency-{time.perf_counter_ns()}.json")
+    return providers.Router(list(endpoints), 0, stats, **kwargs)
+
+
+def check(name: str, condition: bool, detail: str = ""):
+    print(f"  {'ok  ' if condition else 'FAIL'} {name}{': ' + detail if detail else ''}")
+    if not condition:
+        raise SystemExit(1)
+
+
+def run_checks(stats_dir: Path):
+    print("Checks:")
+    fast = StubServer()
+    endpoint = fast.endpoint("fast")
+    reply = router(stats_dir, endpoint).invoke("hi")
+    check("streams the reply", reply.strip() == fast.reply, repr(reply))
+    for _ in range(20):
+        router(stats_dir, endpoint).invoke("hi")
+    check("reuses one keep-alive connection", fast.connections == 1, f"{fast.connections} connection(s)")
+
+    failing = StubServer(status=500)
+    reply = router(stats_dir, failing.endpoint("broken"), endpoint).invoke("hi")
+    check("fails over after an error", reply.strip() == fast.reply)
+
+    limited = StubServer(status=429)
+    try:
+        router(stats_dir, limited.endpoint("limited")).invoke("hi")
+        check("reports 429", False)
+    except providers.ProviderError as e:
+        check("reports 429 with Retry-After", e.status_code == 429 and e.headers.get("Retry-After") == "1")
+
+    slow = StubServer(reply="slow reply", first_token_delay=2.0)
+    start = time.perf_counter()
+    reply = router(stats_dir, slow.endpoint("slow"), fast.endpoint("backup"), hedge_after=0.2).invoke("hi")
+    seconds = time.perf_counter() - start
+    check("hedges to the second endpoint", reply.strip() == fast.reply and seconds < 1.0, f"{seconds:.2f}s")
+
+    stats = providers.LatencyStats(stats_dir / "ranked.json")
+    slow_endpoint, fast_endpoint = slow.endpoint("slow"), fast.endpoint("fast")
+    for _ in range(providers.MIN_SAMPLES):
+        stats.record_first_token(slow_endpoint, 2.0)
+        stats.record_first_token(fast_endpoint, 0.01)
+    ranked = stats.rank([slow_endpoint, fast_endpoint])
+    check("routes to the faster endpoint", ranked[0] is fast_endpoint)
+    for server in (fast, failing, limited, slow):
+        server.close()
+
+
+def unpooled_request(base_url: str) -> str:
+    """One request on a fresh connection, for comparison."""
+    host, port = base_url.split("//")[1].split("/")[0].split(":")
+    connection = http.client.HTTPConnection(host, int(port))
+    body = json.dumps({"model": "m", "messages": [{"role": "user", "content": "hi"}], "stream": True})
+    connection.request("POST", "/v1/chat/completions", body=body, headers={"Content-Type": "application/json"})
+    text = connection.getresponse().read().decode('utf-8')
+    connection.close()
+    return text
+
+
+def compare(requests: int) -> Tuple[float, float]:
+    server = StubServer()
+    endpoint = server.endpoint("pooled")
+    start = time.perf_counter()
+    for _ in range(requests):
+        "".join(endpoint.stream("hi", 0))
+    pooled = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(requests):
+        unpooled_request(server.base_url)
+    unpooled = time.perf_counter() - start
+    server.close()
+    return pooled, unpooled
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--requests", type=int, default=200)
+    args = arg_parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        run_checks(Path(tmp))
+    pooled, unpooled = compare(args.requests)
+    print(f"\n{args.requests} requests: pooled {pooled * 1000 / args.requests:.2f} ms/request, "
+          f"new connection each {unpooled * 1000 / args.requests:.2f} ms/request")
+
+
+if __name__ == "__main__":
+    main()
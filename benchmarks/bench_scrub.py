@@ -0,0 +1,103 @@
+"""
+Throughput benchmark for comment scrubbing: the single-pass lexer in
+`agentbee.core.lexer` against the find-and-rebuild loop it replaced.
+
+    python -m benchmarks.bench_scrub --size-mb 2
+"""
+import argparse
+import random
+import time
+
+from agentbee.core import lexer
+
+LEGACY_COMMENT_PATTERNS = {
+    '.py': ['#'], '.c': ['//'], '.js': ['//'],
+}
+
+LEGACY_MULTI_LINE_COMMENT_DELIMITERS = {
+    '.c': ('/*', '*/'), '.js': ('/*', '*/'),
+    '.py': [('"""', '"""'), ("'''", "'''")]
+}
+
+
+def legacy_scrub(content: str, file_ext: str) -> str:
+    """The pre-lexer implementation, kept verbatim as the baseline."""
+    ml_delims = LEGACY_MULTI_LINE_COMMENT_DELIMITERS.get(file_ext)
+    if ml_delims:
+        delimiter_pairs = ml_delims if isinstance(ml_delims, list) else [ml_delims]
+        for start_delim, end_delim in delimiter_pairs:
+            while True:
+                start_idx = content.find(start_delim)
+                if start_idx == -1:
+                    break
+                end_idx = content.find(end_delim, start_idx + len(start_delim))
+                if end_idx == -1:
+                    break
+                content = content[:start_idx] + content[end_idx + len(end_delim):]
+
+    sl_markers = LEGACY_COMMENT_PATTERNS.get(file_ext, [])
+    if sl_markers:
+        lines = content.split('\n')
+        uncommented_lines = []
+        for line in lines:
+            stripped_line = line.strip()
+            if any(stripped_line.startswith(marker) for marker in sl_markers):
+                continue
+            uncommented_lines.append(line)
+        content = "\n".join(uncommented_lines)
+    return content
+
+
+SNIPPETS = {
+    '.py': [
+        'def func_{n}(a, b):\n    """Docstring for func_{n}."""\n    return a + b  # add\n',
+        '# comment line {n}\nvalue_{n} = "text with # hash"\n',
+    ],
+    '.c': [
+        '/* block comment {n} */\nint func_{n}(int a) {{ return a * 2; }} // twice\n',
+        'const char *s_{n} = "/* not a comment */";\n',
+    ],
+    '.js': [
+        '/** JSDoc {n} */\nfunction f{n}(x) {{ return `t ${{x}}`; }} // c\n',
+        'const url{n} = "http://example.com"; /* inline */\n',
+    ],
+}
+
+
+def generate(file_ext: str, size_bytes: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    parts, total, n = [], 0, 0
+    while total < size_bytes:
+        snippet = rng.choice(SNIPPETS[file_ext]).format(n=n)
+        parts.append(snippet)
+        total += len(snippet)
+        n += 1
+    return ''.join(parts)
+
+
+def throughput(func, content: str, file_ext: str, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(content, file_ext)
+        best = min(best, time.perf_counter() - start)
+    return len(content.encode('utf-8')) / (1024 * 1024) / best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--size-mb", type=float, default=1.0, help="Size of each synthetic file in MB.")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the best is reported.")
+    args = arg_parser.parse_args()
+
+    size_bytes = int(args.size_mb * 1024 * 1024)
+    print(f"{'ext':<6}{'legacy MB/s':>14}{'lexer MB/s':>14}{'speedup':>10}")
+    for file_ext in SNIPPETS:
+        content = generate(file_ext, size_bytes)
+        legacy = throughput(legacy_scrub, content, file_ext, args.repeat)
+        current = throughput(lexer.scrub, content, file_ext, args.repeat)
+        print(f"{file_ext:<6}{legacy:>14.2f}{current:>14.2f}{current / legacy:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
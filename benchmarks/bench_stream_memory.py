@@ -0,0 +1,73 @@
+"""
+Peak RSS of `agentbee accumulate` on a synthetic tree: building the whole
+accumulated string before logging it, versus streaming (path, content)
+chunks straight into the log.
+
+    python -m benchmarks.bench_stream_memory --files 2000 --file-kb 100
+"""
+import argparse
+import resource
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from agentbee import logger
+from agentbee.core import file_io
+
+SAMPLE_LINE = "def handler(request):  # route the request\n    return request.body\n"
+
+
+def generate_tree(root: Path, files: int, file_kb: int):
+    body = SAMPLE_LINE * (file_kb * 1024 // len(SAMPLE_LINE) + 1)
+    for i in range(files):
+        target = root / f"pkg{i % 50}" / f"module_{i}.py"
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(body, encoding='utf-8')
+
+
+def run_child(mode: str, tree: Path, log_path: Path):
+    """Accumulates the tree in this process the way `agentbee accumulate` does."""
+    logger.LOG_DIR = log_path
+    file_paths = sorted(p for p in tree.rglob('*') if p.is_file())
+    if mode == "string":
+        logger.log_output(file_io.accumulate_code(file_paths, scrub_comments=True))
+    else:
+        logger.log_output(file_io.iter_accumulated_code(file_paths, scrub_comments=True))
+
+
+def peak_rss_mb(mode: str, tree: Path, log_path: Path) -> float:
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_stream_memory", "--child", mode, str(tree), str(log_path)],
+        check=True, stdout=subprocess.DEVNULL
+    )
+    # ru_maxrss is the peak of the largest child reaped so far, in KB on Linux.
+    return resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--files", type=int, default=2000)
+    arg_parser.add_argument("--file-kb", type=int, default=100)
+    arg_parser.add_argument("--child", nargs=3, metavar=("MODE", "TREE", "LOG"), help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.child:
+        mode, tree, log_path = args.child
+        run_child(mode, Path(tree), Path(log_path))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tree = Path(tmp) / "tree"
+        generate_tree(tree, args.files, args.file_kb)
+        total_mb = args.files * args.file_kb / 1024
+        print(f"Synthetic tree: {args.files} files, ~{total_mb:.0f} MB")
+        # Measure streaming first: RUSAGE_CHILDREN only ever reports the maximum so far.
+        streamed = peak_rss_mb("stream", tree, Path(tmp) / "stream-logs")
+        buffered = peak_rss_mb("string", tree, Path(tmp) / "string-logs")
+        print(f"  peak RSS, in-memory string: {buffered:8.1f} MB")
+        print(f"  peak RSS, streaming:        {streamed:8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Benchmark suite for the core code paths, run against a deterministic
+synthetic git repository. Results are written as JSON; given a baseline
+file, the suite exits non-zero when any benchmark's median regresses by
+more than the allowed fraction, so it can gate upgrades.
+
+    python -m benchmarks.suite --files 2000 --output results.json
+    python -m benchmarks.suite --files 2000 --baseline results.json --max-regression 0.2
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from agentbee.core import accumulator, classify, file_io, parser, runner
+
+from . import synthetic_repo
+
+INCLUDE_PATTERNS = ["pkg1*/**/*.py", "pkg2/*/*.js", "*.md", "pkg3/sub1/*"]
+
+
+def measure(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """Runs fn repeat times (after one warm-up run) with stdout silenced."""
+    timings = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn()
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+    return {
+        "median_s": statistics.median(timings),
+        "min_s": min(timings),
+        "mean_s": statistics.mean(timings),
+        "runs": repeat,
+    }
+
+
+def model_output(paths: List[Path], root: Path, scripts: int) -> str:
+    """A large fenced model response rewriting the first `scripts` text files."""
+    outputs = []
+    for path in paths:
+        if len(outputs) == scripts:
+            break
+        if path.suffix in (".png", ".bin"):
+            continue
+        outputs.append({"file_path": path.relative_to(root).as_posix(),
+                        "code_content": path.read_text(encoding='utf-8')})
+    return "```json\n" + json.dumps(outputs, indent=2) + "\n```"
+
+
+def run_suite(root: Path, repeat: int, scripts: int) -> Dict[str, Dict[str, float]]:
+    paths = accumulator.get_file_paths(root, None)
+    code_parser = parser.get_scripts_list_parser()
+    response = model_output(paths, root, scripts)
+    parsed = code_parser.parse(runner.clean_markdown_json(response))
+    # Alternating between two versions makes every save rewrite every file.
+    edited = parser.CodeOutputRootList([
+        parser.CodeOutput(file_path=script.file_path, code_content=script.code_content + "\n")
+        for script in parsed.root
+    ])
+    versions = [parsed, edited]
+
+    def save_changed():
+        versions.reverse()
+        runner.save_script(versions[0])
+
+    benchmarks = {
+        "get_file_paths": lambda: accumulator.get_file_paths(root, None),
+        "filter_paths_with_patterns": lambda: accumulator.filter_paths_with_patterns(paths, INCLUDE_PATTERNS, root),
+        "classify_paths": lambda: classify.FileClassifier(root).filter_paths(paths),
+        "accumulate_code[scrub]": lambda: file_io.accumulate_code(paths, scrub_comments=True),
+        "accumulate_code[no_scrub]": lambda: file_io.accumulate_code(paths, scrub_comments=False),
+        "accumulate_code[outline]": lambda: file_io.accumulate_code(paths, scrub_comments=True, outlined=lambda _: True),
+        "clean_markdown_json+parse": lambda: code_parser.parse(runner.clean_markdown_json(response)),
+        "save_script": lambda: runner.save_script(parsed),
+        "save_script[changed]": save_changed,
+    }
+    results = {}
+    for name, fn in benchmarks.items():
+        results[name] = measure(fn, repeat)
+        print(f"  {name:<30} median {results[name]['median_s'] * 1000:10.1f} ms", file=sys.stderr)
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], max_regression: float) -> bool:
+    """Prints a comparison table; returns False if any benchmark regressed beyond the limit."""
+    ok = True
+    print(f"{'benchmark':<30} {'baseline ms':>12} {'current ms':>12} {'change':>8}")
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"{name:<30} {'-':>12} {result['median_s'] * 1000:>12.1f}      new")
+            continue
+        before, after = baseline[name]["median_s"], result["median_s"]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if change > max_regression:
+            flag, ok = "  REGRESSION", False
+        print(f"{name:<30} {before * 1000:>12.1f} {after * 1000:>12.1f} {change:>+7.0%}{flag}")
+    return ok
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    synthetic_repo.add_spec_arguments(arg_parser)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    arg_parser.add_argument("--scripts", type=int, default=200, help="Files in the synthetic model output.")
+    arg_parser.add_argument("--output", type=Path, help="Write the results JSON here (default: stdout).")
+    arg_parser.add_argument("--baseline", type=Path, help="A previous results JSON to compare against.")
+    arg_parser.add_argument("--max-regression", type=float, default=0.2,
+                            help="Allowed slowdown of any median, as a fraction (default 0.2).")
+    args = arg_parser.parse_args()
+    spec = synthetic_repo.spec_from_args(args)
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp).resolve()
+        print(f"Generating {spec.files} files...", file=sys.stderr)
+        synthetic_repo.generate(root, spec)
+        # save_script resolves the project root from the working directory.
+        os.chdir(root)
+        try:
+            results = run_suite(root, args.repeat, args.scripts)
+        finally:
+            os.chdir(cwd)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "spec": spec._asdict(),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding='utf-8')
+    elif not args.baseline:
+        print(text)
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+        if baseline.get("meta", {}).get("spec") != report["meta"]["spec"]:
+            print("⚠️ Warning: the baseline was recorded with a different repository spec.", file=sys.stderr)
+        if not compare(results, baseline["results"], args.max_regression):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Deterministic synthetic git repositories for benchmarks. The same options
+and seed always produce byte-identical trees, so timings are comparable
+across runs and machines.
+
+    python -m benchmarks.synthetic_repo /tmp/synth --files 5000 --languages py=5,js=3,c=1,md=1
+"""
+import argparse
+import math
+import random
+import subprocess
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Tuple
+
+WORDS = [
+    "request", "response", "handler", "session", "token", "user", "account", "cache",
+    "parser", "render", "config", "client", "server", "router", "model", "query",
+    "index", "buffer", "stream", "worker", "queue", "event", "logger", "schema",
+]
+
+
+class LanguageTemplate(NamedTuple):
+    extension: str
+    comment: str
+    block_comment: Tuple[str, str]
+    line: str  # format string with {a}, {b}, {c} and {n}
+
+
+TEMPLATES: Dict[str, LanguageTemplate] = {
+    "py": LanguageTemplate(".py", "# ", ('"""', '"""'), "def {a}_{b}_{n}({c}):\n    return {a}.{b}({c}, '{c}#{n}')"),
+    "js": LanguageTemplate(".js", "// ", ("/*", "*/"), "function {a}{n}({c}) {{ return {b}.{a}({c}, \"{c}//{n}\"); }}"),
+    "c": LanguageTemplate(".c", "// ", ("/*", "*/"), "int {a}_{b}_{n}(int {c}) {{ return {c} * {n}; }}"),
+    "go": LanguageTemplate(".go", "// ", ("/*", "*/"), "func {a}{n}({c} int) int {{ return {c} + {n} }}"),
+    "md": LanguageTemplate(".md", "", ("", ""), "The {a} {b} sends a {c} ({n})."),
+}
+
+
+class RepoSpec(NamedTuple):
+    files: int = 1000
+    # "fixed:KB", "uniform:MIN_KB:MAX_KB" or "lognormal:MEDIAN_KB:SIGMA"
+    size_distribution: str = "lognormal:4:1.0"
+    # Relative weights per language, e.g. {"py": 5, "js": 3}
+    languages: Dict[str, float] = {"py": 5, "js": 3, "c": 1, "md": 1}
+    # Fraction of lines preceded by a comment.
+    comment_density: float = 0.2
+    # Fraction of files that are binary blobs (.png/.bin).
+    binary_fraction: float = 0.02
+    seed: int = 0
+
+
+def parse_languages(text: str) -> Dict[str, float]:
+    """Parses 'py=5,js=3' into weights."""
+    weights = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in TEMPLATES:
+            raise ValueError(f"Unknown language '{name}'. Choose from {', '.join(TEMPLATES)}.")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+def sample_size_kb(rng: random.Random, distribution: str) -> float:
+    kind, *params = distribution.split(":")
+    values = [float(p) for p in params]
+    if kind == "fixed":
+        return values[0]
+    if kind == "uniform":
+        return rng.uniform(values[0], values[1])
+    if kind == "lognormal":
+        return rng.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Unknown size distribution '{distribution}'.")
+
+
+def _text_file(rng: random.Random, template: LanguageTemplate, size_bytes: int, comment_density: float) -> str:
+    lines: List[str] = []
+    total = 0
+    n = 0
+    while total < size_bytes:
+        a, b, c = rng.sample(WORDS, 3)
+        if template.comment and rng.random() < comment_density:
+            if rng.random() < 0.2:
+                open_, close = template.block_comment
+                lines.append(f"{open_} {a} {b}: see {c} for details {close}")
+            else:
+                lines.append(f"{template.comment}{a} the {b} before the {c}")
+        lines.append(template.line.format(a=a, b=b, c=c, n=n))
+        total += len(lines[-1]) + 1
+        n += 1
+    return "\n".join(lines) + "\n"
+
+
+def _git(root: Path, *args: str):
+    subprocess.run(['git', *args], cwd=root, check=True, capture_output=True)
+
+
+def generate(root: Path, spec: RepoSpec = RepoSpec(), commit: bool = True) -> List[Path]:
+    """Writes the synthetic tree under root (and commits it) and returns its files."""
+    rng = random.Random(spec.seed)
+    names = list(spec.languages)
+    weights = [spec.languages[name] for name in names]
+    paths = []
+    for i in range(spec.files):
+        directory = root / f"pkg{i % 50}" / f"sub{i // 50 % 20}"
+        directory.mkdir(parents=True, exist_ok=True)
+        size_bytes = max(int(sample_size_kb(rng, spec.size_distribution) * 1024), 16)
+        if rng.random() < spec.binary_fraction:
+            target = directory / f"asset_{i}{rng.choice(['.png', '.bin'])}"
+            target.write_bytes(rng.getrandbits(8 * size_bytes).to_bytes(size_bytes, "little"))
+        else:
+            template = TEMPLATES[rng.choices(names, weights)[0]]
+            target = directory / f"file_{i}{template.extension}"
+            target.write_text(_text_file(rng, template, size_bytes, spec.comment_density), encoding='utf-8')
+        paths.append(target)
+    if commit:
+        _git(root, 'init', '-q')
+        _git(root, 'add', '.')
+        _git(root, '-c', 'user.email=bench@example.com', '-c', 'user.name=bench', 'commit', '-qm', 'synthetic')
+    return paths
+
+
+def add_spec_arguments(arg_parser: argparse.ArgumentParser):
+    defaults = RepoSpec()
+    arg_parser.add_argument("--files", type=int, default=defaults.files)
+    arg_parser.add_argument("--size-distribution", default=defaults.size_distribution,
+                            help="fixed:KB, uniform:MIN:MAX or lognormal:MEDIAN:SIGMA")
+    arg_parser.add_argument("--languages", type=parse_languages, default=defaults.languages,
+                            help="weights, e.g. py=5,js=3,c=1,go=1,md=1")
+    arg_parser.add_argument("--comment-density", type=float, default=defaults.comment_density)
+    arg_parser.add_argument("--binary-fraction", type=float, default=defaults.binary_fraction)
+    arg_parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def spec_from_args(args: argparse.Namespace) -> RepoSpec:
+    return RepoSpec(args.files, args.size_distribution, args.languages,
+                    args.comment_density, args.binary_fraction, args.seed)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("root", type=Path)
+    add_spec_arguments(arg_parser)
+    args = arg_parser.parse_args()
+    args.root.mkdir(parents=True, exist_ok=True)
+    paths = generate(args.root, spec_from_args(args))
+    total_mb = sum(p.stat().st_size for p in paths) / 1024 / 1024
+    print(f"Generated {len(paths)} files ({total_mb:.1f} MB) in {args.root}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+def average(numbers):
+    """Returns the mean of a non-empty list of numbers."""
+    return sum(numbers) / (len(numbers) + 1)
@@ -0,0 +1,9 @@
+#!/usr/bin/env bash
+# Fails until calc.average is fixed. The sleep stands in for a slower test suite.
+set -e
+sleep 1
+python3 -c "
+from calc import average
+assert average([2, 4, 6]) == 4, f'average([2, 4, 6]) returned {average([2, 4, 6])}'
+print('ok')
+"